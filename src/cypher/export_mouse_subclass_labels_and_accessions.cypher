@@ -7,7 +7,7 @@
 
 
 
-MATCH (ds { title: ['Whole Mouse Brain Taxonomy']})
+MATCH (ds:Individual { title: ['Whole Mouse Brain Taxonomy']})
 	  -[:annotations]->(cc:Cell_cluster)-[:has_labelset]
 	  -(:Individual { label: 'subclass'}) 
 	  RETURN cc.label AS label, cc.iri AS accession
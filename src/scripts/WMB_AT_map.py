@@ -1,18 +1,48 @@
-import requests
-import json
+import argparse
+import sys
+import numpy as np
 import pandas as pd
 from pathlib import Path
+import importlib.util
 
 # Find project root
 script_dir = Path(__file__).resolve().parent
 project_root = script_dir.parent.parent
 
-wmb = requests.get("https://github.com/brain-bican/whole_mouse_brain_taxonomy/raw/refs/heads/main/CCN20230722.json")
-wmb_json = wmb.text
-wmb_data = json.loads(wmb_json)
-
-WMB_AT = pd.read_csv(project_root / 'resources' / 'MWB_consensus_homology.csv',
-                      sep=',').dropna(how='all')
+# Direct import of the shared fetch cache
+cache_path = project_root / 'src' / 'utils' / 'fetch_cache.py'
+spec = importlib.util.spec_from_file_location('fetch_cache', cache_path)
+fetch_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fetch_cache)
+
+# Direct import of the label resolver
+resolver_path = project_root / 'src' / 'utils' / 'label_resolver.py'
+spec = importlib.util.spec_from_file_location('label_resolver', resolver_path)
+label_resolver = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(label_resolver)
+
+# Stage timing (--profile)
+instrumentation_path = project_root / 'src' / 'utils' / 'instrumentation.py'
+spec = importlib.util.spec_from_file_location('instrumentation', instrumentation_path)
+instrumentation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(instrumentation)
+
+# Template prefixes, sources and mapping columns
+config_path = project_root / 'src' / 'utils' / 'template_config.py'
+spec = importlib.util.spec_from_file_location('template_config', config_path)
+template_config = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(template_config)
+
+# Row fingerprints and mapping deltas (--diff)
+delta_path = project_root / 'src' / 'utils' / 'row_delta.py'
+spec = importlib.util.spec_from_file_location('row_delta', delta_path)
+row_delta = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(row_delta)
+
+WMB_TAXONOMY_URL = template_config.WMB_TAXONOMY_URL
+
+DEFAULT_INPUT = project_root / 'resources' / 'MWB_consensus_homology.csv'
+DEFAULT_OUTPUT = template_config.BG2WMB_TEMPLATE
 
 ## Columns 'curated_ABC_WMB_supertype' and 'curated_ABC_WMB_cluster' contain the labels of transferred WMB terms
 ## WHere there are multiples they are separated by ' | ', e.g. 1175 Ependymal NN_1 | 1176 Ependymal NN_2
@@ -21,34 +51,6 @@ WMB_AT = pd.read_csv(project_root / 'resources' / 'MWB_consensus_homology.csv',
 ## First step - look up cell_set_accession for each label and substitute. Results should be accessions separated by '|' if multiple (no spaces)
 ## Second step - split into two row, one for multiples and one for single.
 
-
-# Build label to accession mapping from wmb_data['annotations']
-label_to_accession = {entry['cell_label']: entry['cell_set_accession'] for entry in wmb_data['annotations']}
-
-# Build subclass label to accession mapping (strip leading digits/whitespace, only labelset == 'subclass')
-import re
-subclass_label_to_accession = {}
-for entry in wmb_data['annotations']:
-    if entry.get('labelset') == 'subclass':
-        label = entry['cell_label']
-        # Strip leading digits and whitespace
-        norm_label = re.sub(r'^\d+\s*', '', label)
-        subclass_label_to_accession[norm_label] = entry['cell_set_accession']
-
-def subclass_labels_to_accessions(label_str):
-    labels = [re.sub(r'^\d+\s*', '', lbl.strip()) for lbl in label_str.split('|') if lbl.strip()]
-    accessions = [subclass_label_to_accession.get(lbl, '') for lbl in labels]
-    accessions = [f"WMB:{acc}" if acc and not acc.startswith("WMB:") else acc for acc in accessions]
-    return '|'.join([acc for acc in accessions if acc])
-
-def labels_to_accessions(label_str):
-    labels = [lbl.strip() for lbl in label_str.split('|') if lbl.strip()]
-    accessions = [label_to_accession.get(lbl, '') for lbl in labels]
-    # Add WMB: prefix to each accession if not empty
-    accessions = [f"WMB:{acc}" if acc and not acc.startswith("WMB:") else acc for acc in accessions]
-    return '|'.join([acc for acc in accessions if acc])
-
-new_rows = []
 robot_template_header = {
     'Group': '',
     'Type': 'TYPE',
@@ -58,70 +60,172 @@ robot_template_header = {
     'WMB_broad_match': 'AI skos:broadMatch SPLIT=| '
 }
 
-new_rows.append(robot_template_header)
-
-for idx, row in WMB_AT.iterrows():
-    group = row.get('Group', '')
-    accession_group = row.get('accession_group', '')
-    supertype_labels = str(row.get('curated_ABC_WMB_supertype', ''))
-    cluster_labels = str(row.get('curated_ABC_WMB_cluster', ''))
-    subclass_labels = str(row.get('curated_ABC_WMB_subclass', ''))
-    supertype_accessions = labels_to_accessions(supertype_labels)
-    cluster_accessions = labels_to_accessions(cluster_labels)
-    subclass_accessions = subclass_labels_to_accessions(subclass_labels)
-
-    supertype_split = [s for s in supertype_accessions.split('|') if s]
-    subclass_split = [s for s in subclass_accessions.split('|') if s]
-
-    WMB_exact_match = ''
-    WMB_related_match = ''
-    WMB_broad_match = ''
-
-    # If supertype is multi and subclass is single, put subclass accession in WMB_exact_match
-    if len(supertype_split) > 1 and len(subclass_split) == 1:
-        WMB_exact_match = subclass_accessions
-        WMB_related_match = supertype_accessions
-    else:
-        # Supertype mapping
-        if len(supertype_split) == 1:
-            WMB_exact_match = supertype_accessions
-            WMB_related_match = ''
-        elif len(supertype_split) > 1:
-            WMB_exact_match = ''
-            WMB_related_match = supertype_accessions
-        else:
-            WMB_exact_match = ''
-            WMB_related_match = ''
-
-    # Subclass mapping
-    if len(subclass_split) > 1:
-        # If both supertype and subclass multi, append subclass to relatedMatch
-        if WMB_related_match:
-            WMB_related_match = WMB_related_match + '|' + subclass_accessions
-        else:
-            WMB_related_match = subclass_accessions
-        WMB_broad_match = ''
-    elif len(subclass_split) == 1 and not (len(supertype_split) > 1):
-        # Only put in broad_match if not already handled above
-        WMB_broad_match = subclass_accessions
-    else:
-        WMB_broad_match = ''
-
-    new_rows.append({
-        'Group': group,
+# Template column -> mapping relationship, for deltas
+MATCH_COLUMNS = template_config.BG2WMB_MATCH_COLUMNS
+
+
+def labels_to_accessions(labels, index, labelset=None):
+    """Resolve a column of '|'-delimited WMB labels to '|'-joined WMB: accessions.
+
+    Labels are exploded to one per row, resolved in bulk against the label index (exact,
+    then normalised label, within labelset if given) and re-joined per original row in
+    their original order. Returns (accessions, counts, unresolved labels) with the first
+    two aligned to labels.index.
+    """
+    exploded = labels.fillna('').astype(str).str.split('|').explode().str.strip()
+    exploded = exploded[exploded != '']
+    acc = index.resolve_series(exploded, label_resolver.WMB_TAXONOMY, labelset)
+    unresolved = sorted(exploded[acc.isna()].unique())
+    acc = acc.dropna()
+    acc = acc[acc != '']
+    acc = acc.where(acc.str.startswith('WMB:'), 'WMB:' + acc)
+    grouped = acc.groupby(level=0, sort=False)
+    joined = grouped.agg('|'.join).reindex(labels.index, fill_value='')
+    counts = grouped.size().reindex(labels.index, fill_value=0)
+    return joined, counts, unresolved
+
+
+def warn_unresolved(column, unresolved, index, labelset=None):
+    for label in unresolved:
+        suggestions = index.candidates(label, label_resolver.WMB_TAXONOMY, labelset, limit=3)
+        hint = '; did you mean ' + ', '.join(f"'{c[0]}'" for c in suggestions) if suggestions else ''
+        print(f"Warning: {column}: no WMB accession for '{label}'{hint}", file=sys.stderr)
+
+
+def build_template(homology, index, id_prefix='BG'):
+    """Build the ROBOT template rows (without the directive row) for a homology table.
+    id_prefix may be a single CURIE prefix or a Series of prefixes aligned to homology."""
+    def column(name):
+        return homology[name] if name in homology else pd.Series('', index=homology.index)
+
+    supertype, n_supertype, missing = labels_to_accessions(column('curated_ABC_WMB_supertype'), index)
+    warn_unresolved('curated_ABC_WMB_supertype', missing, index)
+    subclass, n_subclass, missing = labels_to_accessions(column('curated_ABC_WMB_subclass'), index, 'subclass')
+    warn_unresolved('curated_ABC_WMB_subclass', missing, index, 'subclass')
+
+    supertype_multi = n_supertype > 1
+    subclass_multi = n_subclass > 1
+    subclass_single = n_subclass == 1
+
+    # Single subclass over several supertypes: the subclass is the exact match.
+    # Otherwise a single supertype is exact and multiple supertypes are related.
+    exact = np.select([supertype_multi & subclass_single, n_supertype == 1], [subclass, supertype], '')
+    related = supertype.where(supertype_multi, '')
+    # Multiple subclasses are always related matches
+    related = np.select([subclass_multi & (related != ''), subclass_multi],
+                        [related + '|' + subclass, subclass], related)
+    broad = np.where(subclass_single & ~supertype_multi, subclass, '')
+
+    return pd.DataFrame({
+        'Group': column('Group'),
         'Type': 'owl:NamedIndividual',
-        'accession_group': f"BG:{accession_group}",
-        'WMB_exact_match': WMB_exact_match,
-        'WMB_related_match': WMB_related_match,
-        'WMB_broad_match': WMB_broad_match
-    })
-
-new_table = pd.DataFrame(new_rows)
-print(new_table.head())
-
-new_table.to_csv(project_root / 'src' / 'templates' / 'BG2WMB_AT_map_template.tsv', sep='\t', index=False)
-
-
-
-
-
+        'accession_group': id_prefix + ':' + column('accession_group').map(str),
+        'WMB_exact_match': exact,
+        'WMB_related_match': related,
+        'WMB_broad_match': broad,
+    }, index=homology.index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build BG2WMB ROBOT templates from consensus homology tables.")
+    parser.add_argument('-i', '--input', action='append', default=None,
+                        help=f'Homology CSV (repeatable; default {DEFAULT_INPUT.relative_to(project_root)})')
+    parser.add_argument('-o', '--output', action='append', default=None,
+                        help='Output template TSV, one per --input (default: BG2WMB_AT_map_template.tsv)')
+    parser.add_argument('--id-prefix', action='append', default=None,
+                        help='CURIE prefix for accession_group, one per --input or one for all (default BG)')
+    parser.add_argument('--offline', action='store_true', help='Use only the local fetch cache, no network access')
+    parser.add_argument('--refresh', action='store_true', help='Revalidate the cached taxonomy JSON with the server')
+    parser.add_argument('--diff', action='store_true',
+                        help='Rebuild only rows whose homology row changed and write <template>.delta.json')
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profiler = instrumentation.profiler_from_args(args, 'WMB_AT_map')
+
+    inputs = args.input or [DEFAULT_INPUT]
+    outputs = args.output or ([DEFAULT_OUTPUT] if not args.input else None)
+    if not outputs or len(outputs) != len(inputs):
+        parser.error('Give one --output per --input')
+    prefixes = args.id_prefix or ['BG']
+    if len(prefixes) == 1:
+        prefixes = prefixes * len(inputs)
+    elif len(prefixes) != len(inputs):
+        parser.error('Give one --id-prefix, or one per --input')
+    if args.diff:
+        for output in outputs:
+            pending = row_delta.pending_delta(output)
+            if pending:
+                sys.exit(f"{pending} has not been applied to the KG yet; apply it with "
+                         f"load_mappings.py --delta {pending} (or delete it) before writing a new one")
+
+    try:
+        with profiler.stage('fetch') as st:
+            wmb_json = fetch_cache.FetchCache(offline=args.offline or None).fetch(WMB_TAXONOMY_URL, refresh=args.refresh)
+            st.path = wmb_json
+        with profiler.stage('index'):
+            index = label_resolver.load_index(wmb_json)
+
+        with profiler.stage('read') as st:
+            # All tables go through the columnar pipeline as one frame, then are split for writing
+            frames = [pd.read_csv(path, sep=',').dropna(how='all') for path in inputs]
+            combined = pd.concat(frames, keys=range(len(frames)), names=['source', 'row']).reset_index(level='row', drop=True)
+            combined = combined.reset_index()
+            sources = combined.pop('source')
+            st.rows = len(combined)
+        with profiler.stage('transform') as st:
+            id_prefix = sources.map(dict(enumerate(prefixes)))
+            ids = id_prefix + ':' + combined['accession_group'].map(str)
+            code = [row_delta.file_sha256(Path(__file__)), row_delta.file_sha256(resolver_path)]
+            contexts, input_fps, previous, reused = [], [], [], []
+            for i, output in enumerate(outputs):
+                mask = sources == i
+                contexts.append(row_delta.fingerprint(Path(wmb_json).name, code, prefixes[i]))
+                input_fps.append(row_delta.row_fingerprints(combined.loc[mask, frames[i].columns], ids[mask]))
+                sidecar = row_delta.read_sidecar(output)
+                old = row_delta.read_template_frame(output, 'accession_group') if args.diff else None
+                previous.append((old, sidecar))
+                if old is not None and sidecar and sidecar['context'] == contexts[-1]:
+                    # Rows whose homology row and context are unchanged are copied from the old template
+                    same = [k for k, fp in input_fps[-1].items() if sidecar['inputs'].get(k) == fp and k in old.index]
+                    keep = mask & ids.isin(same)
+                    reused.append(old.loc[ids[keep], list(robot_template_header)].set_axis(ids[keep].index))
+            rebuild = ~combined.index.isin(pd.concat(reused).index) if reused else slice(None)
+            rows = build_template(combined[rebuild], index, id_prefix=id_prefix[rebuild])
+            rows = pd.concat([rows] + reused).loc[combined.index]
+            st.rows = len(combined[rebuild])
+
+        with profiler.stage('write') as st:
+            st.bytes = 0
+            for i, output in enumerate(outputs):
+                new_table = pd.concat([pd.DataFrame([robot_template_header]), rows[sources == i]], ignore_index=True)
+                print(new_table.head())
+                previous_sha256 = row_delta.file_sha256(output)
+                new_table.to_csv(output, sep='\t', index=False)
+                st.bytes += Path(output).stat().st_size
+
+                new = rows[sources == i].set_axis(ids[sources == i])
+                template_fps = row_delta.row_fingerprints(new, new.index)
+                old, sidecar = previous[i]
+                if args.diff:
+                    loaded = row_delta.read_loaded(output)
+                    if loaded:
+                        # Delta against what the KG holds, whatever the template was regenerated to since
+                        previous_sha256, before = loaded
+                    else:
+                        # Nothing loaded yet (load_mappings.py refuses such a delta): diff the old template
+                        before = row_delta.frame_mappings(old, MATCH_COLUMNS) if old is not None else {}
+                    after = row_delta.frame_mappings(new, MATCH_COLUMNS)
+                    labels = dict(old['Group']) if old is not None else {}
+                    labels.update(new['Group'])
+                    delta = row_delta.mapping_delta(before, after, labels)
+                    path = row_delta.write_delta(output, delta, previous_sha256)
+                    added = sum(len(d['added']) for d in delta.values())
+                    removed = sum(len(d['removed']) for d in delta.values())
+                    print(f"{Path(output).name}: {len(delta)} groups changed "
+                          f"(+{added} / -{removed} mappings), delta written to {path}")
+                row_delta.write_sidecar(output, contexts[i], input_fps[i], template_fps)
+    finally:
+        profiler.finish()
+
+if __name__ == '__main__':
+    main()
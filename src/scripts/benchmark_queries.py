@@ -0,0 +1,224 @@
+"""
+Benchmark every catalogued Cypher query (Neo4jNamedQueries + src/cypher/*.cypher) under PROFILE.
+
+Each query is run --repeat times. Per query we record median/min wall time, total db hits,
+row count and the size of the serialised result, and write them to a JSON baseline.
+On later runs, --compare flags any query whose median wall time or db hits grew by more
+than --threshold (a ratio) relative to the baseline.
+
+Intended to run against a throwaway local Neo4j (see `make benchmark_neo4j`, port 7688) loaded
+with the fixture graph built by --load-fixture from resources/maps/cell_set_map.tsv. The
+fixture is marked by a (:Benchmark_fixture) node; --load-fixture refuses to wipe a database
+that is neither empty nor marked.
+
+Usage:
+    python benchmark_queries.py --endpoint bolt://localhost:7688 --load-fixture --update-baseline
+    python benchmark_queries.py --endpoint bolt://localhost:7688 --compare
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+# Direct import of neo4j wrapper and query catalogue
+wrapper_path = project_root / 'src' / 'utils' / 'neo4j_bolt_wrapper.py'
+spec = importlib.util.spec_from_file_location('neo4j_bolt_wrapper', wrapper_path)
+neo4j_wrapper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neo4j_wrapper)
+Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
+
+catalog_path = project_root / 'src' / 'utils' / 'query_catalog.py'
+spec = importlib.util.spec_from_file_location('query_catalog', catalog_path)
+query_catalog = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_catalog)
+
+closure_path = script_dir / 'build_subcluster_closure.py'
+spec = importlib.util.spec_from_file_location('build_subcluster_closure', closure_path)
+subcluster_closure = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(subcluster_closure)
+
+BASELINE_FILE = project_root / 'reports' / 'query_benchmark_baseline.json'
+FIXTURE_SOURCE = project_root / 'resources' / 'maps' / 'cell_set_map.tsv'
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+DEFAULT_ENDPOINT = 'bolt://localhost:7688'
+FIXTURE_MARKER = 'Benchmark_fixture'
+
+
+def total_db_hits(profile):
+    if not profile:
+        return 0
+    return profile.get('dbHits', 0) + sum(total_db_hits(c) for c in profile.get('children', []))
+
+
+def benchmark_query(wrapper, query, repeat):
+    """Run query repeat times under PROFILE and summarise the runs."""
+    walls, db_hits, rows, result_bytes = [], 0, 0, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records, profile = wrapper.profile(query)
+        walls.append((time.perf_counter() - start) * 1000)
+        db_hits = total_db_hits(profile)
+        rows = len(records)
+        result_bytes = max(result_bytes, len(json.dumps(records, default=str).encode('utf-8')))
+    return {
+        'wall_ms_median': round(statistics.median(walls), 3),
+        'wall_ms_min': round(min(walls), 3),
+        'db_hits': db_hits,
+        'rows': rows,
+        'result_bytes': result_bytes,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of (query, metric, baseline value, new value) regressions."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get('queries', {}).get(name)
+        if not base:
+            continue
+        for metric in ('wall_ms_median', 'db_hits'):
+            if base.get(metric) and stats[metric] > base[metric] * threshold:
+                regressions.append((name, metric, base[metric], stats[metric]))
+    return regressions
+
+
+def fixture_rows(source=FIXTURE_SOURCE):
+    """Build fixture nodes and edges from the cell set map.
+    Each cell set is linked by subcluster_of to a cell set in the next rank up of the same
+    taxonomy (spread evenly), every third cell set gets a CL term and BG Groups get an
+    exactMatch to a WMB supertype, mirroring the shape of the real KG."""
+    with open(source, newline='') as f:
+        rows = [r for r in csv.DictReader(f, delimiter='\t')]
+    by_rank = {}
+    for r in rows:
+        if r['labelset_rank'].isdigit():
+            by_rank.setdefault((r['dataset'], int(r['labelset_rank'])), []).append(r['iri'])
+    edges = []
+    for (dataset, rank), iris in by_rank.items():
+        parents = by_rank.get((dataset, rank + 1))
+        if parents:
+            edges.extend({'child': iri, 'parent': parents[i * len(parents) // len(iris)]}
+                         for i, iri in enumerate(iris))
+    cells = [{'iri': r['iri'], 'curie': f"CL:{i:07d}", 'name': f"fixture cell {i}"}
+             for i, r in enumerate(rows) if i % 3 == 0]
+    groups = [r['iri'] for r in rows if r['labelset'] == 'Group']
+    supertypes = [r['iri'] for r in rows if r['labelset'] == 'supertype']
+    matches = [{'group': g, 'at': supertypes[i % len(supertypes)]} for i, g in enumerate(groups)] if supertypes else []
+    return rows, edges, cells, matches
+
+
+def fixture_safe(wrapper):
+    """True if the database is empty or holds a benchmark fixture (and so may be wiped)."""
+    markers = wrapper.run_query(f"MATCH (m:{FIXTURE_MARKER}) RETURN count(m) AS n", return_type=None)[0]['n']
+    nodes = wrapper.run_query("MATCH (n) RETURN count(n) AS n", return_type=None)[0]['n']
+    return markers > 0 or nodes == 0
+
+
+def load_fixture(wrapper, batch_size=1000):
+    rows, edges, cells, matches = fixture_rows()
+    wrapper.run_query("MATCH (n) DETACH DELETE n", return_type=None)
+    wrapper.run_query(f"CREATE (:{FIXTURE_MARKER} {{created: timestamp()}})", return_type=None)
+    steps = [
+        ('''UNWIND $rows AS r
+            MERGE (ds:Individual {title: [r.dataset]})
+            MERGE (ls:Individual {label: r.labelset, label_rdfs: [r.labelset], dataset: r.dataset})
+              ON CREATE SET ls.rank = [r.labelset_rank]
+            CREATE (cc:Cell_cluster {iri: r.iri, label: r.label, label_rdfs: [r.label],
+                                     rationale_dois: ['https://doi.org/fixture']})
+            CREATE (ds)-[:annotations]->(cc)-[:has_labelset]->(ls)''', rows),
+        ('''UNWIND $rows AS r
+            MATCH (c:Cell_cluster {iri: r.child}) MATCH (p:Cell_cluster {iri: r.parent})
+            CREATE (c)-[:subcluster_of]->(p)''', edges),
+        ('''UNWIND $rows AS r
+            MATCH (cc:Cell_cluster {iri: r.iri})
+            CREATE (cc)-[:composed_primarily_of]->(:Cell:Class {curie: r.curie, label_rdfs: [r.name]})''', cells),
+        ('''UNWIND $rows AS r
+            MATCH (g:Cell_cluster {iri: r.group}) MATCH (a:Cell_cluster {iri: r.at})
+            CREATE (g)-[:exactMatch]->(a)''', matches),
+    ]
+    wrapper.run_query("CREATE INDEX fixture_cell_cluster_iri IF NOT EXISTS FOR (n:Cell_cluster) ON (n.iri)",
+                      return_type=None)
+    wrapper.run_query("CALL db.awaitIndexes()", return_type=None)
+    for query, data in steps:
+        for i in range(0, len(data), batch_size):
+            wrapper.run_query(query, {'rows': data[i:i + batch_size]}, return_type=None)
+    # Closure relationships for REPORT_BG_MAPPINGS_CLOSURE
+    subcluster_closure.build(wrapper, None, batch_size)
+    print(f"Loaded fixture: {len(rows)} cell sets, {len(edges)} subcluster_of, "
+          f"{len(cells)} CL links, {len(matches)} exactMatch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile and benchmark the named Cypher queries.")
+    parser.add_argument('--endpoint', type=str, default=DEFAULT_ENDPOINT,
+                        help='Neo4j bolt endpoint (default: the benchmark instance of `make benchmark_neo4j`)')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    parser.add_argument('--query', action='append', default=None,
+                        help="Only run these catalogue entries, e.g. named:REPORT_BG_MAPPINGS (repeatable)")
+    parser.add_argument('--baseline', type=str, default=str(BASELINE_FILE), help='Baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare results with the baseline')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Flag queries whose wall time or db hits exceed baseline by this ratio')
+    parser.add_argument('--load-fixture', action='store_true',
+                        help='Wipe the (local) database and load the fixture graph before benchmarking')
+    args = parser.parse_args()
+
+    wrapper = Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password)
+    if args.load_fixture:
+        if urlparse(args.endpoint).hostname not in LOCAL_HOSTS:
+            sys.exit("--load-fixture wipes the database and is only allowed against a local endpoint")
+        if not fixture_safe(wrapper):
+            sys.exit(f"--load-fixture refused: {args.endpoint} is not empty and holds no :{FIXTURE_MARKER} "
+                     f"node, so it is not a benchmark database")
+        load_fixture(wrapper)
+
+    queries = query_catalog.all_queries()
+    if args.query:
+        queries = {name: q for name, q in queries.items() if name in args.query}
+
+    results = {}
+    for name, query in queries.items():
+        results[name] = benchmark_query(wrapper, query, args.repeat)
+        s = results[name]
+        print(f"{name}\t{s['wall_ms_median']:.1f} ms\t{s['db_hits']} db hits\t{s['rows']} rows\t{s['result_bytes']} bytes")
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if args.compare:
+        if not baseline_path.exists():
+            sys.exit(f"No baseline at {baseline_path}; run with --update-baseline first")
+        baseline = json.loads(baseline_path.read_text())
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name}: {metric} {old} -> {new} (> x{args.threshold})", file=sys.stderr)
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({
+            'created': datetime.now(timezone.utc).isoformat(),
+            'endpoint': args.endpoint,
+            'repeat': args.repeat,
+            'queries': results,
+        }, indent=2) + '\n')
+        print(f"Baseline written to {baseline_path}")
+
+    if regressions:
+        sys.exit(f"{len(regressions)} query regression(s) against {baseline_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Content-hash incremental build for the template -> OWL pipeline (the `make all` targets).
+
+Each step is keyed on the SHA-256 of its input files, the code that produces it, its
+command line, its ROBOT prefixes and the content of any remote source it reads (the WMB
+taxonomy JSON, as held by the fetch cache). A step is skipped when its key matches the last
+successful build and its outputs are still the files that build produced; touching a file
+without changing it no longer triggers a rebuild. Independent chains (BG2WMB and
+scFAIR_WHB_WMB) run in parallel worker processes. Per-step timings are printed at the end.
+
+State is kept in .cache/build_state.json.
+
+Usage:
+    python build.py [--force] [--jobs N] [--emitter robot|python] [STEP ...]
+"""
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+# Direct import of the shared template settings
+config_path = project_root / 'src' / 'utils' / 'template_config.py'
+spec = importlib.util.spec_from_file_location('template_config', config_path)
+template_config = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(template_config)
+
+# Direct import of the fetch cache (remote source content in step keys)
+cache_path = project_root / 'src' / 'utils' / 'fetch_cache.py'
+spec = importlib.util.spec_from_file_location('fetch_cache', cache_path)
+fetch_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fetch_cache)
+
+STATE_FILE = project_root / '.cache' / 'build_state.json'
+
+BG2WMB_PREFIXES = template_config.BG2WMB_PREFIXES
+SCFAIR_PREFIXES = template_config.SCFAIR_PREFIXES
+
+
+def robot_template_cmd(template, owl, prefixes, emitter='robot'):
+    """Command converting a template to OWL with ROBOT or the native emitter (src/utils/robot_template.py)."""
+    if emitter == 'python':
+        cmd = [sys.executable, 'src/utils/robot_template.py']
+    else:
+        cmd = ['robot', 'template']
+    for prefix in prefixes:
+        cmd += ['--add-prefix', prefix]
+    return cmd + ['-t', str(template), '-o', str(owl)]
+
+
+def build_steps(emitter='robot'):
+    """Step definitions. Paths are relative to the project root.
+    Steps in one chain run in order; chains run in parallel."""
+    emitter_code = ['src/utils/robot_template.py'] if emitter == 'python' else []
+    return {
+        'bg2wmb_template': {
+            'cmd': [sys.executable, 'src/scripts/WMB_AT_map.py'],
+            'inputs': ['resources/MWB_consensus_homology.csv', 'resources/maps/cell_set_map.tsv',
+                       'resources/mouse_cc_label_iri.tsv'],
+            'code': ['src/scripts/WMB_AT_map.py', 'src/utils/fetch_cache.py', 'src/utils/label_resolver.py',
+                     'src/utils/row_delta.py', 'src/utils/template_config.py'],
+            'fetch': [template_config.WMB_TAXONOMY_URL],
+            'outputs': ['src/templates/BG2WMB_AT_map_template.tsv', 'src/templates/BG2WMB_AT_map_template.rows.json'],
+        },
+        'bg2wmb_owl': {
+            'cmd': robot_template_cmd('src/templates/BG2WMB_AT_map_template.tsv', 'owl/BG2WMB.owl',
+                                      BG2WMB_PREFIXES, emitter),
+            'inputs': ['src/templates/BG2WMB_AT_map_template.tsv'],
+            'code': emitter_code,
+            'prefixes': BG2WMB_PREFIXES,
+            'outputs': ['owl/BG2WMB.owl'],
+        },
+        'scfair_template': {
+            'cmd': [sys.executable, 'src/scripts/generate_scFAIR_WHB_WMB_template.py'],
+            'inputs': ['resources/scFAIR_Siletti_WMB_mapping/scFAIR_Siletti_AT_map.tsv'],
+            'code': ['src/scripts/generate_scFAIR_WHB_WMB_template.py'],
+            'outputs': ['src/templates/scFAIR_WHB_WMB_template.tsv'],
+        },
+        'scfair_owl': {
+            'cmd': robot_template_cmd('src/templates/scFAIR_WHB_WMB_template.tsv', 'owl/scFAIR_WHB_WMB.owl',
+                                      SCFAIR_PREFIXES, emitter),
+            'inputs': ['src/templates/scFAIR_WHB_WMB_template.tsv'],
+            'code': emitter_code,
+            'prefixes': SCFAIR_PREFIXES,
+            'outputs': ['owl/scFAIR_WHB_WMB.owl'],
+        },
+    }
+
+
+CHAINS = [
+    ['bg2wmb_template', 'bg2wmb_owl'],
+    ['scfair_template', 'scfair_owl'],
+]
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fetched_sha256(url):
+    """SHA-256 of url's current content from the fetch cache (downloading or revalidating it
+    as the step itself would), or None if it cannot be had."""
+    try:
+        return fetch_cache.FetchCache().fetch(url).name
+    except (OSError, fetch_cache.requests.RequestException) as e:
+        print(f"Warning: {url} not available for the build key ({e})", file=sys.stderr)
+        return None
+
+
+def step_key(step):
+    """Hash of everything that determines a step's outputs."""
+    h = hashlib.sha256()
+    h.update(json.dumps({'cmd': step['cmd'][1:] if step['cmd'][0] == sys.executable else step['cmd'],
+                         'prefixes': step.get('prefixes', []),
+                         'fetch': {url: fetched_sha256(url) for url in step.get('fetch', [])}}).encode())
+    for rel in step['inputs'] + step['code']:
+        h.update(rel.encode())
+        h.update(file_hash(project_root / rel).encode())
+    return h.hexdigest()
+
+
+def outputs_valid(step, recorded):
+    """True if every output exists and still has the hash recorded after the last build."""
+    hashes = recorded.get('outputs', {})
+    return all((project_root / rel).exists() and hashes.get(rel) == file_hash(project_root / rel)
+               for rel in step['outputs'])
+
+
+def run_chain(names, steps, state, force):
+    """Run the steps of one chain in order. Returns [(name, status, seconds, state entry)]."""
+    results = []
+    for name in names:
+        step = steps[name]
+        start = time.perf_counter()
+        key = step_key(step)
+        recorded = state.get(name, {})
+        if not force and recorded.get('key') == key and outputs_valid(step, recorded):
+            results.append((name, 'skipped', time.perf_counter() - start, recorded))
+            continue
+        for rel in step['outputs']:
+            (project_root / rel).parent.mkdir(parents=True, exist_ok=True)
+        proc = subprocess.run(step['cmd'], cwd=project_root, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stdout + proc.stderr)
+            results.append((name, 'failed', elapsed, None))
+            break
+        entry = {'key': key, 'outputs': {rel: file_hash(project_root / rel) for rel in step['outputs']}}
+        results.append((name, 'built', elapsed, entry))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental, parallel build of ROBOT templates and OWL files.")
+    parser.add_argument('steps', nargs='*', help=f"Steps to run (default: all). Known: {', '.join(build_steps())}")
+    parser.add_argument('--force', action='store_true', help='Rebuild even if inputs are unchanged')
+    parser.add_argument('--emitter', choices=['robot', 'python'], default='robot',
+                        help='Template to OWL converter: ROBOT or the native Python emitter')
+    parser.add_argument('--jobs', type=int, default=len(CHAINS), help='Parallel worker processes')
+    args = parser.parse_args()
+
+    steps = build_steps(args.emitter)
+    unknown = set(args.steps) - set(steps)
+    if unknown:
+        parser.error(f"Unknown step(s): {', '.join(sorted(unknown))}")
+    chains = [[n for n in chain if not args.steps or n in args.steps] for chain in CHAINS]
+    chains = [chain for chain in chains if chain]
+
+    state = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(run_chain, chain, steps, state, args.force) for chain in chains]
+        results = [r for f in futures for r in f.result()]
+
+    for name, status, _, entry in results:
+        if status == 'built':
+            state[name] = entry
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(json.dumps(state, indent=2))
+
+    print(f"{'step':<20}{'status':<10}{'seconds':>8}")
+    for name, status, elapsed, _ in results:
+        print(f"{name:<20}{status:<10}{elapsed:>8.2f}")
+    print(f"{'total':<30}{time.perf_counter() - start:>8.2f}")
+    if any(status == 'failed' for _, status, _, _ in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Build the cross-species consensus table from the MapMyCells columns of the homology sheet.
+
+Outputs:
+    resources/homology_consensus.tsv   one row per Group: reciprocal hits, majority labels and
+                                       agreement for each reference and level
+    --votes FILE                       optional long table of per-label species votes
+
+Groups whose hand-supplied reciprocal_hits_* lists differ from the computed ones are reported.
+
+Usage:
+    python build_homology_consensus.py [-i resources/MWB_consensus_homology.csv] [-o OUT] [--votes FILE]
+"""
+import argparse
+import sys
+import pandas as pd
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+# Direct import of the consensus engine
+consensus_path = project_root / 'src' / 'utils' / 'homology_consensus.py'
+spec = importlib.util.spec_from_file_location('homology_consensus', consensus_path)
+homology_consensus = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(homology_consensus)
+
+DEFAULT_INPUT = project_root / 'resources' / 'MWB_consensus_homology.csv'
+DEFAULT_OUTPUT = project_root / 'resources' / 'homology_consensus.tsv'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-species consensus and reciprocal hits per Group.")
+    parser.add_argument('-i', '--input', type=str, default=str(DEFAULT_INPUT), help='Consensus homology CSV')
+    parser.add_argument('-o', '--output', type=str, default=str(DEFAULT_OUTPUT), help='Consensus table TSV')
+    parser.add_argument('--votes', type=str, default=None, help='Also write per-label votes (long TSV)')
+    args = parser.parse_args(argv)
+
+    homology = pd.read_csv(args.input, dtype=str)
+    votes = homology_consensus.label_votes(homology_consensus.explode_lists(homology))
+    summary = homology_consensus.consensus(votes)
+
+    table = homology_consensus.consensus_table(homology, summary)
+    table.to_csv(args.output, sep='\t', index=False)
+    if args.votes:
+        votes.to_csv(args.votes, sep='\t', index=False)
+
+    mismatched = summary[~summary['supplied_match']]
+    for row in mismatched.itertuples():
+        print(f"Warning: {row.Group} {row.reference} {row.level}: supplied reciprocal hits differ "
+              f"from computed '{row.reciprocal}'", file=sys.stderr)
+    print(f"Wrote consensus for {len(table)} groups to {args.output} "
+          f"(mean agreement {summary['agreement'].mean():.2f}, {len(mismatched)} supplied mismatches)")
+
+
+if __name__ == '__main__':
+    main()
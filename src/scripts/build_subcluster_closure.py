@@ -0,0 +1,176 @@
+"""
+Precompute the subcluster_of transitive closure for each taxonomy and store it in the KG.
+
+Every Cell_cluster annotated by a taxonomy gets a [:subcluster_of_closure {depth}] relationship
+to itself (depth 0) and to every Cell_cluster reachable over [:subcluster_of] (depth = shortest
+path length). Hierarchy queries can then match a single relationship instead of expanding
+[:subcluster_of*0..] paths (see Neo4jNamedQueries.REPORT_BG_MAPPINGS_CLOSURE).
+
+Usage:
+    python build_subcluster_closure.py [--taxonomy TITLE ...] [--verify]
+
+With --verify nothing is written; the stored closure is compared against a live
+[:subcluster_of*0..] expansion and the script exits non-zero on any difference.
+
+With --bump-build a rebuild also writes a new build id to the KG's :KG_build node (see
+src/utils/query_cache.py), so cached query results and kg_snapshot.py see it.
+"""
+
+import argparse
+import sys
+from collections import defaultdict, deque
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+# Direct import of neo4j wrapper
+wrapper_path = project_root / 'src' / 'utils' / 'neo4j_bolt_wrapper.py'
+spec = importlib.util.spec_from_file_location('neo4j_bolt_wrapper', wrapper_path)
+neo4j_wrapper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neo4j_wrapper)
+Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
+
+# Direct import of the query cache (for its KG build marker)
+cache_path = project_root / 'src' / 'utils' / 'query_cache.py'
+spec = importlib.util.spec_from_file_location('query_cache', cache_path)
+query_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_cache)
+
+CLOSURE_REL = 'subcluster_of_closure'
+
+TAXONOMY_CLUSTERS_QUERY = '''
+MATCH (tax:Individual)-[:annotations]->(cc:Cell_cluster)
+WHERE $taxonomies IS NULL OR ANY(t IN tax.title WHERE t IN $taxonomies)
+RETURN tax.title[0] AS taxonomy, collect(DISTINCT cc.iri) AS clusters
+'''
+
+SUBCLUSTER_EDGES_QUERY = '''
+MATCH (child:Cell_cluster)-[:subcluster_of]->(parent:Cell_cluster)
+RETURN child.iri AS child, parent.iri AS parent
+'''
+
+DELETE_CLOSURE_QUERY = f'''
+UNWIND $iris AS iri
+MATCH (:Cell_cluster {{iri: iri}})-[r:{CLOSURE_REL}]->()
+DELETE r
+'''
+
+CREATE_CLOSURE_QUERY = f'''
+UNWIND $rows AS row
+MATCH (c:Cell_cluster {{iri: row.child}})
+MATCH (a:Cell_cluster {{iri: row.ancestor}})
+CREATE (c)-[:{CLOSURE_REL} {{depth: row.depth}}]->(a)
+'''
+
+LIVE_ANCESTORS_QUERY = '''
+UNWIND $iris AS iri
+MATCH (c:Cell_cluster {iri: iri})-[:subcluster_of*0..]->(a:Cell_cluster)
+RETURN c.iri AS child, collect(DISTINCT a.iri) AS ancestors
+'''
+
+STORED_ANCESTORS_QUERY = f'''
+UNWIND $iris AS iri
+MATCH (c:Cell_cluster {{iri: iri}})-[:{CLOSURE_REL}]->(a:Cell_cluster)
+RETURN c.iri AS child, collect(DISTINCT a.iri) AS ancestors
+'''
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def ancestor_closure(clusters, parents):
+    """Breadth-first closure over the parent map.
+    Returns {cluster: {ancestor: depth}} including each cluster itself at depth 0."""
+    closure = {}
+    for cc in clusters:
+        depths = {cc: 0}
+        queue = deque([cc])
+        while queue:
+            node = queue.popleft()
+            for parent in parents.get(node, ()):
+                if parent not in depths:
+                    depths[parent] = depths[node] + 1
+                    queue.append(parent)
+        closure[cc] = depths
+    return closure
+
+
+def fetch_taxonomy_clusters(wrapper, taxonomies):
+    rows = wrapper.run_query(TAXONOMY_CLUSTERS_QUERY, {'taxonomies': taxonomies}, return_type=None)
+    return {row['taxonomy']: row['clusters'] for row in rows}
+
+
+def fetch_parents(wrapper):
+    parents = defaultdict(list)
+    for row in wrapper.stream_query(SUBCLUSTER_EDGES_QUERY):
+        parents[row['child']].append(row['parent'])
+    return parents
+
+
+def build(wrapper, taxonomies, batch_size, bump=False):
+    parents = fetch_parents(wrapper)
+    for taxonomy, clusters in fetch_taxonomy_clusters(wrapper, taxonomies).items():
+        closure = ancestor_closure(clusters, parents)
+        for batch in chunks(clusters, batch_size):
+            wrapper.run_query(DELETE_CLOSURE_QUERY, {'iris': batch}, return_type=None)
+        rows = [{'child': cc, 'ancestor': anc, 'depth': depth}
+                for cc, depths in closure.items() for anc, depth in depths.items()]
+        for batch in chunks(rows, batch_size):
+            wrapper.run_query(CREATE_CLOSURE_QUERY, {'rows': batch}, return_type=None)
+        print(f"{taxonomy}: stored {len(rows)} closure relationships for {len(clusters)} cell sets")
+    if bump:
+        # A rebuild can leave counts unchanged; move the fingerprint that cached reads are keyed by
+        query_cache.bump_build(wrapper, 'build_subcluster_closure')
+
+
+def verify(wrapper, taxonomies, batch_size):
+    """Compare stored closure with a live [:subcluster_of*0..] expansion. Returns number of mismatching cell sets."""
+    mismatched = 0
+    for taxonomy, clusters in fetch_taxonomy_clusters(wrapper, taxonomies).items():
+        bad = []
+        for batch in chunks(clusters, batch_size):
+            live = {r['child']: set(r['ancestors'])
+                    for r in wrapper.stream_query(LIVE_ANCESTORS_QUERY, {'iris': batch})}
+            stored = {r['child']: set(r['ancestors'])
+                      for r in wrapper.stream_query(STORED_ANCESTORS_QUERY, {'iris': batch})}
+            for cc in batch:
+                expected, found = live.get(cc, set()), stored.get(cc, set())
+                if expected != found:
+                    bad.append((cc, expected - found, found - expected))
+        status = 'OK' if not bad else f'{len(bad)} mismatching cell sets'
+        print(f"{taxonomy}: {len(clusters)} cell sets checked, {status}")
+        for cc, missing, extra in bad[:20]:
+            print(f"  {cc}: missing={sorted(missing)} extra={sorted(extra)}", file=sys.stderr)
+        mismatched += len(bad)
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialise the subcluster_of transitive closure per taxonomy.")
+    parser.add_argument('--taxonomy', action='append', default=None,
+                        help='Taxonomy title to process (repeatable; default: all taxonomies)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check the stored closure against the live subcluster_of graph instead of building it')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per UNWIND batch')
+    parser.add_argument('--bump-build', action='store_true',
+                        help='Write a new build id to the :KG_build node after the rebuild (for query caches)')
+    parser.add_argument('--endpoint', type=str, default='bolt://localhost:7687', help='Neo4j bolt endpoint')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    args = parser.parse_args()
+
+    wrapper = Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password)
+    if args.verify:
+        if verify(wrapper, args.taxonomy, args.batch_size):
+            sys.exit("Closure does not match subcluster_of graph")
+    else:
+        build(wrapper, args.taxonomy, args.batch_size, args.bump_build)
+
+
+if __name__ == '__main__':
+    main()
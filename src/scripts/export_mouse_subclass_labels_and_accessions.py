@@ -19,32 +19,69 @@ neo4j_wrapper = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(neo4j_wrapper)
 Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
 
+# Arrow/Parquet output (pyarrow is imported only when requested)
+arrow_path = project_root / 'src' / 'utils' / 'arrow_export.py'
+spec = importlib.util.spec_from_file_location('arrow_export', arrow_path)
+arrow_export = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(arrow_export)
+
+# Query result cache
+cache_path = project_root / 'src' / 'utils' / 'query_cache.py'
+spec = importlib.util.spec_from_file_location('query_cache', cache_path)
+query_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_cache)
+
+# Stage timing (--profile)
+instrumentation_path = project_root / 'src' / 'utils' / 'instrumentation.py'
+spec = importlib.util.spec_from_file_location('instrumentation', instrumentation_path)
+instrumentation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(instrumentation)
+
 # Define paths directly
 CYPHER_DIR = project_root / 'src' / 'cypher'
 
 CY_FILE = CYPHER_DIR / 'export_mouse_subclass_labels_and_accessions.cypher'
 
 
-def main():
+def main(argv=None, wrapper=None):
     parser = argparse.ArgumentParser(description="Export mouse subclass labels and accessions from Neo4j.")
     parser.add_argument('-o', '--output', type=str, default=None, help='Output TSV file path')
-    args = parser.parse_args()
+    parser.add_argument('--format', choices=['tsv'] + list(arrow_export.FORMATS), default='tsv',
+                        help='Output format (parquet/arrow replace the output suffix)')
+    query_cache.add_cache_arguments(parser)
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profiler = instrumentation.profiler_from_args(args, 'export_mouse_subclass_labels')
 
     out_file = Path(args.output) if args.output else (project_root / 'resources/mouse_cc_label_iri.tsv')
 
     with open(CY_FILE, 'r') as f:
         cypher = f.read()
 
-    # Use Neo4jBoltQueryWrapper to run query
-    wrapper = Neo4jBoltQueryWrapper("bolt://localhost:7687", test_connection=True)
-    results = wrapper.run_query(cypher, return_type=None)
+    # Use Neo4jBoltQueryWrapper to stream the query results
+    if wrapper is None:
+        wrapper = Neo4jBoltQueryWrapper("bolt://localhost:7687", test_connection=True,
+                                        cache=query_cache.cache_from_args(args))
+    results = wrapper.stream_query(cypher)
 
-    # Expecting results as list of dicts with 'label' and 'accession'
-    with open(out_file, 'w') as out:
-        out.write('label\taccession\n')
-        for row in results:
-            out.write(f"{row['label']}\t{row['accession']}\n")
-    print(f"Exported {len(results)} rows to {out_file}")
+    try:
+        with profiler.stage('query_write') as st:
+            if args.format != 'tsv':
+                out_file = arrow_export.output_path(out_file, args.format)
+                n = arrow_export.write_records(results, out_file, args.format,
+                                               arrow_export.known_schema('mouse_subclass_labels'))
+            else:
+                # Expecting results as dicts with 'label' and 'accession'
+                n = 0
+                with open(out_file, 'w') as out:
+                    out.write('label\taccession\n')
+                    for row in results:
+                        out.write(f"{row['label']}\t{row['accession']}\n")
+                        n += 1
+            st.rows, st.path = n, out_file
+    finally:
+        profiler.finish()
+    print(f"Exported {n} rows to {out_file}")
 
 if __name__ == '__main__':
     main()
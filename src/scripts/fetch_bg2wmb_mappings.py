@@ -1,11 +1,18 @@
-import requests
+import argparse
 import sys
 from pathlib import Path
+import importlib.util
 
 # Find project root
 script_dir = Path(__file__).resolve().parent
 project_root = script_dir.parent.parent
 
+# Direct import of the shared fetch cache
+cache_path = project_root / 'src' / 'utils' / 'fetch_cache.py'
+spec = importlib.util.spec_from_file_location('fetch_cache', cache_path)
+fetch_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fetch_cache)
+
 # Google Sheet ID and GID
 SHEET_ID = "1NwO-_BQumtfVYcTNP--vRa5434Elvj5me1oEKV1Q-gE"
 GID = "1470945829"
@@ -15,10 +22,17 @@ CSV_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&
 OUT_PATH = project_root / "resources" / "MWB_consensus_homology.csv"
 
 def main():
+    parser = argparse.ArgumentParser(description="Download the consensus homology sheet via the local fetch cache.")
+    parser.add_argument('--offline', action='store_true', help='Use only the local fetch cache, no network access')
+    args = parser.parse_args()
     try:
-        resp = requests.get(CSV_URL)
-        resp.raise_for_status()
-        OUT_PATH.write_bytes(resp.content)
+        # Always revalidate: this target exists to pick up sheet edits
+        content = fetch_cache.FetchCache(offline=args.offline or None).fetch_bytes(CSV_URL, refresh=True)
+        # Only rewrite the file when the sheet changed, so make does not rebuild the template needlessly
+        if OUT_PATH.exists() and OUT_PATH.read_bytes() == content:
+            print(f"{OUT_PATH} is up to date")
+            return
+        OUT_PATH.write_bytes(content)
         print(f"Downloaded and saved to {OUT_PATH}")
     except Exception as e:
         print(f"Error downloading sheet: {e}", file=sys.stderr)
@@ -12,8 +12,9 @@ import pandas as pd
 from pathlib import Path
 
 # File paths
-input_path = Path('resources/scFAIR_Siletti_WMB_mapping/scFAIR_Siletti_AT_map.tsv')
-output_path = Path('src/templates/scFAIR_WHB_WMB_template.tsv')
+project_root = Path(__file__).resolve().parents[2]
+input_path = project_root / 'resources' / 'scFAIR_Siletti_WMB_mapping' / 'scFAIR_Siletti_AT_map.tsv'
+output_path = project_root / 'src' / 'templates' / 'scFAIR_WHB_WMB_template.tsv'
 
 def main():
     # Read the input TSV
@@ -0,0 +1,355 @@
+"""
+Snapshot the taxonomy subgraph of the KG into a local embedded database (SQLite, or DuckDB
+for a .duckdb path) so heavy analytical joins can run without the Neo4j server.
+
+Tables (one row per node or relationship, keyed by Neo4j internal id):
+    datasets, cell_sets, labelsets, cells          nodes
+    annotations, has_labelset, subcluster_of,      relationships (ids of both ends)
+    matches (exact/related/broadMatch), cl_links
+plus the view cell_set_map (same rows as src/cypher/cell_set_map.cypher) and snapshot_meta.
+
+Each table is read with keyset pagination on id(): its id range is split into --workers
+slices, each paged through in its own session (WHERE id(x) > $after ... ORDER BY id(x)
+LIMIT $page_size), so no transaction holds a large sorted result. List values are stored as
+JSON text.
+
+Refresh is incremental. The KG fingerprint (see src/utils/query_cache.py) is stored with the
+snapshot. When the KG carries a KG_build marker the fingerprint is its build id, which
+load_mappings.py and build_subcluster_closure.py renew when run with --bump-build: an
+unchanged build id means nothing is read, a new one reloads every table. Without the marker
+each table's stored (count, min id, max id) signature is compared with the KG: tables with
+the same signature are skipped, tables that only gained ids above the old maximum are
+extended from there, and the rest are reloaded. This costs one aggregate query per table,
+but a property edit or a swapped edge that keeps the counts and id range is not seen.
+--verify closes that gap at the price of a full read: the rows up to the old maximum id are
+read back and their content checksum (an order-independent sum of per-row hashes) compared
+with the stored one, and a table is only reused if it matches. Use it, or --force, after
+editing a KG that has no KG_build marker.
+
+DuckDB is only needed for .duckdb snapshots:
+    pip install duckdb
+
+Usage:
+    python kg_snapshot.py --endpoint bolt://HOST:PORT [--db .cache/kg_snapshot.sqlite] [--workers N]
+                          [--page-size N] [--force | --verify]
+    python kg_snapshot.py --db .cache/kg_snapshot.sqlite --sql "SELECT count(*) FROM cell_sets"
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+# Direct import of neo4j wrapper
+wrapper_path = project_root / 'src' / 'utils' / 'neo4j_bolt_wrapper.py'
+spec = importlib.util.spec_from_file_location('neo4j_bolt_wrapper', wrapper_path)
+neo4j_wrapper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neo4j_wrapper)
+Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
+
+# KG fingerprint
+cache_path = project_root / 'src' / 'utils' / 'query_cache.py'
+spec = importlib.util.spec_from_file_location('query_cache', cache_path)
+query_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_cache)
+
+DEFAULT_DB = project_root / '.cache' / 'kg_snapshot.sqlite'
+DEFAULT_WORKERS = 4
+DEFAULT_PAGE_SIZE = 5000
+CHECKSUM_MOD = 1 << 64
+
+# name: (pattern, extra predicate, key variable, [(column, SQL type, Cypher expression)])
+TABLES = {
+    'datasets': ('(n:Individual)', '(n)-[:annotations]->(:Cell_cluster)', 'n', [
+        ('node_id', 'BIGINT', 'id(n)'), ('iri', 'TEXT', 'n.iri'), ('title', 'TEXT', 'n.title[0]')]),
+    'cell_sets': ('(n:Cell_cluster)', None, 'n', [
+        ('node_id', 'BIGINT', 'id(n)'), ('iri', 'TEXT', 'n.iri'), ('curie', 'TEXT', 'n.curie'),
+        ('label', 'TEXT', 'n.label'), ('label_rdfs', 'TEXT', 'n.label_rdfs[0]'),
+        ('rationale_dois', 'TEXT', 'n.rationale_dois')]),
+    'labelsets': ('(n:Individual)', '(:Cell_cluster)-[:has_labelset]->(n)', 'n', [
+        ('node_id', 'BIGINT', 'id(n)'), ('iri', 'TEXT', 'n.iri'), ('label', 'TEXT', 'n.label'),
+        ('rank', 'BIGINT', 'n.rank[0]')]),
+    'cells': ('(n:Cell)', '(:Cell_cluster)-[:composed_primarily_of]->(n)', 'n', [
+        ('node_id', 'BIGINT', 'id(n)'), ('iri', 'TEXT', 'n.iri'), ('curie', 'TEXT', 'n.curie'),
+        ('label', 'TEXT', 'n.label_rdfs[0]')]),
+    'annotations': ('(s:Individual)-[r:annotations]->(o:Cell_cluster)', None, 'r', [
+        ('rel_id', 'BIGINT', 'id(r)'), ('dataset_id', 'BIGINT', 'id(s)'), ('cell_set_id', 'BIGINT', 'id(o)')]),
+    'has_labelset': ('(s:Cell_cluster)-[r:has_labelset]->(o:Individual)', None, 'r', [
+        ('rel_id', 'BIGINT', 'id(r)'), ('cell_set_id', 'BIGINT', 'id(s)'), ('labelset_id', 'BIGINT', 'id(o)')]),
+    'subcluster_of': ('(s:Cell_cluster)-[r:subcluster_of]->(o:Cell_cluster)', None, 'r', [
+        ('rel_id', 'BIGINT', 'id(r)'), ('child_id', 'BIGINT', 'id(s)'), ('parent_id', 'BIGINT', 'id(o)')]),
+    'matches': ('(s:Cell_cluster)-[r]->(o:Cell_cluster)',
+                "type(r) IN ['exactMatch', 'relatedMatch', 'broadMatch']", 'r', [
+        ('rel_id', 'BIGINT', 'id(r)'), ('subject_id', 'BIGINT', 'id(s)'), ('object_id', 'BIGINT', 'id(o)'),
+        ('rel', 'TEXT', 'type(r)'), ('confidence', 'DOUBLE', 'r.confidence')]),
+    'cl_links': ('(s:Cell_cluster)-[r:composed_primarily_of]->(o:Cell)', None, 'r', [
+        ('rel_id', 'BIGINT', 'id(r)'), ('cell_set_id', 'BIGINT', 'id(s)'), ('cell_id', 'BIGINT', 'id(o)')]),
+}
+
+CELL_SET_MAP_VIEW = '''
+CREATE VIEW cell_set_map AS
+SELECT d.title AS dataset, l.label AS labelset, l.rank AS labelset_rank, c.label AS label, c.iri AS iri
+FROM annotations a
+JOIN datasets d ON d.node_id = a.dataset_id
+JOIN cell_sets c ON c.node_id = a.cell_set_id
+JOIN has_labelset h ON h.cell_set_id = c.node_id
+JOIN labelsets l ON l.node_id = h.labelset_id
+'''
+
+
+def where_clause(table, *conditions):
+    _, predicate, _, _ = TABLES[table]
+    return ' AND '.join(c for c in (predicate,) + conditions if c) or 'true'
+
+
+def signature_query(table):
+    pattern, _, key, _ = TABLES[table]
+    return (f'MATCH {pattern} WHERE {where_clause(table)} '
+            f'RETURN count({key}) AS n, min(id({key})) AS lo, max(id({key})) AS hi')
+
+
+def page_query(table):
+    pattern, _, key, columns = TABLES[table]
+    returns = ', '.join(f'{expr} AS {name}' for name, _, expr in columns)
+    return (f'MATCH {pattern} WHERE {where_clause(table, f"id({key}) > $after", f"id({key}) <= $upto")} '
+            f'RETURN {returns} ORDER BY id({key}) LIMIT $limit')
+
+
+def id_ranges(lo, hi, n):
+    """Split ids lo..hi into up to n (after, upto] slices."""
+    if lo is None:
+        return []
+    step = max(1, -(-(hi - lo + 1) // max(1, n)))
+    return [(start - 1, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+def row_checksum(row):
+    """64-bit hash of one row; table checksums are sums of these modulo CHECKSUM_MOD."""
+    digest = hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def sql_value(value):
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+
+
+class SnapshotStore:
+    """Thin wrapper over a sqlite3 or DuckDB connection; writes are serialised by a lock."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.suffix == '.duckdb':
+            try:
+                import duckdb
+            except ImportError as e:
+                raise ImportError("DuckDB snapshots require duckdb (pip install duckdb); "
+                                  "use a .sqlite path for SQLite") from e
+            self.con = duckdb.connect(str(self.path))
+        else:
+            import sqlite3
+            self.con = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.con.execute('CREATE TABLE IF NOT EXISTS snapshot_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def get_meta(self, key):
+        row = self.con.execute('SELECT value FROM snapshot_meta WHERE key = ?', [key]).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.con.execute('DELETE FROM snapshot_meta WHERE key = ?', [key])
+            self.con.execute('INSERT INTO snapshot_meta VALUES (?, ?)', [key, json.dumps(value)])
+
+    def reset_table(self, table):
+        columns = ', '.join(f'{name} {sql_type}' for name, sql_type, _ in TABLES[table][3])
+        with self.lock:
+            self.con.execute('DROP VIEW IF EXISTS cell_set_map')
+            self.con.execute(f'DROP TABLE IF EXISTS {table}')
+            self.con.execute(f'CREATE TABLE {table} ({columns})')
+
+    def insert(self, table, rows):
+        columns = [name for name, _, _ in TABLES[table][3]]
+        sql = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})"
+        with self.lock:
+            self.con.executemany(sql, [[sql_value(row[c]) for c in columns] for row in rows])
+
+    def commit(self):
+        # DuckDB connections autocommit
+        if self.path.suffix != '.duckdb':
+            with self.lock:
+                self.con.commit()
+
+    def finish(self):
+        self.con.execute('DROP VIEW IF EXISTS cell_set_map')
+        self.con.execute(CELL_SET_MAP_VIEW)
+        self.commit()
+
+    def close(self):
+        self.con.close()
+
+
+def export_range(driver, store, table, after, upto, page_size):
+    """Keyset-page one id slice of table into the store (only hash it if store is None).
+    Returns (rows read, content checksum)."""
+    query = page_query(table)
+    key_column = TABLES[table][3][0][0]
+    n = 0
+    checksum = 0
+    with driver.session() as session:
+        while True:
+            rows = [r.data() for r in session.run(query, {'after': after, 'upto': upto, 'limit': page_size})]
+            if rows:
+                if store is not None:
+                    store.insert(table, rows)
+                n += len(rows)
+                checksum = (checksum + sum(row_checksum(row) for row in rows)) % CHECKSUM_MOD
+                after = rows[-1][key_column]
+            if len(rows) < page_size:
+                return n, checksum
+
+
+def verify_range(old, new):
+    """(lo, hi) of the ids whose rows must be re-hashed to reuse a table, or None if it cannot
+    be reused. An empty range (None, None) means an empty table that is still empty."""
+    if not old or old.get('checksum') is None:
+        return None
+    if old['lo'] is None:
+        return (None, None) if new['lo'] is None else None
+    if old['lo'] == new['lo'] and new['hi'] is not None and new['hi'] >= old['hi']:
+        return (old['lo'], old['hi'])
+    return None
+
+
+def refresh_plan(old, new, full, checksum=None, verify=False):
+    """'skip', ('append', after) or 'reload' for a table given its old and new signatures.
+    With verify, checksum is that of the table's current rows over verify_range(old, new)
+    (None if they could not be read back) and must match the stored one."""
+    if full or not old:
+        return 'reload'
+    if verify and (checksum is None or checksum != old.get('checksum')):
+        return 'reload'
+    if (old['n'], old['lo'], old['hi']) == (new['n'], new['lo'], new['hi']):
+        return 'skip'
+    if old['hi'] is not None and old['lo'] == new['lo'] and new['hi'] > old['hi']:
+        return ('append', old['hi'])
+    return 'reload'
+
+
+def snapshot(wrapper, store, workers=DEFAULT_WORKERS, page_size=DEFAULT_PAGE_SIZE, force=False, verify=False):
+    """Refresh the snapshot. Returns {table: (action, rows copied)}.
+    verify re-reads and checksums the stored rows of each table before reusing it."""
+    fingerprint = query_cache.kg_fingerprint(wrapper)
+    previous = store.get_meta('fingerprint')
+    # Only a build id vouches for the content; equal counts do not
+    if previous == fingerprint and fingerprint.startswith('build:') and not (force or verify):
+        return {}
+    # A new build reloads everything; ids are not stable across builds
+    full = force or previous is None or fingerprint.startswith('build:') or previous.startswith('build:')
+    signatures = store.get_meta('signatures') or {}
+    driver = wrapper.driver
+    report = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+
+        def copy(table, lo, hi, target=store):
+            """(rows, checksum) of ids lo..hi, written to target unless it is None."""
+            futures = [pool.submit(export_range, driver, target, table, after, upto, page_size)
+                       for after, upto in id_ranges(lo, hi, workers)]
+            results = [f.result() for f in futures]
+            return sum(n for n, _ in results), sum(c for _, c in results) % CHECKSUM_MOD
+
+        def reload(table, signature):
+            # Forget the table's signature first, so an interrupted reload is redone next time
+            signatures.pop(table, None)
+            store.set_meta('signatures', signatures)
+            store.reset_table(table)
+            store.commit()
+            return copy(table, signature['lo'], signature['hi'])
+
+        for table in TABLES:
+            with driver.session() as session:
+                new = session.run(signature_query(table)).single().data()
+            old = signatures.get(table)
+            checksum = None
+            span = verify_range(old, new) if verify and not full else None
+            if span is not None:
+                _, checksum = copy(table, span[0], span[1], target=None)
+            plan = refresh_plan(old, new, full, checksum, verify)
+            if plan == 'skip':
+                report[table] = ('unchanged', 0)
+                continue
+            if plan == 'reload':
+                copied, new['checksum'] = reload(table, new)
+                report[table] = ('reloaded', copied)
+            else:
+                copied, added = copy(table, plan[1] + 1, new['hi'])
+                if old['n'] + copied == new['n']:
+                    new['checksum'] = (None if old.get('checksum') is None
+                                       else (old['checksum'] + added) % CHECKSUM_MOD)
+                    report[table] = ('appended', copied)
+                else:
+                    # Rows were also removed or renumbered below the old maximum
+                    copied, new['checksum'] = reload(table, new)
+                    report[table] = ('reloaded', copied)
+            signatures[table] = new
+            store.set_meta('signatures', signatures)
+            store.commit()
+    store.set_meta('fingerprint', fingerprint)
+    store.set_meta('refreshed', time.strftime('%Y-%m-%dT%H:%M:%S'))
+    store.finish()
+    return report
+
+
+def run_sql(store, sql):
+    cursor = store.con.execute(sql)
+    writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+    writer.writerow([d[0] for d in cursor.description])
+    writer.writerows(cursor.fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the KG taxonomy subgraph into SQLite or DuckDB.")
+    parser.add_argument('--db', type=str, default=str(DEFAULT_DB), help='Snapshot file (.sqlite, or .duckdb for DuckDB)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Parallel sessions per table')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help='Rows per keyset page')
+    parser.add_argument('--force', action='store_true', help='Reload every table even if the KG is unchanged')
+    parser.add_argument('--verify', action='store_true',
+                        help='Checksum the stored rows of each table against the KG before reusing it')
+    parser.add_argument('--sql', type=str, default=None, help='Run a query against the snapshot and print TSV')
+    parser.add_argument('--endpoint', type=str, default=None, help='Neo4j bolt endpoint (required unless --sql)')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.db)
+    try:
+        if args.sql:
+            run_sql(store, args.sql)
+            return
+        if not args.endpoint:
+            parser.error('--endpoint is required to refresh the snapshot')
+        wrapper = Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password)
+        start = time.perf_counter()
+        report = snapshot(wrapper, store, args.workers, args.page_size, args.force, args.verify)
+        if not report:
+            print(f"Snapshot {args.db} is up to date")
+            return
+        for table, (action, rows) in report.items():
+            print(f"{table:<16}{action:<11}{rows:>10}")
+        print(f"Snapshot written to {args.db} in {time.perf_counter() - start:.1f}s")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
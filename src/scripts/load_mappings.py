@@ -0,0 +1,273 @@
+"""
+Load cross-taxonomy mapping templates straight into the KG, without a pipeline rebuild.
+
+Reads ROBOT mapping templates (BG2WMB_AT_map_template.tsv, scFAIR_WHB_WMB_template.tsv)
+and upserts their skos exactMatch / relatedMatch / broadMatch annotations as relationships
+between the Cell_cluster nodes they connect, e.g. (BG group)-[:exactMatch]->(WMB cell set).
+An n2o:Confidence axiom annotation on a mapping is stored as the relationship's confidence.
+CURIEs are expanded with the template's ROBOT prefixes, except that WMB: points at the
+/ontology/CCN20230722/ IRIs the KG's WMB nodes have (template_config.kg_prefixes).
+
+Writes are parameterised UNWIND batches, one managed transaction per batch. Every
+relationship written is stamped with its source (the template file name) and a load id;
+afterwards, relationships from the same source that were not part of this load (mappings
+dropped from the template) are deleted. Edges from other sources, e.g. those the neo4j2owl
+pipeline loads, are never touched. An empty template is refused unless --allow-empty is
+given, in which case every edge from that source is removed.
+
+With --delta, only the mappings added and removed by the last `WMB_AT_map.py --diff` run
+(<template>.delta.json, see src/utils/row_delta.py) are upserted and deleted. A delta is only
+applied on top of the template state it was computed from (its previous_sha256 must match
+<template>.loaded.json); loading the BG2WMB template, fully or by delta, updates that record.
+
+With --bump-build a new build id is written to the KG's :KG_build node after loading (see
+src/utils/query_cache.py), so cached query results and kg_snapshot.py see edits that leave
+node and relationship counts unchanged.
+
+Usage:
+    python load_mappings.py [--template bg2wmb|scfair|PATH ...] [--batch-size N] [--dry-run]
+    python load_mappings.py --delta src/templates/BG2WMB_AT_map_template.delta.json
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+neo4j_wrapper = load_module('neo4j_bolt_wrapper', project_root / 'src' / 'utils' / 'neo4j_bolt_wrapper.py')
+robot_template = load_module('robot_template', project_root / 'src' / 'utils' / 'robot_template.py')
+row_delta = load_module('row_delta', project_root / 'src' / 'utils' / 'row_delta.py')
+query_cache = load_module('query_cache', project_root / 'src' / 'utils' / 'query_cache.py')
+template_config = load_module('template_config', project_root / 'src' / 'utils' / 'template_config.py')
+Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
+
+SKOS = 'http://www.w3.org/2004/02/skos/core#'
+MAPPING_PROPERTIES = {SKOS + 'exactMatch': 'exactMatch',
+                      SKOS + 'relatedMatch': 'relatedMatch',
+                      SKOS + 'broadMatch': 'broadMatch'}
+CONFIDENCE_PROPERTY = 'http://n2o.neo/property/custom#Confidence'
+
+TEMPLATES = {
+    'bg2wmb': (template_config.BG2WMB_TEMPLATE, template_config.kg_prefixes(template_config.BG2WMB_PREFIXES)),
+    'scfair': (template_config.SCFAIR_TEMPLATE, template_config.kg_prefixes(template_config.SCFAIR_PREFIXES)),
+}
+
+# Templates whose loaded state is recorded for deltas: name -> mapping columns
+DELTA_TEMPLATES = {template_config.BG2WMB_TEMPLATE.name: template_config.BG2WMB_MATCH_COLUMNS}
+
+# Relationship types cannot be parameterised, so there is one upsert query per type
+UPSERT_QUERY = '''
+UNWIND $rows AS row
+MATCH (s:Cell_cluster {{iri: row.subject}})
+MATCH (o:Cell_cluster {{iri: row.object}})
+MERGE (s)-[r:{rel}]->(o)
+SET r.iri = $property_iri, r.short_form = $rel, r.type = 'Annotation',
+    r.confidence = row.confidence, r.source = $source, r.load_id = $load_id
+RETURN count(r) AS written
+'''
+
+DELETE_STALE_QUERY = '''
+MATCH (:Cell_cluster)-[r]->(:Cell_cluster)
+WHERE type(r) IN $rels AND r.source = $source AND r.load_id <> $load_id
+WITH r LIMIT $limit
+DELETE r
+RETURN count(r) AS deleted
+'''
+
+
+DELETE_QUERY = '''
+UNWIND $rows AS row
+MATCH (s:Cell_cluster {{iri: row.subject}})-[r:{rel}]->(o:Cell_cluster {{iri: row.object}})
+WHERE r.source = $source
+DELETE r
+RETURN count(r) AS deleted
+'''
+
+
+def mapping_rows(entities):
+    """Flatten template entities to {'rel', 'property_iri', 'subject', 'object', 'confidence'} rows."""
+    for entity in entities:
+        for prop, value, is_iri, _, _, axioms in entity['annotations']:
+            if prop not in MAPPING_PROPERTIES or not is_iri:
+                continue
+            confidence = next((float(v) for p, v, *_ in axioms if p == CONFIDENCE_PROPERTY), None)
+            yield {'rel': MAPPING_PROPERTIES[prop], 'property_iri': prop,
+                   'subject': entity['id'], 'object': value, 'confidence': confidence}
+
+
+def template_rows(path, prefixes):
+    """Mapping rows from a template TSV."""
+    return list(mapping_rows(robot_template.read_template(path, robot_template.parse_prefixes(prefixes))))
+
+
+def delta_rows(delta, prefixes):
+    """(added, removed) mapping rows from a row_delta delta, with CURIEs expanded by prefixes."""
+    prefixes = robot_template.parse_prefixes(prefixes)
+    added, removed = [], []
+    for subject, change in delta['rows'].items():
+        for key, rows in (('added', added), ('removed', removed)):
+            for mapping in change[key]:
+                rows.append({'rel': mapping['rel'], 'property_iri': SKOS + mapping['rel'],
+                             'subject': robot_template.expand(subject, prefixes),
+                             'object': robot_template.expand(mapping['object'], prefixes),
+                             'confidence': None})
+    return added, removed
+
+
+def apply_delta(wrapper, added, removed, source, batch_size=1000):
+    """Upsert added mapping rows and delete removed ones (only edges from source). Returns a
+    summary dict."""
+    summary = load(wrapper, added, source, batch_size, delete_stale=False)
+    by_rel = {}
+    for row in removed:
+        by_rel.setdefault(row['rel'], []).append({'subject': row['subject'], 'object': row['object']})
+    for rel, batch_rows in by_rel.items():
+        results = wrapper.run_write_batches(DELETE_QUERY.format(rel=rel), batch_rows, batch_size,
+                                            {'source': source})
+        summary['deleted'] += sum(r['deleted'] for r in results if r)
+    return summary
+
+
+def record_loaded(path):
+    """Record the mappings of the template at path as what the KG now holds (for deltas)."""
+    match_columns = DELTA_TEMPLATES.get(Path(path).name)
+    if match_columns:
+        frame = row_delta.read_template_frame(path, 'accession_group')
+        row_delta.write_loaded(path, row_delta.file_sha256(path), row_delta.frame_mappings(frame, match_columns))
+
+
+def check_delta(delta):
+    """Error message if delta does not apply on top of the recorded loaded state, else None."""
+    template = project_root / delta['template']
+    loaded = row_delta.read_loaded(template)
+    if loaded is None:
+        return f"no record of {template.name} having been loaded; run a full load_mappings first"
+    if loaded[0] != delta['previous_sha256']:
+        return (f"delta was computed against {template.name} {delta['previous_sha256']}, "
+                f"but the KG was last loaded from {loaded[0]}; rerun WMB_AT_map.py --diff")
+    return None
+
+
+def template_for(path):
+    """Prefixes of the known template at path, or None."""
+    for template, prefixes in TEMPLATES.values():
+        if Path(path).name == template.name:
+            return prefixes
+    return None
+
+
+def load(wrapper, rows, source, batch_size=1000, load_id=None, delete_stale=True):
+    """Upsert mapping rows, stamped with source, and delete relationships from the same source
+    that were not loaded (all of them if rows is empty). Returns a summary dict."""
+    load_id = load_id or f"load-{time.time_ns()}"
+    by_rel = {}
+    for row in rows:
+        by_rel.setdefault((row['rel'], row['property_iri']), []).append(
+            {'subject': row['subject'], 'object': row['object'], 'confidence': row['confidence']})
+
+    summary = {'load_id': load_id, 'rows': 0, 'written': Counter(), 'deleted': 0}
+    for (rel, property_iri), batch_rows in by_rel.items():
+        results = wrapper.run_write_batches(UPSERT_QUERY.format(rel=rel), batch_rows, batch_size,
+                                            {'rel': rel, 'property_iri': property_iri, 'source': source,
+                                             'load_id': load_id})
+        summary['rows'] += len(batch_rows)
+        summary['written'][rel] += sum(r['written'] for r in results if r)
+
+    if delete_stale:
+        params = {'rels': sorted(set(MAPPING_PROPERTIES.values())), 'source': source,
+                  'load_id': load_id, 'limit': batch_size}
+        while True:
+            deleted = wrapper.run_query(DELETE_STALE_QUERY, params, return_type=None)[0]['deleted']
+            summary['deleted'] += deleted
+            if deleted < batch_size:
+                break
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upsert mapping templates into the KG as exactMatch/relatedMatch/broadMatch edges.")
+    parser.add_argument('--template', action='append', default=None,
+                        help=f"Template to load: {', '.join(TEMPLATES)} or a TSV path (repeatable; default: all)")
+    parser.add_argument('--add-prefix', action='append', default=[],
+                        help='Extra "PREFIX: IRI" for templates given by path')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per UNWIND batch / transaction')
+    parser.add_argument('--keep-stale', action='store_true', help='Do not delete edges missing from the template')
+    parser.add_argument('--allow-empty', action='store_true',
+                        help='Load a template with no mappings, removing every edge previously loaded from it')
+    parser.add_argument('--delta', action='append', default=None,
+                        help='Apply a <template>.delta.json from WMB_AT_map.py --diff instead of full templates (repeatable)')
+    parser.add_argument('--dry-run', action='store_true', help='Parse the templates and report counts only')
+    parser.add_argument('--bump-build', action='store_true',
+                        help='Write a new build id to the :KG_build node after loading (for query caches)')
+    parser.add_argument('--endpoint', type=str, default='bolt://localhost:7687', help='Neo4j bolt endpoint')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    args = parser.parse_args()
+
+    wrapper = None if args.dry_run else Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password)
+    if args.delta:
+        for path in args.delta:
+            delta = row_delta.read_delta(path)
+            prefixes = template_for(delta['template']) or template_config.kg_prefixes(args.add_prefix)
+            added, removed = delta_rows(delta, prefixes)
+            problem = check_delta(delta)
+            if args.dry_run:
+                print(f"{Path(path).name}: {len(delta['rows'])} groups, +{len(added)} / -{len(removed)} mappings"
+                      + (f" (would be refused: {problem})" if problem else ''))
+                continue
+            if problem:
+                sys.exit(f"{Path(path).name}: {problem}")
+            summary = apply_delta(wrapper, added, removed, Path(delta['template']).name, args.batch_size)
+            template = project_root / delta['template']
+            row_delta.write_loaded(template, delta['sha256'],
+                                   row_delta.apply_mapping_delta(row_delta.read_loaded(template)[1], delta))
+            written = ', '.join(f'{k}={v}' for k, v in sorted(summary['written'].items()))
+            print(f"{Path(path).name}: written {written or 'none'}, deleted {summary['deleted']}")
+        if wrapper and args.bump_build:
+            query_cache.bump_build(wrapper, 'load_mappings')
+        return
+    for name in args.template or list(TEMPLATES):
+        if name in TEMPLATES:
+            path, prefixes = TEMPLATES[name]
+        elif Path(name).exists():
+            path, prefixes = Path(name), template_config.kg_prefixes(args.add_prefix)
+        else:
+            parser.error(f"Unknown template: {name}")
+        rows = template_rows(path, prefixes)
+        counts = Counter(r['rel'] for r in rows)
+        if args.dry_run:
+            print(f"{Path(path).name}: {len(rows)} mappings ({', '.join(f'{k}={v}' for k, v in sorted(counts.items()))})")
+            continue
+        if not rows and not args.allow_empty:
+            sys.exit(f"{Path(path).name} has no mappings; refusing to load it (pass --allow-empty to remove "
+                     f"every edge loaded from it)")
+        start = time.perf_counter()
+        summary = load(wrapper, rows, Path(path).name, args.batch_size, delete_stale=not args.keep_stale)
+        record_loaded(path)
+        written = ', '.join(f'{k}={v}' for k, v in sorted(summary['written'].items()))
+        print(f"{Path(path).name}: {summary['rows']} mappings, written {written}, "
+              f"deleted {summary['deleted']} stale in {time.perf_counter() - start:.1f}s")
+        missing = summary['rows'] - sum(summary['written'].values())
+        if missing:
+            print(f"  {missing} mappings skipped: subject or object not in the KG", file=sys.stderr)
+    if wrapper and args.bump_build:
+        # Upserts that only change properties leave counts unchanged; move the cache fingerprint
+        query_cache.bump_build(wrapper, 'load_mappings')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Best mouse matches per human cluster and label agreement, from the scFAIR score matrix.
+Replaces the analysis in resources/scFAIR_Siletti_WMB_mapping/mouse_prediction.ipynb.
+
+Outputs (in --out-dir):
+    top_mouse_per_human.tsv     k best mouse sets per human cluster
+    label_agreement.tsv         best match joined to human annotations, with label_match
+    match_rates.tsv             exact label match rate for all / specific / broad human clusters
+    mismatch_counts_{all,specific,broad}.tsv
+"""
+import argparse
+import pandas as pd
+from pathlib import Path
+import importlib.util
+
+# Set project root
+project_root = Path(__file__).resolve().parents[2]
+mapping_dir = project_root / 'resources' / 'scFAIR_Siletti_WMB_mapping'
+
+# Direct import of the score matrix loader and analysis library
+loader_path = project_root / 'src' / 'utils' / 'score_matrix.py'
+spec = importlib.util.spec_from_file_location('score_matrix', loader_path)
+score_matrix = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(score_matrix)
+
+matches_path = project_root / 'src' / 'utils' / 'cross_species_matches.py'
+spec = importlib.util.spec_from_file_location('cross_species_matches', matches_path)
+cross_species_matches = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cross_species_matches)
+
+# Stage timing (--profile)
+instrumentation_path = project_root / 'src' / 'utils' / 'instrumentation.py'
+spec = importlib.util.spec_from_file_location('instrumentation', instrumentation_path)
+instrumentation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(instrumentation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-k mouse matches and label agreement per human cluster.")
+    parser.add_argument('--matrix', type=str, default=str(mapping_dir / 'sm_cluster.mapping_table.tsv'),
+                        help='Square score matrix TSV')
+    parser.add_argument('--human-labels', type=str, required=True,
+                        help="Human cluster annotations TSV ('Cluster ID', 'cell_ontology_term', 'cell_ontology_term_id')")
+    parser.add_argument('-k', type=int, default=1, help='Number of mouse matches to keep per human cluster')
+    parser.add_argument('--out-dir', type=str, default=str(mapping_dir / 'outputs'), help='Output directory')
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = instrumentation.profiler_from_args(args, 'mouse_prediction')
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        with profiler.stage('load_matrix') as st:
+            values, rows, cols = score_matrix.load_score_matrix(args.matrix)
+            st.rows = len(rows)
+        with profiler.stage('top_k') as st:
+            top = cross_species_matches.top_k_matches(values, rows, cols, k=args.k)
+            top.to_csv(out_dir / 'top_mouse_per_human.tsv', sep='\t', index=False)
+            st.rows, st.path = len(top), out_dir / 'top_mouse_per_human.tsv'
+
+        with profiler.stage('label_agreement') as st:
+            human_labels = pd.read_csv(args.human_labels, sep='\t')
+            best = cross_species_matches.label_agreement(top[top['rank'] == 1], human_labels)
+            best.to_csv(out_dir / 'label_agreement.tsv', sep='\t', index=False)
+
+            rates, mismatches = cross_species_matches.agreement_summaries(best)
+            rates.to_csv(out_dir / 'match_rates.tsv', sep='\t', index=False)
+            for scope, counts in mismatches.items():
+                counts.to_csv(out_dir / f'mismatch_counts_{scope}.tsv', sep='\t', index=False)
+            st.rows = len(best)
+    finally:
+        profiler.finish()
+    print(rates.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,8 @@
 import argparse
 import json
 import sys
-import pandas as pd
-import csv
 from pathlib import Path
 import importlib.util
-import os
-import io
 
 # Find project root and import neo4j wrapper
 script_dir = Path(__file__).resolve().parent
@@ -21,30 +17,44 @@ neo4j_wrapper = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(neo4j_wrapper)
 Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
 
-# Query library included directly
-class Neo4jNamedQueries:
-    REPORT_BG_MAPPINGS = '''
-    MATCH (tax:Individual)-[:annotations]->(cell_set:Cell_cluster)-[:has_labelset]->(ls:Individual) 
-    WHERE tax.title = ['HMBA Basal Ganglia Consensus Taxonomy']
-    AND ls.label_rdfs = ['Group'] 
-    AND NOT (cell_set)-[:subcluster_of*0..]->(:Cell_cluster { label_rdfs: ['Nonneuron']})
-    MATCH (cell_set)-[:subcluster_of*0..]->(cc2:Cell_cluster)-[:has_labelset]->(ls2)
-    OPTIONAL MATCH (cc2)-[:composed_primarily_of]->(c:Cell)
-    OPTIONAL MATCH (cell_set)-[:exactMatch]->(at:Cell_cluster)-[:has_labelset]->(ls3)
-    RETURN DISTINCT cell_set.label_rdfs[0] AS Group, 
-    COLLECT(DISTINCT({ id: c.curie, name: c.label_rdfs[0], 
-                       labelset: ls2.label_rdfs[0], 
-                       cell_set: cc2.label_rdfs[0]})) AS cl_mappings,
-    collect(distinct{ labelset: ls3.label_rdfs[0], 
-                      cell_set: at.label_rdfs[0]}) AS WMB_AT,
-        cell_set.rationale_dois AS refs, 
-    SIZE([x IN COLLECT(c.curie) WHERE x IS NOT NULL]) = 0 AS no_cl_mapping 
-    ORDER BY no_cl_mapping DESC 
-    ;
-    '''
-    # Add more named queries as needed
-
-def main():
+# Query result cache
+cache_path = project_root / 'src' / 'utils' / 'query_cache.py'
+spec = importlib.util.spec_from_file_location('query_cache', cache_path)
+query_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_cache)
+
+# Named query library lives in src/utils/named_queries.py so other tools can share it
+queries_path = project_root / 'src' / 'utils' / 'named_queries.py'
+spec = importlib.util.spec_from_file_location('named_queries', queries_path)
+named_queries = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(named_queries)
+Neo4jNamedQueries = named_queries.Neo4jNamedQueries
+
+# Single-pass CSV + Markdown writer
+writer_path = project_root / 'src' / 'utils' / 'report_writer.py'
+spec = importlib.util.spec_from_file_location('report_writer', writer_path)
+report_writer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(report_writer)
+
+# Arrow/Parquet output (pyarrow is imported only when requested)
+arrow_path = project_root / 'src' / 'utils' / 'arrow_export.py'
+spec = importlib.util.spec_from_file_location('arrow_export', arrow_path)
+arrow_export = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(arrow_export)
+
+# Concurrent runner for reports declared in Neo4jNamedQueries.PARTITIONS
+partitioned_path = project_root / 'src' / 'utils' / 'partitioned_query.py'
+spec = importlib.util.spec_from_file_location('partitioned_query', partitioned_path)
+partitioned_query = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(partitioned_query)
+
+# Stage timing (--profile)
+instrumentation_path = project_root / 'src' / 'utils' / 'instrumentation.py'
+spec = importlib.util.spec_from_file_location('instrumentation', instrumentation_path)
+instrumentation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(instrumentation)
+
+def main(argv=None, wrapper=None):
     parser = argparse.ArgumentParser(description="Run named Neo4j queries and output TSV.")
     parser.add_argument('--args', type=str, required=True, help='JSON string or path to JSON file with args')
     parser.add_argument('--query', type=str, required=True, help='Named query to run')
@@ -53,7 +63,19 @@ def main():
     parser.add_argument('--user', type=str, default=None, help='Neo4j username')
     parser.add_argument('--password', type=str, default=None, help='Neo4j password')
     parser.add_argument('--output', type=str, default=None, help='Output TSV file path')
-    args = parser.parse_args()
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='Split a partitioned report into this many concurrent queries')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'Concurrent queries for a partitioned report (default {partitioned_query.DEFAULT_WORKERS})')
+    parser.add_argument('--format', choices=['csv'] + list(arrow_export.FORMATS), default='csv',
+                        help='csv: CSV + Markdown report; parquet/arrow: typed columnar file next to --output')
+    parser.add_argument('--md-shard', nargs='?', const='', default=None, metavar='COLUMN',
+                        help='Split the Markdown table into one page per value of COLUMN, with an index '
+                             '(default: the partition key of a partitioned report)')
+    query_cache.add_cache_arguments(parser)
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profiler = instrumentation.profiler_from_args(args, f'report_gen:{args.query}')
 
     # Load JSON args
     if Path(args.args).exists():
@@ -68,145 +90,59 @@ def main():
         print(f"Query '{args.query}' not found in Neo4jNamedQueries.", file=sys.stderr)
         sys.exit(1)
 
-    # Connect and run query (or dry-run using mock data)
-    if args.dry_run:
-        # Create a small mock result to exercise CSV/MD generation
-        results = [
-            {
-                'Group': 'TEST Group',
-                'cl_mappings': [
-                    {'id': 'CL:0000001', 'name': 'test cell', 'labelset': 'Group', 'cell_set': 'TEST Group'}
-                ],
-                'WMB_AT': [
-                    {'labelset': 'supertype', 'cell_set': '0123 TEST Supertype'}
-                ],
-                'refs': ['https://doi.org/example'],
-                'no_cl_mapping': False
-            }
-        ]
-    else:
-        wrapper = Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password)
-        results = wrapper.run_query(query_str, query_args, return_type=None)
+    partition_spec = Neo4jNamedQueries.PARTITIONS.get(args.query)
+    shard_key = args.md_shard
+    if shard_key == '':
+        if not partition_spec:
+            parser.error(f"--md-shard needs a COLUMN: query '{args.query}' has no partition spec")
+        shard_key = partition_spec['key']
 
-    # Convert results to DataFrame
-    if not results:
-        print("No results returned.")
-        sys.exit(0)
-    df = pd.DataFrame(results)
-
-    # Pretty print any object cells as JSON, quoted for TSV/CSV compatibility
-    def dicts_to_excel_multiline(dicts):
-        try:
-            return "\r\n".join(f"{d.get('labelset','')}: {d.get('cell_set','')}" for d in dicts)
-        except Exception:
-            return str(dicts)
-
-    def dict_to_multiline(kv):
-        try:
-            return "\r\n".join(f"{k}: {v}" for k, v in kv.items())
-        except Exception:
-            return str(kv)
-
-    def excel_cell_formatter(x):
-        # Lists of dicts -> concise multiline key:value pairs
-        if isinstance(x, list) and x and all(isinstance(i, dict) for i in x):
-            return dicts_to_excel_multiline(x)
-        # Single dict -> key: value lines
-        if isinstance(x, dict):
-            return dict_to_multiline(x)
-        # Other lists -> one item per line
-        if isinstance(x, list):
-            return "\r\n".join(str(i) for i in x)
-        return x
-
-    # Output TSV with quoting for multiline compatibility using csv writer (RFC4180 style)
-    def write_csv_with_csv(df, output_path=None):
-        # Prepare rows
-        rows = []
-        cols = list(df.columns)
-        for _, r in df.iterrows():
-            row = []
-            for c in cols:
-                v = r[c]
-                if pd.isna(v):
-                    row.append("")
-                else:
-                    row.append(str(v))
-            rows.append(row)
-        if output_path:
-            with open(output_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f, delimiter=',', quoting=csv.QUOTE_ALL, lineterminator='\r\n')
-                writer.writerow(cols)
-                writer.writerows(rows)
-        else:
-            buf = io.StringIO()
-            writer = csv.writer(buf, delimiter=',', quoting=csv.QUOTE_ALL, lineterminator='\r\n')
-            writer.writerow(cols)
-            writer.writerows(rows)
-            # print without adding extra newline
-            sys.stdout.write(buf.getvalue())
-
-    # Prepare CSV: compact single-line JSON for object cells
-    def compact_json_cell(x):
-        if isinstance(x, (dict, list)):
-            return json.dumps(x, separators=(',', ':'), ensure_ascii=False)
-        return x
-
-    df_csv = df.copy()
-    for col in df_csv.columns:
-        df_csv[col] = df_csv[col].apply(compact_json_cell)
-
-    # Write CSV (comma-delimited) using CRLF and UTF-8
     csv_output = args.output or 'reports/report.csv'
-    write_csv_with_csv(df_csv, csv_output)
-
-    # Prepare Markdown: pretty-printed JSON with <br> for newlines
-    def pretty_html_cell(x):
-        if isinstance(x, (dict, list)):
-            pretty = json.dumps(x, indent=2, ensure_ascii=False)
-            # replace newlines with <br> and preserve indentation with &nbsp;
-            return '<br>'.join(line.replace(' ', '&nbsp;') for line in pretty.splitlines())
-        return str(x)
-
-    md_lines = []
-    cols = list(df.columns)
-    # Header
-    md_lines.append('| ' + ' | '.join(cols) + ' |')
-    md_lines.append('| ' + ' | '.join(['---'] * len(cols)) + ' |')
-    for _, r in df.iterrows():
-        cells = [pretty_html_cell(r[c]) for c in cols]
-        md_lines.append('| ' + ' | '.join(cells) + ' |')
-
-    md_output = Path(csv_output).with_suffix('.md')
-
-    # Append the exact query and the passed parameters to the Markdown report
-    query_section_lines = []
-    query_section_lines.append('')
-    query_section_lines.append('## Query')
-    query_section_lines.append('')
-    query_section_lines.append('```cypher')
-    # Preserve the query formatting
-    for line in (query_str or '').splitlines():
-        query_section_lines.append(line)
-    query_section_lines.append('```')
-
-    # Add parameters used for the query, if any
+    # The query (streamed, or run up front when partitioned) and the writer are timed as one stage
     try:
-        has_params = bool(query_args)
-    except NameError:
-        has_params = False
-
-    if has_params:
-        query_section_lines.append('')
-        query_section_lines.append('## Parameters')
-        query_section_lines.append('')
-        query_section_lines.append('```json')
-        # Pretty-print parameters for human readability
-        query_section_lines.append(json.dumps(query_args, indent=2, ensure_ascii=False))
-        query_section_lines.append('```')
-
-    md_content = '\n'.join(md_lines) + '\n' + '\n'.join(query_section_lines) + '\n'
-    md_output.write_text(md_content, encoding='utf-8')
+        with profiler.stage('query_write') as st:
+            # Connect and run query (or dry-run using mock data)
+            if args.dry_run:
+                # Create a small mock result to exercise CSV/MD generation
+                results = [
+                    {
+                        'Group': 'TEST Group',
+                        'cl_mappings': [
+                            {'id': 'CL:0000001', 'name': 'test cell', 'labelset': 'Group', 'cell_set': 'TEST Group'}
+                        ],
+                        'WMB_AT': [
+                            {'labelset': 'supertype', 'cell_set': '0123 TEST Supertype'}
+                        ],
+                        'refs': ['https://doi.org/example'],
+                        'no_cl_mapping': False
+                    }
+                ]
+            else:
+                if wrapper is None:
+                    wrapper = Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password,
+                                                    cache=query_cache.cache_from_args(args))
+                if (args.partitions or args.workers) and not partition_spec:
+                    print(f"Query '{args.query}' has no partition spec; running it as a single query.", file=sys.stderr)
+                if (args.partitions or args.workers) and partition_spec:
+                    results = partitioned_query.run_partitioned(
+                        wrapper, partition_spec, query_args, partitions=args.partitions,
+                        workers=args.workers or partitioned_query.DEFAULT_WORKERS)
+                else:
+                    results = wrapper.stream_query(query_str, query_args)
+
+            if args.format == 'csv':
+                # Stream records into the CSV and Markdown reports in one pass
+                n = report_writer.write_report(results, csv_output, query_str, query_args, shard_key=shard_key)
+                st.path = csv_output
+            else:
+                # Typed columnar output, written batch by batch
+                st.path = arrow_export.output_path(csv_output, args.format)
+                n = arrow_export.write_records(results, st.path, args.format, arrow_export.known_schema(args.query))
+            st.rows = n
+    finally:
+        profiler.finish()
+    if not n:
+        print("No results returned.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Run the whole report/map query suite concurrently over one async Neo4j driver.
+
+The suite is a JSON manifest (default src/cypher/suite.json) listing queries from the
+catalogue ('named:<NAME>' for Neo4jNamedQueries, 'file:<stem>' for src/cypher/*.cypher),
+their parameters, output path and format (tsv, csv, jsonl, or report: the CSV + Markdown
+pair written by report_gen.py). One driver is opened and checked once; up to --concurrency
+queries run at a time and each output is written as its records stream in, so the suite
+takes about as long as its slowest query. Outputs are
+written to a temporary file and moved into place only when their query succeeds.
+
+Usage:
+    python run_suite.py [--manifest src/cypher/suite.json] [--only NAME ...] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+import importlib.util
+
+from neo4j import AsyncGraphDatabase, basic_auth
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+# Direct import of the query catalogue
+catalog_path = project_root / 'src' / 'utils' / 'query_catalog.py'
+spec = importlib.util.spec_from_file_location('query_catalog', catalog_path)
+query_catalog = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_catalog)
+
+# Single-pass CSV + Markdown writer for the 'report' format
+writer_path = project_root / 'src' / 'utils' / 'report_writer.py'
+spec = importlib.util.spec_from_file_location('report_writer', writer_path)
+report_writer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(report_writer)
+
+DEFAULT_MANIFEST = project_root / 'src' / 'cypher' / 'suite.json'
+DEFAULT_CONCURRENCY = 4
+FETCH_SIZE = 1000
+
+
+def cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    return value
+
+
+class RowWriter:
+    """Incremental writer for one output; the header is taken from the first row.
+    tsv matches the map scripts (str() of each value, no quoting)."""
+
+    def __init__(self, fh, fmt):
+        self.fh = fh
+        self.fmt = fmt
+        self.header = None
+        self.csv = None
+        self.rows = 0
+
+    def write(self, row):
+        if self.fmt == 'jsonl':
+            self.fh.write(json.dumps(row, ensure_ascii=False) + '\n')
+        elif self.fmt == 'tsv':
+            if self.header is None:
+                self.header = list(row.keys())
+                self.fh.write('\t'.join(self.header) + '\n')
+            self.fh.write('\t'.join(str(row[h]) for h in self.header) + '\n')
+        elif self.fmt == 'csv':
+            if self.csv is None:
+                self.csv = csv.DictWriter(self.fh, fieldnames=list(row.keys()))
+                self.csv.writeheader()
+            self.csv.writerow({k: cell(v) for k, v in row.items()})
+        else:
+            raise ValueError(f"Unsupported output format: {self.fmt}")
+        self.rows += 1
+
+
+def load_manifest(path, only=None):
+    entries = json.loads(Path(path).read_text())['queries']
+    if only:
+        unknown = set(only) - {e['name'] for e in entries}
+        if unknown:
+            raise KeyError(f"Not in manifest: {', '.join(sorted(unknown))}")
+        entries = [e for e in entries if e['name'] in only]
+    queries = query_catalog.all_queries()
+    for entry in entries:
+        if entry['query'] not in queries:
+            raise KeyError(f"{entry['name']}: unknown query {entry['query']}")
+        entry['cypher'] = queries[entry['query']]
+    return entries
+
+
+def temp_path(path):
+    return path.with_name(f'.{path.name}.tmp')
+
+
+async def run_entry(driver, entry, semaphore):
+    """Run one manifest entry, streaming rows to its output. Returns (name, rows, seconds, error)."""
+    output = project_root / entry['output']
+    fmt = entry.get('format', 'tsv')
+    # (temporary, final) pairs, moved into place once the query has succeeded
+    outputs = [(temp_path(output), output)]
+    if fmt == 'report':
+        outputs.append((temp_path(output.with_suffix('.md')), output.with_suffix('.md')))
+    async with semaphore:
+        start = time.perf_counter()
+        fh = writer = None
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            if fmt == 'report':
+                writer = report_writer.ReportWriter(outputs[0][0], outputs[1][0],
+                                                    entry['cypher'], entry.get('params'))
+            else:
+                fh = open(outputs[0][0], 'w', newline='', encoding='utf-8')
+                writer = RowWriter(fh, fmt)
+            async with driver.session(fetch_size=FETCH_SIZE) as session:
+                result = await session.run(entry['cypher'], entry.get('params') or {})
+                async for record in result:
+                    writer.write(record.data())
+            if fh:
+                fh.close()
+            else:
+                writer.close()
+            if writer.rows:
+                for tmp, final in outputs:
+                    os.replace(tmp, final)
+            return entry['name'], writer.rows, time.perf_counter() - start, None
+        except Exception as exc:
+            with contextlib.suppress(Exception):
+                if fh:
+                    fh.close()
+                elif writer:
+                    writer.close()
+            return entry['name'], 0, time.perf_counter() - start, exc
+        finally:
+            for tmp, _ in outputs:
+                tmp.unlink(missing_ok=True)
+
+
+async def run_suite(entries, endpoint, user=None, password=None, concurrency=DEFAULT_CONCURRENCY):
+    auth = basic_auth(user, password) if user and password else None
+    driver = AsyncGraphDatabase.driver(endpoint, auth=auth)
+    try:
+        await driver.verify_connectivity()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        return await asyncio.gather(*(run_entry(driver, e, semaphore) for e in entries))
+    finally:
+        await driver.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the report/map query suite concurrently.")
+    parser.add_argument('--manifest', type=str, default=str(DEFAULT_MANIFEST), help='Suite manifest JSON')
+    parser.add_argument('--only', action='append', default=None, help='Run only this entry (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Queries in flight at once')
+    parser.add_argument('--endpoint', type=str, default='bolt://localhost:7687', help='Neo4j bolt endpoint')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    args = parser.parse_args()
+
+    try:
+        entries = load_manifest(args.manifest, args.only)
+    except KeyError as exc:
+        parser.error(exc.args[0])
+
+    start = time.perf_counter()
+    results = asyncio.run(run_suite(entries, args.endpoint, args.user, args.password, args.concurrency))
+
+    print(f"{'query':<28}{'rows':>10}{'seconds':>10}")
+    for name, rows, elapsed, error in results:
+        status = f"  FAILED: {error}" if error else ('' if rows else '  (no rows, output not written)')
+        print(f"{name:<28}{rows:>10}{elapsed:>10.2f}{status}")
+    print(f"{'total':<38}{time.perf_counter() - start:>10.2f}")
+    if any(error for *_, error in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,56 +1,79 @@
+import argparse
 import pandas as pd
 from pathlib import Path
+import importlib.util
 
 # Set project root
 project_root = Path(__file__).resolve().parents[2]
 
+# Direct import of the score matrix loader
+loader_path = project_root / 'src' / 'utils' / 'score_matrix.py'
+spec = importlib.util.spec_from_file_location('score_matrix', loader_path)
+score_matrix = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(score_matrix)
+
+# Stage timing (--profile)
+instrumentation_path = project_root / 'src' / 'utils' / 'instrumentation.py'
+spec = importlib.util.spec_from_file_location('instrumentation', instrumentation_path)
+instrumentation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(instrumentation)
+
 # Paths
-info_path = project_root / 'resources/scFAIR_Siletti_WMB_mapping/info_cell_type_complete.tsv'
+info_path = project_root / 'resources/scFAIR_Siletti_WMB_mapping/info_celltype_complete.tsv'
 out_path = project_root / 'resources/scFAIR_Siletti_WMB_mapping/WMB_set_2_CL.tsv'
 matrix_path = project_root / 'resources/scFAIR_Siletti_WMB_mapping/sm_cluster.mapping_table.tsv'
 long_out_path = project_root / 'resources/scFAIR_Siletti_WMB_mapping/sm_cluster.mappings_long.tsv'
 joined_out_path = project_root / 'resources/scFAIR_Siletti_WMB_mapping/sm_cluster.mappings_long_joined.tsv'
 
-mm_CL_mapping_Sarah = pd.read_csv(info_path, sep='\t')
-mm_CL_mapping_Sarah_agg = mm_CL_mapping_Sarah[['cell_type',
-                                               'cellTypeId_',
-                                               'cellTypeName_']].groupby('cellTypeName_',
-                                            as_index=False).agg({'cell_type': list})
 
-# Prepend 'mm_' to each cell type name
-mm_CL_mapping_Sarah_agg['cellTypeName_'] = 'mm_' + mm_CL_mapping_Sarah_agg['cellTypeName_'].astype(str)
+def main():
+    parser = argparse.ArgumentParser(description="Extract scFAIR cluster mappings above a score threshold.")
+    parser.add_argument('--threshold', type=float, default=0.1, help='Minimum score to keep')
+    parser.add_argument('--no-cache', action='store_true', help='Re-parse the matrix TSV instead of using the binary cache')
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = instrumentation.profiler_from_args(args, 'scFAIR_Sillet_WMB_2_KG')
 
-mm_CL_mapping_Sarah_agg.to_csv(out_path, sep='\t', index=False)
+    try:
+        with profiler.stage('read_info') as st:
+            mm_CL_mapping_Sarah = pd.read_csv(info_path, sep='\t')
+            mm_CL_mapping_Sarah_agg = mm_CL_mapping_Sarah[['cell_type',
+                                                           'cellTypeId_',
+                                                           'cellTypeName_']].groupby('cellTypeName_',
+                                                        as_index=False).agg({'cell_type': list})
 
-# Load the TSV file, no index_col so we can shift the first row
-raw = pd.read_csv(matrix_path, sep='\t', header=None)
+            # Prepend 'mm_' to each cell type name
+            mm_CL_mapping_Sarah_agg['cellTypeName_'] = 'mm_' + mm_CL_mapping_Sarah_agg['cellTypeName_'].astype(str)
 
-# Shift the first row by one to the right to become the header
-header = raw.iloc[0, 1:].tolist()
-rows = raw.iloc[1:, 0].tolist()
+            mm_CL_mapping_Sarah_agg.to_csv(out_path, sep='\t', index=False)
+            st.rows, st.path = len(mm_CL_mapping_Sarah_agg), out_path
 
-# Build the square matrix DataFrame
-matrix = raw.iloc[1:, 1:]
-matrix.columns = header
-matrix.index = rows
-matrix = matrix.astype(float)
+        with profiler.stage('load_matrix') as st:
+            # Load the square matrix as float32 (memory-mapped from the cache after the first run)
+            values, rows, header = score_matrix.load_score_matrix(matrix_path, use_cache=not args.no_cache)
+            st.rows = len(rows)
 
-# Melt to long format
-long_df = matrix.reset_index().melt(id_vars='index', var_name='c', value_name='score')
-long_df = long_df.rename(columns={'index': 'r'})
+        with profiler.stage('transform') as st:
+            # Keep only scores above the threshold, in long format
+            long_df = score_matrix.scores_above(values, rows, header, args.threshold)
 
-# Filter out scores below 0.1
-long_df = long_df[long_df['score'] >= 0.1]
+            # Round score to 2 decimal places and sort by score descending
+            long_df['score'] = long_df['score'].round(2)
+            long_df = long_df.sort_values(by='score', ascending=False)
 
-# Round score to 2 decimal places and sort by score descending
-long_df['score'] = long_df['score'].round(2)
-long_df = long_df.sort_values(by='score', ascending=False)
+            # Inner join the mm_-prefixed cell type table and long_df on 'c'
+            joined_df = pd.merge(long_df, mm_CL_mapping_Sarah_agg, left_on='c', right_on='cellTypeName_', how='inner')
+            st.rows = len(long_df)
 
-# Save to new TSV
-long_df.to_csv(long_out_path, sep='\t', index=False)
+        with profiler.stage('write') as st:
+            # Save to new TSVs
+            long_df.to_csv(long_out_path, sep='\t', index=False)
+            joined_df.to_csv(joined_out_path, sep='\t', index=False)
+            st.rows = len(long_df) + len(joined_df)
+            st.bytes = long_out_path.stat().st_size + joined_out_path.stat().st_size
+    finally:
+        profiler.finish()
 
-# Inner join mm_CL_mapping_Sarah and long_df on 'c'
-joined_df = pd.merge(long_df, mm_CL_mapping_Sarah, left_on='c', right_on='cellTypeName_', how='inner')
 
-# Save joined result
-joined_df.to_csv(joined_out_path, sep='\t', index=False)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Single entry point for the template, OWL, map, report and export steps.
+
+Several subcommands can be given in one call and run in order in one process, so
+interpreter, pandas and Neo4j driver start-up are paid once:
+
+    python wmbkg.py --endpoint bolt://localhost:7687 templates owl maps report
+
+Each subcommand's module (and so pandas, numpy, the neo4j driver, ...) is imported only when
+that subcommand runs. Subcommands that query the KG (maps, export, report) share a single
+Neo4jBoltQueryWrapper, i.e. one driver and connection pool, opened on first use. Global
+options (endpoint, credentials, query cache and --profile flags) go before the first
+subcommand; each subcommand's own options follow it (see `wmbkg.py SUBCOMMAND -h`).
+
+Usage:
+    python wmbkg.py [GLOBAL OPTIONS] SUBCOMMAND [OPTIONS] [SUBCOMMAND [OPTIONS] ...]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+import importlib.util
+
+# Find project root
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent.parent
+
+MAPS_DIR = project_root / 'resources' / 'maps'
+OWL_DIR = project_root / 'owl'
+TEMPLATES_DIR = project_root / 'src' / 'templates'
+
+_modules = {}
+
+
+def load(name, relpath):
+    """Import a script or utility module by path, once, on first use."""
+    if name not in _modules:
+        spec = importlib.util.spec_from_file_location(name, project_root / relpath)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return _modules[name]
+
+
+class Session:
+    """State shared by the subcommands of one invocation."""
+
+    def __init__(self, args):
+        self.args = args
+        self._wrapper = None
+
+    def wrapper(self):
+        """The shared Neo4j wrapper, connected on first use."""
+        if self._wrapper is None:
+            neo4j_wrapper = load('neo4j_bolt_wrapper', 'src/utils/neo4j_bolt_wrapper.py')
+            query_cache = load('query_cache', 'src/utils/query_cache.py')
+            self._wrapper = neo4j_wrapper.Neo4jBoltQueryWrapper(
+                self.args.endpoint, self.args.user, self.args.password,
+                cache=query_cache.cache_from_args(self.args))
+        return self._wrapper
+
+    def profile_argv(self):
+        """--profile/--cprofile forwarded to every step."""
+        argv = []
+        if self.args.profile:
+            argv += ['--profile', self.args.profile]
+        if self.args.cprofile:
+            argv.append('--cprofile')
+        return argv
+
+    def close(self):
+        if self._wrapper is not None and self._wrapper.driver:
+            self._wrapper.driver.close()
+
+
+def templates_parser(parser):
+    parser.add_argument('--offline', action='store_true', help='Use only the local fetch cache, no network access')
+    parser.add_argument('--refresh', action='store_true', help='Revalidate the cached taxonomy JSON with the server')
+
+
+def run_templates(session, args):
+    argv = session.profile_argv()
+    if args.offline:
+        argv.append('--offline')
+    if args.refresh:
+        argv.append('--refresh')
+    load('WMB_AT_map', 'src/scripts/WMB_AT_map.py').main(argv)
+    load('generate_scFAIR_WHB_WMB_template', 'src/scripts/generate_scFAIR_WHB_WMB_template.py').main()
+
+
+def owl_parser(parser):
+    pass
+
+
+def run_owl(session, args):
+    # The native emitter; use `make owl` for ROBOT
+    robot_template = load('robot_template', 'src/utils/robot_template.py')
+    config = load('template_config', 'src/utils/template_config.py')
+    OWL_DIR.mkdir(parents=True, exist_ok=True)
+    for template, owl, prefixes in [(config.BG2WMB_TEMPLATE, 'BG2WMB.owl', config.BG2WMB_PREFIXES),
+                                    (config.SCFAIR_TEMPLATE, 'scFAIR_WHB_WMB.owl', config.SCFAIR_PREFIXES)]:
+        argv = ['-t', str(template), '-o', str(OWL_DIR / owl)]
+        for prefix in prefixes:
+            argv += ['--add-prefix', prefix]
+        robot_template.main(argv)
+
+
+def export_parser(parser):
+    parser.add_argument('-o', '--output', type=str, default=str(project_root / 'resources' / 'mouse_cc_label_iri.tsv'),
+                        help='Output TSV file path')
+    parser.add_argument('--format', choices=['tsv', 'parquet', 'arrow'], default='tsv', help='Output format')
+
+
+def run_export(session, args):
+    export = load('export_mouse_subclass_labels_and_accessions',
+                  'src/scripts/export_mouse_subclass_labels_and_accessions.py')
+    export.main(['-o', args.output, '--format', args.format] + session.profile_argv(), wrapper=session.wrapper())
+
+
+def maps_parser(parser):
+    export_parser(parser)
+    parser.add_argument('--cell-set-map', type=str, default=str(MAPS_DIR / 'cell_set_map.tsv'),
+                        help='Cell set map output path')
+
+
+def run_maps(session, args):
+    run_export(session, args)
+    Path(args.cell_set_map).parent.mkdir(parents=True, exist_ok=True)
+    cell_set_map = load('generate_celll_set_map', 'src/utils/generate_celll_set_map.py')
+    cell_set_map.main(['-o', args.cell_set_map, '--format', args.format] + session.profile_argv(),
+                      wrapper=session.wrapper())
+
+
+def report_parser(parser):
+    parser.add_argument('--query', type=str, default='REPORT_BG_MAPPINGS', help='Named query to run')
+    parser.add_argument('--args', type=str, default='{}', help='JSON string or path to JSON file with args')
+    parser.add_argument('--output', type=str, default=str(project_root / 'reports' / 'BG_mappings.csv'),
+                        help='Output CSV file path')
+    parser.add_argument('--partitions', type=int, default=None, help='Concurrent partitions for a partitioned report')
+    parser.add_argument('--workers', type=int, default=None, help='Concurrent queries for a partitioned report')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'arrow'], default='csv', help='Output format')
+    parser.add_argument('--md-shard', nargs='?', const='', default=None, metavar='COLUMN',
+                        help='One Markdown page per COLUMN value (default: the partition key)')
+
+
+def run_report(session, args):
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    argv = ['--query', args.query, '--args', args.args, '--output', args.output, '--format', args.format]
+    for flag, value in [('--partitions', args.partitions), ('--workers', args.workers)]:
+        if value:
+            argv += [flag, str(value)]
+    if args.md_shard is not None:
+        argv += ['--md-shard', args.md_shard] if args.md_shard else ['--md-shard']
+    load('report_gen', 'src/scripts/report_gen.py').main(argv + session.profile_argv(), wrapper=session.wrapper())
+
+
+# name: (help, add options, run)
+COMMANDS = {
+    'templates': ('Build the BG2WMB and scFAIR WHB-WMB ROBOT templates', templates_parser, run_templates),
+    'owl': ('Convert the templates to OWL with the native emitter', owl_parser, run_owl),
+    'maps': ('Export mouse subclass labels and the cell set map from the KG', maps_parser, run_maps),
+    'export': ('Export mouse subclass labels and accessions from the KG', export_parser, run_export),
+    'report': ('Run a named report query to CSV + Markdown', report_parser, run_report),
+}
+
+
+def takes_value(parser, token):
+    """Number of following argv tokens the option token consumes in parser (0 for flags,
+    unknown options and --opt=value). An optional value (nargs='?') is never a subcommand name."""
+    if not token.startswith('-') or '=' in token:
+        return 0
+    action = parser._option_string_actions.get(token)
+    if action is None or action.nargs == 0:
+        return 0
+    if action.nargs == '?':
+        return -1
+    return action.nargs if isinstance(action.nargs, int) else 1
+
+
+def split_commands(argv, parsers):
+    """Split argv into the global options and one (command, options) group per subcommand.
+
+    parsers maps None to the global parser and each subcommand name to its parser. A token
+    only starts a subcommand when it is not the value of the preceding option, so
+    `report --query maps` keeps 'maps' as the --query value."""
+    head, groups = [], []
+    tokens = list(argv)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        current = head if not groups else groups[-1][1]
+        parser = parsers[groups[-1][0] if groups else None]
+        if token in COMMANDS:
+            groups.append((token, []))
+            i += 1
+            continue
+        n = takes_value(parser, token)
+        if n == -1:
+            # Optional value: take the next token unless it is an option or a subcommand
+            n = 1 if i + 1 < len(tokens) and not tokens[i + 1].startswith('-') and tokens[i + 1] not in COMMANDS else 0
+        current.extend(tokens[i:i + 1 + n])
+        i += 1 + n
+    return head, groups
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        description="Run pipeline steps in one process.",
+        epilog='subcommands: ' + '; '.join(f'{name}: {spec[0]}' for name, spec in COMMANDS.items()))
+    parser.add_argument('--endpoint', type=str, default='bolt://localhost:7687', help='Neo4j bolt endpoint')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    # Same flags as query_cache.add_cache_arguments / instrumentation.add_profile_arguments,
+    # declared here so neither module is imported before a subcommand needs it
+    parser.add_argument('--cache', action='store_true', help='Serve repeated queries from the query result cache')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Re-run queries and overwrite their cached results')
+    parser.add_argument('--clear-cache', action='store_true', help='Empty the query result cache first')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='JSONL',
+                        help='Record per-stage timings (default log .cache/profile/stages.jsonl)')
+    parser.add_argument('--cprofile', action='store_true', help='Also run stages under cProfile')
+
+    parsers = {None: parser}
+    for name, (help_text, add_options, _) in COMMANDS.items():
+        parsers[name] = argparse.ArgumentParser(prog=f'{parser.prog} {name}', description=help_text)
+        add_options(parsers[name])
+
+    head, groups = split_commands(argv, parsers)
+    args = parser.parse_args(head)
+    if args.profile == '':
+        args.profile = str(project_root / '.cache' / 'profile' / 'stages.jsonl')
+    if not groups:
+        parser.error(f"give at least one subcommand: {', '.join(COMMANDS)}")
+
+    # Parse every subcommand's options before running anything
+    steps = [(name, COMMANDS[name][2], parsers[name].parse_args(options)) for name, options in groups]
+
+    session = Session(args)
+    try:
+        for name, run, step_args in steps:
+            start = time.perf_counter()
+            run(session, step_args)
+            print(f"[wmbkg] {name} done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
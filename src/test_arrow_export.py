@@ -0,0 +1,46 @@
+import pytest
+
+from utils import arrow_export
+
+pa = pytest.importorskip('pyarrow')
+
+
+def test_record_batch_casts_mixed_values(tmp_path):
+    writer = arrow_export.ArrowBatchWriter(tmp_path / 'm.parquet', schema=arrow_export.known_schema('cell_set_map'))
+    rows = [
+        {'dataset': 'WMB', 'labelset': 'class', 'labelset_rank': '3', 'label': 'a', 'iri': 'x'},
+        {'dataset': 'WMB', 'labelset': 'class', 'labelset_rank': 2, 'label': 'b', 'iri': 'y'},
+        {'dataset': 'WMB', 'labelset': 'class', 'labelset_rank': '', 'label': 'c', 'iri': 'z'},
+    ]
+    batch = writer._record_batch(rows)
+    assert batch.schema.field('labelset_rank').type == pa.int64()
+    assert batch.column('labelset_rank').to_pylist() == [3, 2, None]
+
+
+def test_record_batch_keeps_nested_types(tmp_path):
+    writer = arrow_export.ArrowBatchWriter(tmp_path / 'r.parquet',
+                                           schema=arrow_export.known_schema('REPORT_BG_MAPPINGS'))
+    row = {'Group': 'G', 'cl_mappings': [{'id': 'CL:1', 'name': 'n', 'labelset': 'Group', 'cell_set': 'G'}],
+           'WMB_AT': [], 'refs': ['https://doi.org/x'], 'no_cl_mapping': False}
+    batch = writer._record_batch([row])
+    assert pa.types.is_list(batch.schema.field('cl_mappings').type)
+    assert batch.to_pylist() == [row]
+
+
+@pytest.mark.parametrize('fmt', arrow_export.FORMATS)
+def test_write_and_read_back(tmp_path, fmt):
+    path = arrow_export.output_path(tmp_path / 'maps' / 'labels.csv', fmt)
+    records = ({'label': f'l{i}', 'accession': f'CS:{i}'} for i in range(25))
+    assert arrow_export.write_records(records, path, fmt, arrow_export.known_schema('mouse_subclass_labels'),
+                                      batch_size=10) == 25
+    frame = arrow_export.read_table(path)
+    assert frame['label'].tolist() == [f'l{i}' for i in range(25)]
+
+
+def test_inferred_schema_and_empty_output(tmp_path):
+    path = tmp_path / 'x.parquet'
+    assert arrow_export.write_records([{'n': 1}, {'n': 2}], path) == 2
+    assert arrow_export.read_table(path)['n'].tolist() == [1, 2]
+    empty = tmp_path / 'empty.parquet'
+    assert arrow_export.write_records([], empty) == 0
+    assert not empty.exists()
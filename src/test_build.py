@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+spec = importlib.util.spec_from_file_location('build', Path(__file__).resolve().parent / 'scripts' / 'build.py')
+build = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(build)
+
+COPY = 'import pathlib; pathlib.Path("out/b.txt").write_text(pathlib.Path("a.txt").read_text().upper())'
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(build, 'project_root', tmp_path)
+    (tmp_path / 'a.txt').write_text('a')
+    return tmp_path
+
+
+def step(cmd=COPY):
+    return {'cmd': [sys.executable, '-c', cmd], 'inputs': ['a.txt'], 'code': [], 'outputs': ['out/b.txt']}
+
+
+def run(steps, state, force=False):
+    results = build.run_chain(list(steps), steps, state, force)
+    for name, status, _, entry in results:
+        if status == 'built':
+            state[name] = entry
+    return [status for _, status, _, _ in results]
+
+
+def test_skips_unchanged_steps(root):
+    steps, state = {'copy': step()}, {}
+    assert run(steps, state) == ['built']
+    assert (root / 'out' / 'b.txt').read_text() == 'A'
+    assert run(steps, state) == ['skipped']
+    # Touching an input without changing it does not rebuild
+    os.utime(root / 'a.txt', (1, 1))
+    assert run(steps, state) == ['skipped']
+    assert run(steps, state, force=True) == ['built']
+
+
+def test_rebuilds_on_changed_input_or_output(root):
+    steps, state = {'copy': step()}, {}
+    run(steps, state)
+    (root / 'a.txt').write_text('b')
+    assert run(steps, state) == ['built']
+    (root / 'out' / 'b.txt').write_text('edited')
+    assert run(steps, state) == ['built']
+    (root / 'out' / 'b.txt').unlink()
+    assert run(steps, state) == ['built']
+
+
+def test_key_covers_command_and_prefixes(root):
+    base = build.step_key(step())
+    assert build.step_key(step()) == base
+    assert build.step_key(step(COPY + '  # changed')) != base
+    assert build.step_key({**step(), 'prefixes': ['X: http://x/']}) != base
+
+
+def test_failed_step_stops_the_chain(root):
+    steps = {'fail': step('raise SystemExit(1)'), 'copy': step()}
+    assert run(steps, {}) == ['failed']
+    assert not (root / 'out' / 'b.txt').exists()
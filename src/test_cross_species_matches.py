@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from utils.cross_species_matches import agreement_summaries, label_agreement, pair_scores, top_k_matches
+
+LABELS = ['hs_1', 'hs_2', 'mm_Astro', 'mm_Oligo']
+nan = np.nan
+VALUES = np.array([
+    # hs_1  hs_2  mm_Astro  mm_Oligo
+    [1.0, 0.1, 0.9, 0.2],
+    [0.1, 1.0, nan, 0.3],
+    [0.8, nan, 1.0, 0.0],
+    [0.4, 0.6, 0.0, 1.0],
+], dtype=np.float32)
+
+
+def test_pair_scores_take_the_better_direction():
+    human, mouse, scores = pair_scores(VALUES, LABELS, LABELS)
+    assert human == ['hs_1', 'hs_2'] and mouse == ['mm_Astro', 'mm_Oligo']
+    np.testing.assert_array_equal(scores, np.array([[0.9, 0.4], [nan, 0.6]], dtype=np.float32))
+
+
+def test_pair_scores_follow_column_order():
+    order = [3, 1, 0, 2]
+    cols = [LABELS[i] for i in order]
+    _, _, scores = pair_scores(VALUES[:, order], LABELS, cols)
+    np.testing.assert_array_equal(scores, pair_scores(VALUES, LABELS, LABELS)[2])
+
+
+def test_top_k_matches():
+    top = top_k_matches(VALUES, LABELS, LABELS, k=2)
+    assert top['human_cluster'].tolist() == ['hs_1', 'hs_1', 'hs_2', 'hs_2']
+    assert top['rank'].tolist() == [1, 2, 1, 2]
+    assert top['mouse_cluster'].tolist() == ['mm_Astro', 'mm_Oligo', 'mm_Oligo', 'mm_Astro']
+    # A pair missing in both directions ranks last
+    assert np.isnan(top['score'].iloc[3])
+    assert len(top_k_matches(VALUES, LABELS, LABELS, k=5)) == 4
+
+
+def test_label_agreement_and_summaries():
+    top1 = top_k_matches(VALUES, LABELS, LABELS, k=1)
+    human_labels = pd.DataFrame({
+        'Cluster ID': [1, 2],
+        'cell_ontology_term': ['astro', 'neuron'],
+        'cell_ontology_term_id': ['CL:0000127', 'CL:0000540'],
+    })
+    best = label_agreement(top1, human_labels)
+    assert best['label_match'].tolist() == [True, False]
+    assert best['broad'].tolist() == [False, True]
+    rates, mismatches = agreement_summaries(best)
+    assert rates.set_index('scope')['match_rate'].to_dict() == {'all': 0.5, 'specific': 1.0, 'broad': 0.0}
+    assert mismatches['all'][['human_label', 'mouse_label', 'count']].values.tolist() == [['neuron', 'Oligo', 1]]
+    assert mismatches['specific'].empty
+    assert len(mismatches['broad']) == 1
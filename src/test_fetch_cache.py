@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import fetch_cache
+from utils.fetch_cache import FetchCache
+
+URL = 'https://example.org/taxonomy.json'
+
+
+def response(content=b'', status=200, headers=None):
+    return SimpleNamespace(content=content, status_code=status, headers=headers or {},
+                           raise_for_status=lambda: None)
+
+
+def test_download_then_fresh_hit(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(fetch_cache.requests, 'get',
+                        lambda url, headers, timeout: calls.append(headers) or response(b'{}', headers={'ETag': 'x'}))
+    cache = FetchCache(tmp_path, offline=False)
+    assert cache.fetch_bytes(URL) == b'{}'
+    assert cache.fetch_bytes(URL) == b'{}'
+    assert calls == [{}]
+    # A second instance reads the index; offline it never touches the network
+    assert FetchCache(tmp_path, offline=True).fetch_bytes(URL) == b'{}'
+
+
+def test_revalidation(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_cache.requests, 'get',
+                        lambda url, headers, timeout: response(b'{}', headers={'ETag': 'x'}))
+    FetchCache(tmp_path, offline=False).fetch(URL)
+    seen = []
+    monkeypatch.setattr(fetch_cache.requests, 'get',
+                        lambda url, headers, timeout: seen.append(headers) or response(status=304))
+    assert FetchCache(tmp_path, offline=False, max_age=0).fetch_bytes(URL) == b'{}'
+    assert seen == [{'If-None-Match': 'x'}]
+
+
+def test_failed_revalidation_uses_cache_unless_refreshing(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_cache.requests, 'get', lambda url, headers, timeout: response(b'{}'))
+    FetchCache(tmp_path, offline=False).fetch(URL)
+
+    def fail(url, headers, timeout):
+        raise fetch_cache.requests.ConnectionError('down')
+    monkeypatch.setattr(fetch_cache.requests, 'get', fail)
+    cache = FetchCache(tmp_path, offline=False, max_age=0)
+    assert cache.fetch_bytes(URL) == b'{}'
+    with pytest.raises(fetch_cache.requests.ConnectionError):
+        cache.fetch(URL, refresh=True)
+
+
+def test_offline_without_copy(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FetchCache(tmp_path, offline=True).fetch(URL)
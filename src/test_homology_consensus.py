@@ -0,0 +1,57 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+from utils.homology_consensus import consensus, consensus_table, explode_lists, label_votes
+
+spec = importlib.util.spec_from_file_location(
+    'build_homology_consensus', Path(__file__).resolve().parent / 'scripts' / 'build_homology_consensus.py')
+build_homology_consensus = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(build_homology_consensus)
+
+SHEET = pd.DataFrame({
+    'Group': ['G1', 'G2'],
+    'accession_group': ['A1', 'A2'],
+    'Human_ABCmouse_MapMyCells_SUBC_label': ['b | a', 'x'],
+    'Macaque_ABCmouse_MapMyCells_SUBC_label': ['a|b', None],
+    'Marmoset_ABCmouse_MapMyCells_SUBC_label': ['a', 'x | y'],
+    'reciprocal_hits_ABCmouse_MapMyCells_SUBC_label': ['a', 'x'],
+    'notes': ['ignored', 'ignored'],
+})
+
+
+def test_explode_lists():
+    long = explode_lists(SHEET)
+    assert set(long.columns) == {'Group', 'reference', 'level', 'source', 'label'}
+    g1 = long[(long['Group'] == 'G1') & (long['source'] == 'Human')]
+    assert sorted(g1['label']) == ['a', 'b']
+    assert set(long['reference']) == {'ABCmouse'} and set(long['level']) == {'SUBC'}
+
+
+def test_votes_and_consensus():
+    votes = label_votes(explode_lists(SHEET)).set_index(['Group', 'label'])
+    assert votes.loc[('G1', 'a'), 'votes'] == 3 and votes.loc[('G1', 'a'), 'reciprocal']
+    assert votes.loc[('G1', 'b'), 'votes'] == 2 and not votes.loc[('G1', 'b'), 'reciprocal']
+    # Macaque does not report G2, so two species suffice for a reciprocal hit
+    assert votes.loc[('G2', 'x'), 'reporting'] == 2 and votes.loc[('G2', 'x'), 'reciprocal']
+
+    summary = consensus(label_votes(explode_lists(SHEET))).set_index('Group')
+    assert summary.loc['G1', 'reciprocal'] == 'a'
+    assert summary.loc['G1', 'majority'] == 'a | b'
+    assert summary.loc['G1', 'agreement'] == 0.5
+    assert summary.loc['G2', 'majority'] == 'x'
+    assert summary['supplied_match'].all()
+
+
+def test_consensus_table():
+    table = consensus_table(SHEET)
+    assert table.columns.tolist() == ['Group', 'accession_group', 'ABCmouse_SUBC_reciprocal',
+                                      'ABCmouse_SUBC_majority', 'ABCmouse_SUBC_agreement']
+    assert table['Group'].tolist() == ['G1', 'G2']
+
+
+def test_committed_table_is_reproduced(tmp_path):
+    output = tmp_path / 'homology_consensus.tsv'
+    build_homology_consensus.main(['-o', str(output)])
+    assert output.read_text() == build_homology_consensus.DEFAULT_OUTPUT.read_text()
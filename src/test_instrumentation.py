@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from utils.instrumentation import Profiler, summarize
+
+
+def records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = Profiler('script', log_path=None)
+    profiler.log_path = tmp_path / 'stages.jsonl'
+    with profiler.stage('write') as st:
+        st.rows = 1
+    profiler.finish()
+    assert not profiler.log_path.exists()
+
+
+def test_stages_and_total_are_logged(tmp_path, capsys):
+    log = tmp_path / 'stages.jsonl'
+    output = tmp_path / 'out.tsv'
+    profiler = Profiler('script', log_path=log)
+    with profiler.stage('write') as st:
+        output.write_text('abc')
+        st.rows, st.path = 3, output
+    with pytest.raises(RuntimeError):
+        try:
+            with profiler.stage('query'):
+                raise RuntimeError('KG down')
+        finally:
+            profiler.finish()
+    logged = records(log)
+    assert [r['stage'] for r in logged] == ['write', 'query', '_total']
+    assert (logged[0]['rows'], logged[0]['bytes']) == (3, 3)
+    assert len({r['run_id'] for r in logged}) == 1
+    assert '[profile] _total' in capsys.readouterr().err
+
+
+def test_cprofile_dumps_slowest_stage(tmp_path):
+    profiler = Profiler('script', log_path=tmp_path / 'stages.jsonl', cprofile=True)
+    with profiler.stage('fast'):
+        pass
+    with profiler.stage('slow'):
+        sum(range(200000))
+    profiler.finish()
+    assert [p.name for p in tmp_path.glob('*.prof')] == [f'script-slow-{profiler.run_id}.prof']
+
+
+def test_summarize(tmp_path, capsys):
+    log = tmp_path / 'stages.jsonl'
+    for _ in range(2):
+        profiler = Profiler('script', log_path=log)
+        with profiler.stage('write') as st:
+            st.rows = 5
+        profiler.finish()
+    capsys.readouterr()
+    summarize(log)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[2].split()[:3] == ['script', 'write', '2']
@@ -0,0 +1,61 @@
+import importlib.util
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location(
+    'kg_snapshot', Path(__file__).resolve().parent / 'scripts' / 'kg_snapshot.py')
+kg_snapshot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(kg_snapshot)
+
+
+def signature(n, lo, hi, checksum=None):
+    return {'n': n, 'lo': lo, 'hi': hi, 'checksum': checksum}
+
+
+def test_id_ranges_cover_every_id_once():
+    ranges = kg_snapshot.id_ranges(10, 29, 3)
+    assert ranges == [(9, 16), (16, 23), (23, 29)]
+    covered = [i for after, upto in ranges for i in range(after + 1, upto + 1)]
+    assert covered == list(range(10, 30))
+
+
+def test_id_ranges_edge_cases():
+    assert kg_snapshot.id_ranges(None, None, 4) == []
+    assert kg_snapshot.id_ranges(5, 5, 4) == [(4, 5)]
+    assert kg_snapshot.id_ranges(1, 3, 0) == [(0, 3)]
+
+
+def test_refresh_plan():
+    old = signature(3, 1, 3, checksum=42)
+    assert kg_snapshot.refresh_plan(old, signature(3, 1, 3), full=False) == 'skip'
+    assert kg_snapshot.refresh_plan(old, signature(5, 1, 7), full=False) == ('append', 3)
+    assert kg_snapshot.refresh_plan(old, signature(3, 2, 4), full=False) == 'reload'
+    assert kg_snapshot.refresh_plan(old, signature(2, 1, 3), full=False) == 'reload'
+    assert kg_snapshot.refresh_plan(old, signature(3, 1, 3), full=True) == 'reload'
+    assert kg_snapshot.refresh_plan(None, signature(3, 1, 3), full=False) == 'reload'
+
+
+def test_refresh_plan_trusts_signature_unless_verifying():
+    # Same counts and ids, different content (e.g. an updated r.confidence)
+    old = signature(3, 1, 3, checksum=42)
+    assert kg_snapshot.refresh_plan(old, signature(3, 1, 3), full=False, checksum=43) == 'skip'
+    assert kg_snapshot.refresh_plan(old, signature(3, 1, 3), full=False, checksum=42, verify=True) == 'skip'
+    assert kg_snapshot.refresh_plan(old, signature(5, 1, 7), full=False, checksum=42, verify=True) == ('append', 3)
+    assert kg_snapshot.refresh_plan(old, signature(3, 1, 3), full=False, checksum=43, verify=True) == 'reload'
+    assert kg_snapshot.refresh_plan(old, signature(3, 1, 3), full=False, checksum=None, verify=True) == 'reload'
+
+
+def test_verify_range():
+    old = signature(3, 1, 3, checksum=42)
+    assert kg_snapshot.verify_range(old, signature(5, 1, 7)) == (1, 3)
+    assert kg_snapshot.verify_range(old, signature(3, 2, 4)) is None
+    assert kg_snapshot.verify_range(old, signature(2, 1, 2)) is None
+    assert kg_snapshot.verify_range(signature(3, 1, 3), signature(3, 1, 3)) is None
+    assert kg_snapshot.verify_range(signature(0, None, None, 0), signature(0, None, None)) == (None, None)
+
+
+def test_row_checksum_is_order_independent():
+    rows = [{'rel_id': 1, 'confidence': 0.5}, {'rel_id': 2, 'confidence': None}]
+    total = sum(map(kg_snapshot.row_checksum, rows)) % kg_snapshot.CHECKSUM_MOD
+    assert total == sum(map(kg_snapshot.row_checksum, rows[::-1])) % kg_snapshot.CHECKSUM_MOD
+    assert kg_snapshot.row_checksum({'rel_id': 1, 'confidence': 0.5}) != \
+        kg_snapshot.row_checksum({'rel_id': 1, 'confidence': 0.6})
@@ -0,0 +1,62 @@
+import pandas as pd
+
+from utils.label_resolver import LabelIndex, load_index, normalise, numbered
+
+
+def index():
+    idx = LabelIndex()
+    idx.add('CCN20230722', 'subclass', '0123 Foo Glut', 'CS_SUBC_123')
+    idx.add('CCN20230722', 'subclass', 'Astro_NT NN', 'CS_SUBC_001')
+    idx.add('CCN20230722', 'subclass', 'Oligo A', 'CS_SUBC_002')
+    idx.add('CCN20230722', 'subclass', 'OLIGO  a', 'CS_SUBC_003')
+    return idx.finish()
+
+
+def test_normalise():
+    assert normalise('318 Astro-NT_NN ') == 'astro-nt nn'
+    assert normalise('Oligo__A') == normalise('oligo a')
+    assert numbered('0123 Foo') and not numbered('Foo 0123')
+
+
+def test_resolve_exact_and_normalised():
+    idx = index()
+    assert idx.resolve('0123 Foo Glut', 'CCN20230722', 'subclass') == 'CS_SUBC_123'
+    assert idx.resolve('astro_nt  nn', 'CCN20230722') == 'CS_SUBC_001'
+    assert idx.resolve('astro nt', 'CCN20230722') is None
+
+
+def test_unnumbered_labels_match_numbered_ones():
+    idx = index()
+    assert idx.resolve('Foo Glut', 'CCN20230722', 'subclass') == 'CS_SUBC_123'
+    assert idx.resolve('foo_glut', 'CCN20230722') == 'CS_SUBC_123'
+
+
+def test_numbered_labels_resolve_exactly_only():
+    idx = index()
+    assert idx.resolve('0124 Foo Glut', 'CCN20230722', 'subclass') is None
+    assert idx.candidates('0124 Foo Glut', 'CCN20230722', 'subclass')[0][1] == 'CS_SUBC_123'
+
+
+def test_ambiguous_normalised_labels_do_not_resolve():
+    assert index().resolve('oligo a', 'CCN20230722', 'subclass') is None
+
+
+def test_resolve_series():
+    labels = pd.Series(['0123 Foo Glut', '0124 Foo Glut', 'ASTRO_NT NN', None], index=[0, 0, 1, 1])
+    resolved = index().resolve_series(labels, 'CCN20230722', 'subclass')
+    assert resolved.iloc[0] == 'CS_SUBC_123'
+    assert pd.isna(resolved.iloc[1])
+    assert resolved.iloc[2] == 'CS_SUBC_001'
+    assert pd.isna(resolved.iloc[3])
+
+
+def test_load_index_removes_stale_pickles(tmp_path):
+    source = tmp_path / 'labels.tsv'
+    source.write_text('label\taccession\nFoo\thttps://example.org/CCN20230722/CS_1\n')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    (cache_dir / 'old.pkl').write_bytes(b'')
+    idx = load_index(sources=[source], cache_dir=cache_dir)
+    assert idx.resolve('foo', 'CCN20230722', 'subclass') == 'CS_1'
+    assert len(list(cache_dir.glob('*.pkl'))) == 1
+    assert not (cache_dir / 'old.pkl').exists()
@@ -0,0 +1,48 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+spec = importlib.util.spec_from_file_location(
+    'load_mappings', Path(__file__).resolve().parent / 'scripts' / 'load_mappings.py')
+load_mappings = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_mappings)
+
+project_root = Path(__file__).resolve().parent.parent
+
+
+def kg_iris():
+    """IRIs of the Cell_cluster nodes exported from the KG."""
+    iris = set(pd.read_csv(project_root / 'resources' / 'maps' / 'cell_set_map.tsv', sep='\t', dtype=str)['iri'])
+    iris |= set(pd.read_csv(project_root / 'resources' / 'mouse_cc_label_iri.tsv', sep='\t', dtype=str)['accession'])
+    return iris
+
+
+def test_bg2wmb_mappings_use_kg_iris():
+    path, prefixes = load_mappings.TEMPLATES['bg2wmb']
+    rows = load_mappings.template_rows(path, prefixes)
+    assert rows
+    iris = kg_iris()
+    assert {r['object'] for r in rows} <= iris
+    assert {r['subject'] for r in rows} <= iris
+
+
+def test_mapping_rows():
+    entity = {'id': 'https://example.org/bg/G1', 'types': [], 'annotations': [
+        ['http://www.w3.org/2000/01/rdf-schema#label', 'Astrocyte', False, None, None, []],
+        [load_mappings.SKOS + 'exactMatch', 'https://example.org/wmb/S1', True, None, None,
+         [(load_mappings.CONFIDENCE_PROPERTY, '0.75', False, None, None)]],
+        [load_mappings.SKOS + 'broadMatch', 'not an IRI', False, None, None, []],
+    ]}
+    assert list(load_mappings.mapping_rows([entity])) == [
+        {'rel': 'exactMatch', 'property_iri': load_mappings.SKOS + 'exactMatch',
+         'subject': 'https://example.org/bg/G1', 'object': 'https://example.org/wmb/S1', 'confidence': 0.75}]
+
+
+def test_delta_rows_use_kg_iris():
+    delta = {'rows': {'BG:CS20250428_GROUP_0039': {
+        'added': [{'rel': 'relatedMatch', 'object': 'WMB:CS20230722_SUBC_318'}], 'removed': []}}}
+    added, removed = load_mappings.delta_rows(delta, load_mappings.TEMPLATES['bg2wmb'][1])
+    assert added[0]['object'] == 'https://purl.brain-bican.org/ontology/CCN20230722/CS20230722_SUBC_318'
+    assert added[0]['subject'] == 'https://purl.brain-bican.org/ontology/CS20250428/CS20250428_GROUP_0039'
+    assert removed == []
@@ -1,5 +1,11 @@
-from utils.schema_test_tools import test_local
+from utils import schema_test_tools
 
-test_local(path_to_schema_dir='config/dumps/',
-           schema_file='neo4j2owl_config_schema.json',
-           path_to_test_dir='config/dumps/')
+
+def test_neo2owl_config():
+    schema_test_tools.test_local(path_to_schema_dir='config/dumps/',
+                                 schema_file='neo4j2owl_config_schema.json',
+                                 path_to_test_dir='config/dumps/')
+
+
+if __name__ == '__main__':
+    test_neo2owl_config()
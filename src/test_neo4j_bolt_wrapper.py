@@ -0,0 +1,88 @@
+import io
+import json
+
+from utils.neo4j_bolt_wrapper import Neo4jBoltQueryWrapper, write_csv, write_jsonl
+
+
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+
+class FakeSession:
+    def __init__(self, driver, fetch_size=None):
+        self.driver = driver
+        driver.fetch_sizes.append(fetch_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters):
+        for row in self.driver.rows:
+            self.driver.pulled += 1
+            yield FakeRecord(row)
+
+
+class FakeDriver:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pulled = 0
+        self.fetch_sizes = []
+
+    def session(self, **kwargs):
+        return FakeSession(self, **kwargs)
+
+
+def wrapper(rows):
+    w = Neo4jBoltQueryWrapper('bolt://unused', test_connection=False)
+    w.driver = FakeDriver(rows)
+    return w
+
+
+def test_stream_query_is_lazy():
+    w = wrapper([{'n': i} for i in range(10)])
+    records = w.stream_query('MATCH (n) RETURN n', fetch_size=3)
+    assert next(records) == {'n': 0}
+    assert w.driver.pulled == 1
+    assert list(records) == [{'n': i} for i in range(1, 10)]
+    assert w.driver.fetch_sizes == [3]
+
+
+def test_stream_query_batches():
+    w = wrapper([{'n': i} for i in range(5)])
+    batches = list(w.stream_query('MATCH (n) RETURN n', batch_size=2))
+    assert [[r['n'] for r in b] for b in batches] == [[0, 1], [2, 3], [4]]
+
+
+def test_write_jsonl():
+    out = io.StringIO()
+    assert write_jsonl([{'label': 'Ä', 'refs': ['a', 'b']}, {'label': None, 'refs': []}], out) == 2
+    lines = out.getvalue().splitlines()
+    assert lines[0] == '{"label": "Ä", "refs": ["a", "b"]}'
+    assert json.loads(lines[1]) == {'label': None, 'refs': []}
+
+
+def test_write_csv_encodes_nested_values():
+    out = io.StringIO()
+    records = [{'Group': 'Astrocyte', 'refs': ['doi:1', 'doi:2'], 'cl': {'id': 'CL:1'}},
+               {'Group': 'Oligo, OPC', 'refs': [], 'cl': None}]
+    assert write_csv(records, out) == 2
+    assert out.getvalue().splitlines() == [
+        'Group,refs,cl',
+        'Astrocyte,"[""doi:1"",""doi:2""]","{""id"":""CL:1""}"',
+        '"Oligo, OPC",[],',
+    ]
+
+
+def test_write_query_formats():
+    w = wrapper([{'n': 1, 'xs': [1]}])
+    out = io.StringIO()
+    assert w.write_query('RETURN 1', out, output_format='csv', delimiter='\t') == 1
+    assert out.getvalue().splitlines() == ['n\txs', '1\t[1]']
+    assert write_csv([], io.StringIO()) == 0
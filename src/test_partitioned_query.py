@@ -0,0 +1,27 @@
+from utils.partitioned_query import merge_ordered, split
+
+
+def test_split():
+    assert split(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+    assert split([1, 2], 5) == [[1], [2]]
+    assert split([], 3) == [[]]
+
+
+def test_merge_ordered_restores_multi_column_order():
+    results = [
+        [{'group': 'b', 'n': 1}, {'group': 'a', 'n': 1}],
+        [{'group': 'a', 'n': 2}, {'group': 'b', 'n': 3}],
+    ]
+    merged = merge_ordered(results, [('group', False), ('n', True)])
+    assert [(r['group'], r['n']) for r in merged] == [('a', 2), ('a', 1), ('b', 3), ('b', 1)]
+
+
+def test_merge_ordered_nulls_last_ascending_first_descending():
+    results = [[{'group': None}, {'group': 'b'}], [{'group': 'a'}]]
+    assert [r['group'] for r in merge_ordered(results, [('group', False)])] == ['a', 'b', None]
+    assert [r['group'] for r in merge_ordered(results, [('group', True)])] == [None, 'b', 'a']
+
+
+def test_merge_ordered_is_stable():
+    results = [[{'group': 'a', 'i': 0}], [{'group': 'a', 'i': 1}], [{'group': 'a', 'i': 2}]]
+    assert [r['i'] for r in merge_ordered(results, [('group', False)])] == [0, 1, 2]
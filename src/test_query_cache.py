@@ -0,0 +1,59 @@
+import os
+from types import SimpleNamespace
+
+from utils.query_cache import QueryCache, normalise_query
+
+
+def cache(tmp_path, **kwargs):
+    c = QueryCache(cache_dir=tmp_path, **kwargs)
+    wrapper = SimpleNamespace(endpoint='bolt://test')
+    # Skip the KG fingerprint query
+    c.fingerprints[wrapper.endpoint] = 'build:test'
+    return c, wrapper
+
+
+def test_normalise_query():
+    assert normalise_query('// comment\nMATCH (n)\n  RETURN n ;') == 'MATCH (n) RETURN n'
+
+
+def test_miss_then_hit(tmp_path):
+    c, wrapper = cache(tmp_path)
+    rows = [{'n': i} for i in range(2500)]
+    assert list(c.fetch(wrapper, 'RETURN 1', {'a': 1}, lambda: iter(rows))) == rows
+    assert list(c.fetch(wrapper, 'RETURN  1', {'a': 1}, lambda: iter([]))) == rows
+    assert (c.hits, c.misses) == (1, 1)
+    # A second process sees the entry without any shared index
+    other, _ = cache(tmp_path)
+    assert list(other.fetch(wrapper, 'RETURN 1', {'a': 1}, lambda: iter([]))) == rows
+    assert list(c.fetch(wrapper, 'RETURN 1', {'a': 2}, lambda: iter([{'n': 0}]))) == [{'n': 0}]
+
+
+def test_partial_read_is_not_cached(tmp_path):
+    c, wrapper = cache(tmp_path)
+    records = c.fetch(wrapper, 'RETURN 1', None, lambda: iter([{'n': 1}, {'n': 2}]))
+    assert next(records) == {'n': 1}
+    records.close()
+    assert c.entries() == []
+    assert not list(tmp_path.glob('.tmp-*'))
+
+
+def test_refresh_and_clear(tmp_path):
+    c, wrapper = cache(tmp_path)
+    c.put(c.key('RETURN 1', None, 'build:test'), [{'n': 1}])
+    fresh, _ = cache(tmp_path, refresh=True)
+    assert list(fresh.fetch(wrapper, 'RETURN 1', None, lambda: iter([{'n': 2}]))) == [{'n': 2}]
+    assert list(c.fetch(wrapper, 'RETURN 1', None, lambda: iter([]))) == [{'n': 2}]
+    c.clear()
+    assert c.entries() == []
+
+
+def test_evicts_least_recently_used(tmp_path):
+    c, _ = cache(tmp_path)
+    keys = [c.key(f'RETURN {i}', None, 'build:test') for i in range(3)]
+    for i, key in enumerate(keys):
+        c.put(key, [{'n': i}])
+        os.utime(c._path(key), (1000 + i, 1000 + i))
+    list(c.get(keys[0]))
+    c.max_bytes = sum(size for _, size, _ in c.entries()) - 1
+    c._evict()
+    assert sorted(p.name for p, _, _ in c.entries()) == sorted(c._path(k).name for k in (keys[0], keys[2]))
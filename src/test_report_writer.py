@@ -0,0 +1,61 @@
+import csv
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from utils.report_writer import ReportWriter, write_report
+
+REPORT = Path(__file__).resolve().parent.parent / 'reports' / 'BG_mappings.csv'
+
+
+def cell(value):
+    if value == '':
+        return None
+    if value[:1] in '[{':
+        return json.loads(value)
+    return value
+
+
+def test_matches_committed_report(tmp_path):
+    """Records read back from the committed report are written out identically."""
+    if not REPORT.exists():
+        pytest.skip('no committed report')
+    with open(REPORT, newline='', encoding='utf-8') as f:
+        records = [{k: cell(v) for k, v in row.items()} for row in csv.DictReader(f)]
+    md = REPORT.with_suffix('.md').read_text(encoding='utf-8')
+    query = re.search(r'```cypher\n(.*?)\n```', md, re.S).group(1)
+
+    out = tmp_path / 'BG_mappings.csv'
+    assert write_report(records, out, query) == len(records)
+    # The committed copy is LF-normalised by .gitattributes
+    assert out.read_bytes().replace(b'\r\n', b'\n') == REPORT.read_bytes()
+    assert out.with_suffix('.md').read_text(encoding='utf-8') == md
+
+
+def test_shard_by_key(tmp_path):
+    records = [{'Group': 'b', 'n': 1}, {'Group': 'a', 'n': 2}, {'Group': 'b', 'n': 3}]
+    out = tmp_path / 'r.csv'
+    assert write_report(records, out, 'RETURN 1', shard_key='Group') == 3
+    pages = sorted((tmp_path / 'r').glob('page-*.md'))
+    assert [p.name for p in pages] == ['page-0001.md', 'page-0002.md']
+    assert pages[0].read_text().splitlines()[2:] == ['| b | 1 |', '| b | 3 |']
+    assert pages[1].read_text().splitlines()[2:] == ['| a | 2 |']
+    index = (tmp_path / 'r.md').read_text()
+    assert '| [1](r/page-0001.md) | 2 | b |' in index
+    assert '| [2](r/page-0002.md) | 1 | a |' in index
+    assert '```cypher\nRETURN 1\n```' in index
+    # The CSV is not sharded
+    assert out.read_text().count('\n') == 4
+
+
+def test_unknown_shard_key(tmp_path):
+    with pytest.raises(ValueError):
+        write_report([{'n': 1}], tmp_path / 'r.csv', shard_key='Group')
+
+
+def test_failed_open_is_not_masked(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        with ReportWriter(tmp_path / 'missing' / 'r.csv') as writer:
+            writer.write({'n': 1})
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from utils.robot_template import emit, parse_directive, parse_prefixes, read_template
+
+PREFIXES = parse_prefixes(['BG: https://example.org/bg/', 'WMB: https://example.org/wmb/'])
+SKOS = 'http://www.w3.org/2004/02/skos/core#'
+TEMPLATE = (
+    'Group\tType\taccession_group\tWMB_exact_match\tWMB_related_match\tconfidence\n'
+    'LABEL\tTYPE\tID\tAI skos:exactMatch SPLIT=| \tAI skos:relatedMatch SPLIT=| \t>AT rdfs:comment^^xsd:float\n'
+    'Astrocyte\towl:NamedIndividual\tBG:G1\t\tWMB:S1|WMB:S2\t0.9\n'
+    'Oligo & <OPC>\towl:NamedIndividual\tBG:G2\tWMB:S3\t\t\n'
+    'No id\towl:NamedIndividual\t\tWMB:S4\t\t\n'
+)
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / 'template.tsv'
+    path.write_text(TEMPLATE)
+    return path
+
+
+def test_parse_directive():
+    assert parse_directive('', PREFIXES) is None
+    assert parse_directive('ID', PREFIXES) == {'kind': 'ID', 'split': None}
+    spec = parse_directive('AI skos:exactMatch SPLIT=|', PREFIXES)
+    assert (spec['kind'], spec['property'], spec['iri_value'], spec['split']) == \
+        ('ANNOTATION', SKOS + 'exactMatch', True, '|')
+    with pytest.raises(ValueError):
+        parse_directive('C %', PREFIXES)
+    with pytest.raises(ValueError):
+        parse_directive('A nope:label', PREFIXES)
+
+
+def test_read_template(template):
+    entities = list(read_template(template, PREFIXES))
+    assert [e['id'] for e in entities] == ['https://example.org/bg/G1', 'https://example.org/bg/G2']
+    first = entities[0]
+    assert first['types'] == ['http://www.w3.org/2002/07/owl#NamedIndividual']
+    related = [a for a in first['annotations'] if a[0] == SKOS + 'relatedMatch']
+    assert [a[1] for a in related] == ['https://example.org/wmb/S1', 'https://example.org/wmb/S2']
+    # The axiom annotation applies to every value of the previous column
+    assert all(a[5] and a[5][0][1] == '0.9' for a in related)
+
+
+@pytest.mark.parametrize('fmt', ['rdfxml', 'turtle'])
+def test_emit_parses_to_the_template_triples(template, fmt):
+    rdflib = pytest.importorskip('rdflib')
+    out = io.StringIO()
+    assert emit(template, out, PREFIXES, fmt) == 2
+    graph = rdflib.Graph().parse(data=out.getvalue(), format='xml' if fmt == 'rdfxml' else 'turtle')
+    g1, g2 = rdflib.URIRef('https://example.org/bg/G1'), rdflib.URIRef('https://example.org/bg/G2')
+    skos = rdflib.Namespace(SKOS)
+    assert set(graph.objects(g1, skos.relatedMatch)) == {rdflib.URIRef('https://example.org/wmb/S1'),
+                                                         rdflib.URIRef('https://example.org/wmb/S2')}
+    assert set(graph.objects(g2, skos.exactMatch)) == {rdflib.URIRef('https://example.org/wmb/S3')}
+    assert str(graph.value(g2, rdflib.RDFS.label)) == 'Oligo & <OPC>'
+    # One owl:Axiom per annotated relatedMatch assertion
+    axioms = set(graph.subjects(rdflib.RDF.type, rdflib.OWL.Axiom))
+    assert len(axioms) == 2
+    assert {float(graph.value(a, rdflib.RDFS.comment)) for a in axioms} == {0.9}
@@ -0,0 +1,36 @@
+from utils.row_delta import apply_mapping_delta, mapping_delta
+
+BEFORE = {
+    'BG1': {('exactMatch', 'WMB:1')},
+    'BG2': {('relatedMatch', 'WMB:2')},
+    'BG3': {('broadMatch', 'WMB:3')},
+}
+AFTER = {
+    'BG1': {('exactMatch', 'WMB:1')},
+    'BG2': {('relatedMatch', 'WMB:2'), ('exactMatch', 'WMB:9')},
+    'BG4': {('exactMatch', 'WMB:4')},
+}
+
+
+def test_mapping_delta():
+    delta = mapping_delta(BEFORE, AFTER, labels={'BG2': 'Two'})
+    assert sorted(delta) == ['BG2', 'BG3', 'BG4']
+    assert delta['BG2'] == {'label': 'Two', 'status': 'changed',
+                            'added': [{'rel': 'exactMatch', 'object': 'WMB:9'}], 'removed': []}
+    assert delta['BG3']['status'] == 'removed'
+    assert delta['BG3']['removed'] == [{'rel': 'broadMatch', 'object': 'WMB:3'}]
+    assert delta['BG4']['status'] == 'added'
+    assert delta['BG4']['label'] is None
+
+
+def test_mapping_delta_keeps_rows_that_lose_all_mappings():
+    delta = mapping_delta({'BG1': set()}, {})
+    assert delta['BG1']['status'] == 'removed'
+    assert mapping_delta(BEFORE, BEFORE) == {}
+
+
+def test_apply_mapping_delta_round_trip():
+    delta = {'rows': mapping_delta(BEFORE, AFTER)}
+    assert apply_mapping_delta(BEFORE, delta) == AFTER
+    # The input state is not modified
+    assert BEFORE['BG2'] == {('relatedMatch', 'WMB:2')}
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from utils.score_matrix import (ScoreMatrixStore, load_score_matrix, read_matrix_tsv, read_neighbor_tsv,
+                                scores_above, species_order)
+
+MATRIX = ('\ths_1\tmm_a\tmm_b\n'
+          'hs_1\t1\t0.25\t0.5\n'
+          'mm_a\t0.25\t1\t0.125\n'
+          'mm_b\t0.5\t0.125\t1\n')
+
+
+def melt_reference(path, threshold):
+    """The long format the scFAIR script built before score_matrix (full melt, then filter)."""
+    raw = pd.read_csv(path, sep='\t', header=None)
+    matrix = raw.iloc[1:, 1:].astype(float)
+    matrix.columns = raw.iloc[0, 1:].tolist()
+    matrix.index = raw.iloc[1:, 0].tolist()
+    long_df = matrix.reset_index().melt(id_vars='index', var_name='c', value_name='score')
+    long_df = long_df.rename(columns={'index': 'r'})
+    return long_df[long_df['score'] >= threshold].reset_index(drop=True)
+
+
+def test_read_matrix_tsv(tmp_path):
+    path = tmp_path / 'm.tsv'
+    path.write_text(MATRIX)
+    values, rows, cols = read_matrix_tsv(path)
+    assert values.dtype == np.float32
+    assert rows == cols == ['hs_1', 'mm_a', 'mm_b']
+    assert values[0, 2] == np.float32(0.5)
+
+
+def test_scores_above_matches_melt(tmp_path):
+    path = tmp_path / 'm.tsv'
+    path.write_text(MATRIX)
+    values, rows, cols = read_matrix_tsv(path)
+    for threshold in (0.1, 0.25, 0.6):
+        expected = melt_reference(path, threshold)
+        for chunk_size in (1, 2, 4096):
+            pd.testing.assert_frame_equal(scores_above(values, rows, cols, threshold, chunk_size), expected)
+
+
+def test_scores_above_empty():
+    result = scores_above(np.zeros((2, 0), dtype=np.float32), ['a', 'b'], [], 0.5)
+    assert list(result.columns) == ['r', 'c', 'score'] and result.empty
+
+
+def test_load_score_matrix_caches(tmp_path):
+    path = tmp_path / 'm.tsv'
+    path.write_text(MATRIX)
+    cache_dir = tmp_path / 'cache'
+    first = load_score_matrix(path, cache_dir)
+    assert len(list(cache_dir.glob('*.npy'))) == 1
+    values, rows, cols = load_score_matrix(path, cache_dir)
+    assert isinstance(values, np.memmap)
+    np.testing.assert_array_equal(values, first[0])
+    assert (rows, cols) == (first[1], first[2])
+
+
+# sm_cluster.D.tsv layout: each cluster's ranked neighbours as (neighbour, score) column pairs
+NEIGHBOURS = ('mm_a\tmm_a\ths_1\ths_1\n'
+              'Cluster\tAlignment score\tCluster\tAlignment score\n'
+              'hs_1\t0.5\tmm_a\t0.5\n'
+              'mm_a\t0.25\ths_1\t0.25\n')
+
+
+def test_species_order():
+    order, blocks = species_order(['mm_a', 'hs_1', 'mm_b', 'hs_2'])
+    assert order == [1, 3, 0, 2]
+    assert blocks == {'hs': [0, 2], 'mm': [2, 4]}
+
+
+def test_read_neighbor_tsv(tmp_path):
+    path = tmp_path / 'D.tsv'
+    path.write_text(NEIGHBOURS)
+    values, rows, cols = read_neighbor_tsv(path)
+    assert rows == cols == ['mm_a', 'hs_1']
+    # matrix[neighbour, cluster]
+    assert values[1, 0] == np.float32(0.5) and values[0, 0] == np.float32(0.25)
+    assert values[0, 1] == np.float32(0.5) and values[1, 1] == np.float32(0.25)
+
+
+def test_store_blocks_nearest_and_pairs(tmp_path):
+    path = tmp_path / 'm.tsv'
+    path.write_text(MATRIX)
+    store = ScoreMatrixStore.open(path, cache_dir=tmp_path / 'cache')
+    values, rows, cols = store.block('hs', 'mm')
+    assert rows == ['hs_1'] and cols == ['mm_a', 'mm_b']
+    np.testing.assert_array_equal(values, [[0.25, 0.5]])
+
+    nearest = store.nearest('hs_1', k=5)
+    # The cluster itself is not its own neighbour
+    assert nearest['cluster'].tolist() == ['mm_b', 'mm_a']
+    assert nearest['rank'].tolist() == [1, 2]
+    assert store.nearest('mm_a', k=1, species='mm')['cluster'].tolist() == ['mm_b']
+
+    pairs = store.pairs_above(0.5, 'mm', 'hs')
+    assert pairs[['r', 'c']].values.tolist() == [['mm_b', 'hs_1']]
+    # Reopening reuses the converted store
+    assert ScoreMatrixStore.open(path, cache_dir=tmp_path / 'cache').directory == store.directory
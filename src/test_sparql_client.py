@@ -0,0 +1,28 @@
+import pytest
+
+from utils.sparql_client import subject_partitions, subject_variable, where_body
+
+QUERY = 'PREFIX ex: <http://example.org/>\nCONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }'
+
+
+def test_subject_partitions_one_per_prefix():
+    partitions = subject_partitions(QUERY)
+    assert list(partitions) == list('0123456789abcdef')
+    assert len(subject_partitions(QUERY, prefix_length=2)) == 256
+    assert all(q.startswith(QUERY[:QUERY.rfind('}')]) and q.rstrip().endswith('}') for q in partitions.values())
+
+
+def test_subject_partitions_blank_nodes_in_first_only():
+    partitions = subject_partitions(QUERY)
+    assert 'IF(isBlank(?s), true, STRSTARTS(MD5(STR(?s)), "0"))' in partitions['0']
+    assert '!isBlank(?s) && STRSTARTS(MD5(STR(?s)), "f")' in partitions['f']
+
+
+def test_subject_partitions_variable():
+    assert subject_variable('SELECT * WHERE { ?x ?p ?y }') == 'x'
+    assert 'MD5(STR(?o))' in subject_partitions(QUERY, variable='o')['1']
+
+
+def test_short_construct_is_rejected():
+    with pytest.raises(ValueError):
+        where_body('CONSTRUCT WHERE { ?s ?p ?o }')
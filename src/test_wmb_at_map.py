@@ -0,0 +1,54 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from utils.label_resolver import LabelIndex
+
+spec = importlib.util.spec_from_file_location(
+    'WMB_AT_map', Path(__file__).resolve().parent / 'scripts' / 'WMB_AT_map.py')
+WMB_AT_map = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(WMB_AT_map)
+
+
+def test_template_matches_committed(tmp_path):
+    """Rebuilding the BG2WMB template from the cached taxonomy JSON reproduces the committed TSV."""
+    cache = WMB_AT_map.fetch_cache.FetchCache(offline=True)
+    if cache._cached(WMB_AT_map.WMB_TAXONOMY_URL) is None:
+        pytest.skip('WMB taxonomy JSON is not in the fetch cache')
+    output = tmp_path / 'BG2WMB_AT_map_template.tsv'
+    WMB_AT_map.main(['--offline', '-o', str(output)])
+    assert output.read_text() == WMB_AT_map.DEFAULT_OUTPUT.read_text()
+
+
+def index():
+    idx = LabelIndex()
+    for labelset, label, accession in [('subclass', '0001 A NN', 'CS_SUBC_1'), ('subclass', '0002 B NN', 'CS_SUBC_2'),
+                                       ('supertype', '0010 A NN_1', 'CS_SUPT_10'),
+                                       ('supertype', '0011 A NN_2', 'CS_SUPT_11')]:
+        idx.add(WMB_AT_map.label_resolver.WMB_TAXONOMY, labelset, label, accession)
+    return idx.finish()
+
+
+def test_labels_to_accessions_keeps_order_and_reports_unresolved():
+    labels = pd.Series(['0011 A NN_2 | 0010 A NN_1', None, 'nope|0001 A NN'], index=[5, 6, 7])
+    accessions, counts, unresolved = WMB_AT_map.labels_to_accessions(labels, index())
+    assert accessions.tolist() == ['WMB:CS_SUPT_11|WMB:CS_SUPT_10', '', 'WMB:CS_SUBC_1']
+    assert counts.tolist() == [2, 0, 1]
+    assert unresolved == ['nope']
+
+
+def test_build_template_match_rules():
+    homology = pd.DataFrame({
+        'Group': ['one supertype', 'many supertypes, one subclass', 'many subclasses', 'one subclass'],
+        'accession_group': ['G1', 'G2', 'G3', 'G4'],
+        'curated_ABC_WMB_supertype': ['0010 A NN_1', '0010 A NN_1|0011 A NN_2', '0010 A NN_1|0011 A NN_2', ''],
+        'curated_ABC_WMB_subclass': ['0001 A NN', '0001 A NN', '0001 A NN|0002 B NN', '0002 B NN'],
+    })
+    template = WMB_AT_map.build_template(homology, index())
+    assert template['accession_group'].tolist() == ['BG:G1', 'BG:G2', 'BG:G3', 'BG:G4']
+    assert template['WMB_exact_match'].tolist() == ['WMB:CS_SUPT_10', 'WMB:CS_SUBC_1', '', '']
+    assert template['WMB_related_match'].tolist() == [
+        '', 'WMB:CS_SUPT_10|WMB:CS_SUPT_11', 'WMB:CS_SUPT_10|WMB:CS_SUPT_11|WMB:CS_SUBC_1|WMB:CS_SUBC_2', '']
+    assert template['WMB_broad_match'].tolist() == ['WMB:CS_SUBC_1', '', '', 'WMB:CS_SUBC_2']
@@ -0,0 +1,43 @@
+import argparse
+import importlib.util
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location('wmbkg', Path(__file__).resolve().parent / 'scripts' / 'wmbkg.py')
+wmbkg = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wmbkg)
+
+
+def parsers():
+    # The global options that matter for splitting, as declared in wmbkg.main
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--endpoint')
+    parser.add_argument('--cache', action='store_true')
+    parser.add_argument('--profile', nargs='?', const='')
+    result = {None: parser}
+    for name, (_, add_options, _) in wmbkg.COMMANDS.items():
+        result[name] = argparse.ArgumentParser()
+        add_options(result[name])
+    return result
+
+
+def test_split_commands():
+    head, groups = wmbkg.split_commands(
+        ['--endpoint', 'bolt://localhost:7688', 'templates', '--offline', 'owl', 'maps'], parsers())
+    assert head == ['--endpoint', 'bolt://localhost:7688']
+    assert groups == [('templates', ['--offline']), ('owl', []), ('maps', [])]
+
+
+def test_option_values_are_not_subcommands():
+    head, groups = wmbkg.split_commands(['report', '--query', 'maps', '--format', 'csv', 'owl'], parsers())
+    assert head == []
+    assert groups == [('report', ['--query', 'maps', '--format', 'csv']), ('owl', [])]
+    _, groups = wmbkg.split_commands(['report', '--query=maps', 'maps'], parsers())
+    assert groups == [('report', ['--query=maps']), ('maps', [])]
+
+
+def test_optional_values():
+    head, groups = wmbkg.split_commands(['--profile', 'maps'], parsers())
+    assert head == ['--profile']
+    assert groups == [('maps', [])]
+    head, _ = wmbkg.split_commands(['--profile', 'run.jsonl', '--cache', 'owl'], parsers())
+    assert head == ['--profile', 'run.jsonl', '--cache']
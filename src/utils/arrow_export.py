@@ -0,0 +1,142 @@
+"""
+Typed Arrow/Parquet output for KG query results.
+
+Records are collected into Arrow record batches of batch_size rows and appended to a
+Parquet file (or an Arrow IPC / Feather v2 file) as they stream in, so nested values such as
+refs (list<string>) and cl_mappings (list<struct>) and integer columns such as
+labelset_rank keep their types. Known outputs (maps, BG reports) have fixed schemas, see
+known_schema(); otherwise the schema is inferred from the first batch. Values are cast to
+the schema's types where they do not already match, e.g. labelset_rank, which the KG
+stores as a string list (ls.rank), is written as int64; empty strings become null.
+
+pyarrow is only needed when this output is requested:
+    pip install pyarrow
+"""
+from pathlib import Path
+
+DEFAULT_BATCH_SIZE = 10000
+FORMATS = ('parquet', 'arrow')
+SUFFIXES = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Arrow/Parquet output requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _schemas(pa):
+    cell_set = pa.struct([('id', pa.string()), ('name', pa.string()),
+                          ('labelset', pa.string()), ('cell_set', pa.string())])
+    at = pa.struct([('labelset', pa.string()), ('cell_set', pa.string())])
+    report_bg = pa.schema([('Group', pa.string()), ('cl_mappings', pa.list_(cell_set)),
+                           ('WMB_AT', pa.list_(at)), ('refs', pa.list_(pa.string())),
+                           ('no_cl_mapping', pa.bool_())])
+    return {
+        'cell_set_map': pa.schema([('dataset', pa.string()), ('labelset', pa.string()),
+                                   ('labelset_rank', pa.int64()), ('label', pa.string()),
+                                   ('iri', pa.string())]),
+        'mouse_subclass_labels': pa.schema([('label', pa.string()), ('accession', pa.string())]),
+        'REPORT_BG_MAPPINGS': report_bg,
+        'REPORT_BG_MAPPINGS_CLOSURE': report_bg,
+    }
+
+
+def known_schema(name):
+    """Arrow schema for a named output (see _schemas), or None to infer it."""
+    return _schemas(_pyarrow()).get(name)
+
+
+def output_path(path, fmt):
+    """path with the suffix for fmt."""
+    return Path(path).with_suffix(SUFFIXES[fmt])
+
+
+class ArrowBatchWriter:
+    def __init__(self, path, fmt='parquet', schema=None, batch_size=DEFAULT_BATCH_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.pa = _pyarrow()
+        self.path = Path(path)
+        self.fmt = fmt
+        self.schema = schema
+        self.batch_size = batch_size
+        self.rows = 0
+        self._batch = []
+        self._writer = None
+
+    def _flush(self):
+        if not self._batch:
+            return
+        pa = self.pa
+        if self.schema is None:
+            self.schema = pa.RecordBatch.from_pylist(self._batch).schema
+        batch = self._record_batch(self._batch)
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.fmt == 'parquet':
+                self._writer = pa.parquet.ParquetWriter(self.path, self.schema, compression='zstd')
+            else:
+                self._writer = pa.ipc.new_file(str(self.path), self.schema)
+        self._writer.write_batch(batch)
+        self._batch = []
+
+    def _record_batch(self, rows):
+        """rows as a RecordBatch of self.schema, casting columns whose values have other types."""
+        pa = self.pa
+        try:
+            return pa.RecordBatch.from_pylist(rows, schema=self.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        columns = []
+        for field in self.schema:
+            values = [row.get(field.name) for row in rows]
+            if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+                # Mixed str/number values: parse them all from their string form
+                values = [None if v is None or v == '' else str(v) for v in values]
+                columns.append(pa.array(values, pa.string()).cast(field.type))
+            else:
+                columns.append(pa.array(values).cast(field.type))
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def write(self, record):
+        self._batch.append(record)
+        self.rows += 1
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        """Write the last batch and close the file. Returns the row count (no file for 0 rows)."""
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_records(records, path, fmt='parquet', schema=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Write an iterable of record dicts to path batch by batch. Returns the row count."""
+    with ArrowBatchWriter(path, fmt, schema, batch_size) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.rows
+
+
+def read_table(path):
+    """Read a Parquet or Arrow file written here into a pandas DataFrame."""
+    pa = _pyarrow()
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return pa.parquet.read_table(path).to_pandas()
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
@@ -0,0 +1,96 @@
+"""
+Top-k mouse matches per human cluster and label-agreement summaries for a cross-species
+score matrix (e.g. sm_cluster.mapping_table.tsv).
+
+Port of resources/scFAIR_Siletti_WMB_mapping/mouse_prediction.ipynb. Instead of melting
+the matrix and sorting every pair, the human x mouse and mouse x human sub-blocks are
+sliced out, combined into one score per (human, mouse) pair (the better of the two
+directions) and the k best mouse sets per human row are found by partial sorting.
+"""
+import numpy as np
+import pandas as pd
+
+HUMAN_PREFIX = 'hs_'
+MOUSE_PREFIX = 'mm_'
+# Human clusters annotated only as 'neuron' or 'cell'
+BROAD_LABELS = ['CL:0000540', 'CL:0000000']
+
+
+def species_indices(labels, prefix):
+    return np.flatnonzero(np.char.startswith(np.asarray(labels, dtype=str), prefix))
+
+
+def pair_scores(values, row_labels, col_labels):
+    """Return (human labels, mouse labels, scores[human, mouse]) taking, for each pair, the
+    better of the human->mouse and mouse->human scores (NaN only if both are). Every row label
+    must also be a column."""
+    values = np.asarray(values)
+    col_pos = {label: i for i, label in enumerate(col_labels)}
+    h_rows, m_rows = species_indices(row_labels, HUMAN_PREFIX), species_indices(row_labels, MOUSE_PREFIX)
+    human = [row_labels[i] for i in h_rows]
+    mouse = [row_labels[i] for i in m_rows]
+    h_cols = [col_pos[label] for label in human]
+    m_cols = [col_pos[label] for label in mouse]
+    forward = values[np.ix_(h_rows, m_cols)]
+    reverse = values[np.ix_(m_rows, h_cols)].T
+    # fmax: a score missing (NaN) in one direction falls back to the other
+    return human, mouse, np.fmax(forward, reverse)
+
+
+def top_k_matches(values, row_labels, col_labels, k=1):
+    """Return a long DataFrame (human_cluster, rank, mouse_cluster, score) with the k best
+    mouse sets for each human cluster."""
+    human, mouse, scores = pair_scores(values, row_labels, col_labels)
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    return pd.DataFrame({
+        'human_cluster': np.repeat(human, k),
+        'rank': np.tile(np.arange(1, k + 1), len(human)),
+        'mouse_cluster': np.asarray(mouse, dtype=object)[top.ravel()],
+        'score': top_scores.ravel().astype(np.float64),
+    })
+
+
+def label_agreement(top1, human_labels):
+    """Join best matches with human annotations and flag exact (case-insensitive) label agreement.
+
+    human_labels needs 'Cluster ID', 'cell_ontology_term' and 'cell_ontology_term_id' columns.
+    """
+    labels = human_labels.rename(columns={'Cluster ID': 'human_cluster_id', 'cell_ontology_term': 'human_label'})
+    best = top1.copy()
+    best['human_cluster_id'] = best['human_cluster'].str.extract(r'hs_(\d+)', expand=False).astype(int)
+    best = best.merge(labels, on='human_cluster_id', how='left')
+    best['mouse_label'] = best['mouse_cluster'].str.replace(MOUSE_PREFIX, '', regex=False)
+    best['label_match'] = best['mouse_label'].str.lower() == best['human_label'].str.lower()
+    best['broad'] = best['cell_ontology_term_id'].isin(BROAD_LABELS)
+    return best
+
+
+def agreement_summaries(best):
+    """Return (match rates, {scope: mismatch counts}) for scopes 'all', 'specific' and 'broad'."""
+    rates = pd.DataFrame({
+        'scope': ['all', 'specific', 'broad'],
+        'clusters': [len(best), int((~best['broad']).sum()), int(best['broad'].sum())],
+        'match_rate': [best['label_match'].mean(),
+                       best.loc[~best['broad'], 'label_match'].mean(),
+                       best.loc[best['broad'], 'label_match'].mean()],
+    })
+    # Count mismatching label pairs split by broad/specific once, then derive all three views
+    counts = (best[~best['label_match']]
+              .groupby(['broad', 'human_label', 'mouse_label'])
+              .size()
+              .reset_index(name='count'))
+
+    def ranked(frame):
+        return frame.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+    mismatches = {
+        'all': ranked(counts.groupby(['human_label', 'mouse_label'], as_index=False)['count'].sum()),
+        'specific': ranked(counts[~counts['broad']].drop(columns='broad')),
+        'broad': ranked(counts[counts['broad']].drop(columns='broad')),
+    }
+    return rates, mismatches
@@ -0,0 +1,100 @@
+"""
+Local cache for remote sources (WMB taxonomy JSON, consensus homology Google Sheet).
+
+Downloads are stored content-addressed under .cache/fetch/objects/<sha256> with an index
+mapping each URL to its current object plus the ETag / Last-Modified validators. Cached
+entries younger than max_age are used without touching the network; older ones are
+revalidated with If-None-Match / If-Modified-Since; if that request fails the cached copy is
+used with a warning, except when a refresh was asked for (refresh=True), where the error is
+raised. In offline mode (offline=True or WMBKG_OFFLINE=1) only the cache is used.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+project_root = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_DIR = project_root / '.cache' / 'fetch'
+DEFAULT_MAX_AGE = 3600
+
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class FetchCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, offline=None, max_age=DEFAULT_MAX_AGE, timeout=60):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / 'objects'
+        self.index_path = self.cache_dir / 'index.json'
+        if offline is None:
+            offline = os.environ.get('WMBKG_OFFLINE', '') not in ('', '0')
+        self.offline = offline
+        self.max_age = max_age
+        self.timeout = timeout
+        self.index = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+
+    def _save_index(self):
+        _atomic_write(self.index_path, json.dumps(self.index, indent=2).encode('utf-8'))
+
+    def _object_path(self, sha):
+        return self.objects_dir / sha
+
+    def _cached(self, url):
+        entry = self.index.get(url)
+        if entry and self._object_path(entry['sha256']).exists():
+            return entry
+        return None
+
+    def fetch(self, url, refresh=False):
+        """Return the local path of url's content, downloading or revalidating as needed."""
+        entry = self._cached(url)
+        if entry and (self.offline or (not refresh and time.time() - entry['checked'] < self.max_age)):
+            return self._object_path(entry['sha256'])
+        if self.offline:
+            raise FileNotFoundError(f"Offline mode and no cached copy of {url}")
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            resp = requests.get(url, headers=headers, timeout=self.timeout)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            if entry and not refresh:
+                print(f"Warning: could not revalidate {url} ({e}); using cached copy", file=sys.stderr)
+                return self._object_path(entry['sha256'])
+            raise
+
+        if resp.status_code == 304:
+            entry['checked'] = time.time()
+        else:
+            sha = hashlib.sha256(resp.content).hexdigest()
+            path = self._object_path(sha)
+            if not path.exists():
+                _atomic_write(path, resp.content)
+            entry = {
+                'sha256': sha,
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified'),
+                'checked': time.time(),
+            }
+            self.index[url] = entry
+        self._save_index()
+        return self._object_path(entry['sha256'])
+
+    def fetch_bytes(self, url, refresh=False):
+        return self.fetch(url, refresh=refresh).read_bytes()
+
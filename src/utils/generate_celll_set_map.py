@@ -6,6 +6,7 @@ Usage:
 """
 
 import argparse
+import itertools
 from pathlib import Path
 import importlib.util
 
@@ -20,32 +21,72 @@ neo4j_wrapper = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(neo4j_wrapper)
 Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
 
+# Arrow/Parquet output (pyarrow is imported only when requested)
+arrow_path = project_root / 'src' / 'utils' / 'arrow_export.py'
+spec = importlib.util.spec_from_file_location('arrow_export', arrow_path)
+arrow_export = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(arrow_export)
+
+# Query result cache
+cache_path = project_root / 'src' / 'utils' / 'query_cache.py'
+spec = importlib.util.spec_from_file_location('query_cache', cache_path)
+query_cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_cache)
+
+# Stage timing (--profile)
+instrumentation_path = project_root / 'src' / 'utils' / 'instrumentation.py'
+spec = importlib.util.spec_from_file_location('instrumentation', instrumentation_path)
+instrumentation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(instrumentation)
+
 # Cypher query file
 CY_FILE = project_root / 'src' / 'cypher' / 'cell_set_map.cypher'
 
-def main():
+def main(argv=None, wrapper=None):
 	parser = argparse.ArgumentParser(description="Generate cell set map TSV from Neo4j query.")
 	parser.add_argument('-o', '--output', type=str, required=True, help='Output TSV file path')
-	args = parser.parse_args()
+	parser.add_argument('--format', choices=['tsv'] + list(arrow_export.FORMATS), default='tsv',
+						help='Output format (parquet/arrow replace the output suffix)')
+	query_cache.add_cache_arguments(parser)
+	instrumentation.add_profile_arguments(parser)
+	args = parser.parse_args(argv)
+	profiler = instrumentation.profiler_from_args(args, 'generate_cell_set_map')
 	out_file = Path(args.output)
 
 	with open(CY_FILE, 'r') as f:
 		cypher = f.read()
 
-	wrapper = Neo4jBoltQueryWrapper("bolt://localhost:7687", test_connection=True)
-	results = wrapper.run_query(cypher, return_type=None)
+	if wrapper is None:
+		wrapper = Neo4jBoltQueryWrapper("bolt://localhost:7687", test_connection=True,
+										cache=query_cache.cache_from_args(args))
+	try:
+		# The query runs when the first row is fetched, so that belongs to the stage too
+		with profiler.stage('query_write') as st:
+			# Stream rows straight to the output file rather than collecting them first
+			results = wrapper.stream_query(cypher)
+			first = next(results, None)
 
-	if not results:
-		print("No results returned from query.")
-		return
+			if first is None:
+				print("No results returned from query.")
+				return
 
-	# Write header and rows
-	with open(out_file, 'w') as out:
-		header = results[0].keys()
-		out.write('\t'.join(header) + '\n')
-		for row in results:
-			out.write('\t'.join(str(row[h]) for h in header) + '\n')
-	print(f"Exported {len(results)} rows to {out_file}")
+			if args.format != 'tsv':
+				out_file = arrow_export.output_path(out_file, args.format)
+				n = arrow_export.write_records(itertools.chain([first], results), out_file, args.format,
+											   arrow_export.known_schema('cell_set_map'))
+			else:
+				# Write header and rows
+				n = 0
+				with open(out_file, 'w') as out:
+					header = list(first.keys())
+					out.write('\t'.join(header) + '\n')
+					for row in itertools.chain([first], results):
+						out.write('\t'.join(str(row[h]) for h in header) + '\n')
+						n += 1
+			st.rows, st.path = n, out_file
+	finally:
+		profiler.finish()
+	print(f"Exported {n} rows to {out_file}")
 
 if __name__ == '__main__':
 	main()
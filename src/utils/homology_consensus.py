@@ -0,0 +1,100 @@
+"""
+Cross-species consensus over the MapMyCells columns of the consensus homology sheet
+(resources/MWB_consensus_homology.csv).
+
+Columns named <Species>_<reference>_MapMyCells_<level>_label (Species Human, Macaque or
+Marmoset; reference ABCmouse or HMBA_WB_Human; level CLAS, SUBC, SUPT, Class, Subclass) hold
+' | '-delimited label lists in arbitrary order, as do the matching reciprocal_hits_* columns.
+All of them are exploded once into a long frame (Group, reference, level, source, label),
+and votes, reciprocal hits and agreement for every Group and level come from a handful of
+groupby/pivot operations over it, so a recompute takes milliseconds.
+
+For a Group and level, a label's votes are the number of species listing it. Its reciprocal
+hit is true when every species reporting that level lists it, and agreement is
+|reciprocal hits| / |all labels listed|. This rule reproduces the hand-supplied
+reciprocal_hits_* columns, which are kept alongside as 'supplied' for checking.
+"""
+import re
+
+import pandas as pd
+
+SPECIES = ['Human', 'Macaque', 'Marmoset']
+SUPPLIED = 'reciprocal_hits'
+LIST_COLUMN = re.compile(r'^(Human|Macaque|Marmoset|reciprocal_hits)_(.+)_MapMyCells_([A-Za-z]+)_label$')
+KEYS = ['Group', 'reference', 'level']
+
+
+def list_columns(columns):
+    """{column: (source, reference, level)} for the MapMyCells list columns among columns."""
+    return {c: m.groups() for c in columns if (m := LIST_COLUMN.match(c))}
+
+
+def explode_lists(homology):
+    """Long frame (Group, reference, level, source, label): one row per listed label."""
+    parsed = list_columns(homology.columns)
+    long = homology[['Group'] + list(parsed)].melt(id_vars='Group', var_name='column', value_name='label')
+    long = long.dropna(subset=['label'])
+    long['label'] = long['label'].astype(str).str.split('|')
+    long = long.explode('label')
+    long['label'] = long['label'].str.strip()
+    long = long[long['label'] != '']
+    meta = pd.DataFrame(parsed.values(), index=list(parsed), columns=['source', 'reference', 'level'])
+    long = long.join(meta, on='column').drop(columns='column')
+    return long[KEYS + ['source', 'label']].drop_duplicates().reset_index(drop=True)
+
+
+def label_votes(long, species=SPECIES):
+    """One row per (Group, reference, level, label) with a boolean column per species, votes,
+    reciprocal (listed by every reporting species), majority (votes >= 2) and supplied
+    (listed in the reciprocal_hits column)."""
+    present = pd.crosstab([long[k] for k in KEYS + ['label']], long['source']).astype(bool)
+    for source in species + [SUPPLIED]:
+        if source not in present:
+            present[source] = False
+    votes = present[species]
+    reporting = votes.groupby(level=KEYS).transform('any').sum(axis=1)
+    out = votes.copy()
+    out['votes'] = votes.sum(axis=1)
+    out['reporting'] = reporting
+    out['reciprocal'] = (out['votes'] == reporting) & (reporting > 0)
+    out['majority'] = out['votes'] >= 2
+    out['supplied'] = present[SUPPLIED]
+    return out.reset_index()
+
+
+def _joined(votes, flag):
+    """' | '-joined labels where flag is set, per (Group, reference, level)."""
+    return votes[votes[flag]].groupby(KEYS, sort=False)['label'].agg(' | '.join)
+
+
+def consensus(votes):
+    """Per (Group, reference, level): reciprocal and majority labels, agreement, and whether the
+    computed reciprocal hits equal the supplied ones."""
+    votes = votes.sort_values(KEYS + ['votes', 'label'], ascending=[True, True, True, False, True])
+    votes = votes.assign(matches_supplied=votes['reciprocal'] == votes['supplied'])
+    grouped = votes.groupby(KEYS, sort=False)
+    out = pd.DataFrame({
+        'species_reporting': grouped['reporting'].first(),
+        'labels': grouped.size(),
+        'agreement': grouped['reciprocal'].mean().round(3),
+        'supplied_match': grouped['matches_supplied'].all(),
+    })
+    out['reciprocal'] = _joined(votes, 'reciprocal')
+    out['majority'] = _joined(votes, 'majority')
+    return out.fillna({'reciprocal': '', 'majority': ''}).reset_index()
+
+
+def consensus_table(homology, summary=None):
+    """Wide consensus table: one row per Group (in sheet order) with, per reference and level,
+    <reference>_<level>_reciprocal, _majority and _agreement columns. summary is the
+    consensus() frame for homology, computed if not given."""
+    if summary is None:
+        summary = consensus(label_votes(explode_lists(homology)))
+    summary = summary.copy()
+    summary['prefix'] = summary['reference'] + '_' + summary['level']
+    wide = summary.pivot(index='Group', columns='prefix', values=['reciprocal', 'majority', 'agreement'])
+    prefixes = list(dict.fromkeys(summary['prefix']))
+    wide.columns = [f'{prefix}_{value}' for value, prefix in wide.columns]
+    ordered = [f'{p}_{v}' for p in prefixes for v in ('reciprocal', 'majority', 'agreement')]
+    table = homology[['Group', 'accession_group']].drop_duplicates('Group')
+    return table.merge(wide[ordered].reset_index(), on='Group', how='left')
@@ -0,0 +1,218 @@
+"""
+Derive, create and verify the property indexes needed by the KG queries in this repo.
+
+Index requirements are read from the query catalogue (Neo4jNamedQueries + src/cypher/*.cypher):
+any equality/IN filter on a labelled node, either inline ``(n:Label {prop: ...})`` or in a
+``WHERE n.prop = ...`` clause, yields a (Label, prop) index. Missing indexes are created
+idempotently, then every query is EXPLAINed to check that the plan anchors on an index
+seek rather than a label or all-nodes scan.
+
+Usage:
+    python index_manager.py [--dry-run] [--no-explain] [--write-config]
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+import importlib.util
+
+utils_dir = Path(__file__).resolve().parent
+project_root = utils_dir.parent.parent
+
+spec = importlib.util.spec_from_file_location('neo4j_bolt_wrapper', utils_dir / 'neo4j_bolt_wrapper.py')
+neo4j_wrapper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(neo4j_wrapper)
+Neo4jBoltQueryWrapper = neo4j_wrapper.Neo4jBoltQueryWrapper
+
+spec = importlib.util.spec_from_file_location('query_catalog', utils_dir / 'query_catalog.py')
+query_catalog = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_catalog)
+
+# Index statements applied by the updateprod stage of the pipeline
+PDB_INDEX_CONFIG = project_root / 'config' / 'update-prod' / 'pdb_set_indices.neo4j'
+
+# Lookups made by loader scripts rather than catalogued queries
+# (e.g. build_subcluster_closure.py matches Cell_cluster nodes by iri).
+REQUIRED_INDEXES = [
+    ('Individual', 'short_form'),
+    ('Class', 'short_form'),
+    ('Entity', 'short_form'),
+    ('Template', 'short_form'),
+    ('Cell_cluster', 'iri'),
+]
+
+SCAN_OPERATORS = {'NodeByLabelScan', 'AllNodesScan'}
+SEEK_PREFIXES = ('NodeIndexSeek', 'NodeUniqueIndexSeek', 'MultiNodeIndexSeek',
+                 'NodeIndexScan', 'NodeIndexContainsScan', 'NodeIndexEndsWithScan')
+
+NODE_PATTERN = re.compile(r'\(\s*(\w*)\s*((?::\s*`?\w+`?\s*)*)(\{[^{}]*\})?\s*\)')
+MAP_KEY = re.compile(r'(\w+)\s*:')
+WHERE_CLAUSE = re.compile(r'\bWHERE\b(.*?)(?=\b(?:MATCH|OPTIONAL|RETURN|WITH|UNWIND|ORDER|CALL)\b|$)',
+                         re.IGNORECASE | re.DOTALL)
+PROPERTY_FILTER = re.compile(r'\b(\w+)\.(\w+)\s*(?:=|\bIN\b|\bSTARTS\s+WITH\b)', re.IGNORECASE)
+COMMENT = re.compile(r'//[^\n]*')
+# Words that can precede a map literal inside parentheses, e.g. collect(distinct{...})
+NOT_VARIABLES = {'distinct', 'all', 'not'}
+
+
+def derive_indexes(query):
+    """Return (indexes, warnings) for one query.
+    indexes is a set of (label, property); warnings lists filters on unlabelled nodes,
+    which cannot use an index."""
+    query = COMMENT.sub('', query)
+    labels = {}
+    inline = []
+    for var, label_str, props in NODE_PATTERN.findall(query):
+        if var.lower() in NOT_VARIABLES:
+            continue
+        node_labels = [l.strip(' `') for l in label_str.split(':') if l.strip(' `')]
+        if var and node_labels:
+            labels.setdefault(var, node_labels[0])
+        if props:
+            inline.append((var, node_labels, MAP_KEY.findall(props)))
+    indexes, warnings = set(), []
+    for var, node_labels, keys in inline:
+        label = node_labels[0] if node_labels else labels.get(var)
+        if label:
+            indexes.update((label, key) for key in keys)
+        elif var:
+            warnings.append(f"({var} {{{', '.join(keys)}}}) has no label; add one so an index can be used")
+    for clause in WHERE_CLAUSE.findall(query):
+        for var, prop in PROPERTY_FILTER.findall(clause):
+            if var in labels:
+                indexes.add((labels[var], prop))
+            else:
+                warnings.append(f"{var}.{prop} filters an unlabelled node")
+    return indexes, warnings
+
+
+def derive_all(queries):
+    """Return ({(label, prop): [query names]}, {query name: warnings}) for a catalogue."""
+    needed, warnings = {}, {}
+    for name, query in queries.items():
+        idx, warn = derive_indexes(query)
+        for key in sorted(idx):
+            needed.setdefault(key, []).append(name)
+        if warn:
+            warnings[name] = warn
+    return needed, warnings
+
+
+def existing_indexes(wrapper):
+    """Return the set of single-property (label, prop) indexes and constraints in the database."""
+    try:
+        rows = wrapper.run_query("SHOW INDEXES YIELD labelsOrTypes, properties", return_type=None)
+    except Exception:
+        # Neo4j < 4.2
+        rows = wrapper.run_query("CALL db.indexes()", return_type=None)
+    found = set()
+    for row in rows:
+        labels = row.get('labelsOrTypes') or row.get('tokenNames') or [row.get('label')]
+        props = row.get('properties') or []
+        if labels and labels[0] and len(props) == 1:
+            found.add((labels[0], props[0]))
+    return found
+
+
+def create_indexes(wrapper, indexes, dry_run=False):
+    """Create any of indexes not already present. Returns the list created."""
+    present = existing_indexes(wrapper)
+    created = []
+    for label, prop in sorted(indexes):
+        if (label, prop) in present:
+            continue
+        name = f"idx_{label}_{prop}".lower()
+        print(f"Creating index {name} on :{label}({prop})")
+        if not dry_run:
+            try:
+                wrapper.run_query(f"CREATE INDEX {name} IF NOT EXISTS FOR (n:`{label}`) ON (n.`{prop}`)",
+                                  return_type=None)
+            except Exception:
+                # Pre-4.x syntax, as used in pdb_set_indices.neo4j
+                wrapper.run_query(f"CREATE INDEX ON :`{label}`(`{prop}`)", return_type=None)
+        created.append((label, prop))
+    if created and not dry_run:
+        wrapper.run_query("CALL db.awaitIndexes()", return_type=None)
+    return created
+
+
+def plan_operators(plan):
+    """Flatten an execution plan into a list of operator names (without runtime suffix)."""
+    if not plan:
+        return []
+    ops = [plan.get('operatorType', '').split('@')[0]]
+    for child in plan.get('children', []):
+        ops.extend(plan_operators(child))
+    return ops
+
+
+def check_plan(wrapper, query, parameters=None):
+    """EXPLAIN query; return (ok, operators). ok is False if the plan scans by label or all nodes."""
+    ops = plan_operators(wrapper.explain(query, parameters))
+    seeks = [op for op in ops if op.startswith(SEEK_PREFIXES)]
+    scans = [op for op in ops if op in SCAN_OPERATORS]
+    return bool(seeks) and not scans, ops
+
+
+def write_config(indexes, path=PDB_INDEX_CONFIG):
+    """Write the index set to the updateprod statements file, keeping its format."""
+    statements = '  } , {\n'.join(f'    "statement" : {json.dumps(f"CREATE INDEX ON :{label}({prop})")}\n'
+                                  for label, prop in indexes)
+    Path(path).write_text('{\n  "statements" : [ {\n' + statements + '  } ]\n}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and verify the property indexes used by KG queries.")
+    parser.add_argument('--endpoint', type=str, default='bolt://localhost:7687', help='Neo4j bolt endpoint')
+    parser.add_argument('--user', type=str, default=None, help='Neo4j username')
+    parser.add_argument('--password', type=str, default=None, help='Neo4j password')
+    parser.add_argument('--dry-run', action='store_true', help='Report missing indexes without creating them')
+    parser.add_argument('--no-explain', action='store_true', help='Skip EXPLAIN plan verification')
+    parser.add_argument('--derive-only', action='store_true', help='Print derived indexes without connecting to Neo4j')
+    parser.add_argument('--write-config', action='store_true',
+                        help=f'Also write the derived indexes to {PDB_INDEX_CONFIG.relative_to(project_root)}')
+    args = parser.parse_args()
+
+    queries = query_catalog.all_queries()
+    needed, warnings = derive_all(queries)
+    for key in REQUIRED_INDEXES:
+        needed.setdefault(key, []).append('required')
+    for (label, prop), users in sorted(needed.items()):
+        print(f":{label}({prop})\t{', '.join(users)}")
+    for name, warns in warnings.items():
+        for w in warns:
+            print(f"WARNING {name}: {w}", file=sys.stderr)
+
+    indexes = REQUIRED_INDEXES + sorted(k for k in needed if k not in REQUIRED_INDEXES)
+    if args.write_config:
+        write_config(indexes)
+        print(f"Wrote {PDB_INDEX_CONFIG}")
+    if args.derive_only:
+        return
+
+    wrapper = Neo4jBoltQueryWrapper(args.endpoint, args.user, args.password)
+    created = create_indexes(wrapper, indexes, dry_run=args.dry_run)
+    print(f"{len(created)} index(es) {'missing' if args.dry_run else 'created'}")
+
+    if args.no_explain:
+        return
+    failures = 0
+    for name, query in queries.items():
+        ok, ops = check_plan(wrapper, query)
+        if ok:
+            status = 'OK  '
+        elif not derive_indexes(query)[0]:
+            # Unfiltered exports have nothing to seek on; a scan is expected
+            status = 'FULL'
+        else:
+            status = 'SCAN'
+            failures += 1
+        print(f"{status} {name}: {' > '.join(ops)}")
+    if failures:
+        sys.exit(f"{failures} query plan(s) still use a label or all-nodes scan")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Per-stage timing and resource instrumentation for the pipeline scripts.
+
+Scripts wrap their work in named stages (fetch, query, transform, write, ...):
+
+    profiler = instrumentation.profiler_from_args(args, 'WMB_AT_map')
+    try:
+        with profiler.stage('fetch') as st:
+            ...
+            st.rows = len(frame)
+            st.path = output    # bytes written = size of this file at stage end
+    finally:
+        profiler.finish()       # also logs the run total when a stage fails
+
+With --profile each stage appends one JSON line (wall and CPU seconds, peak RSS, rows,
+bytes) to .cache/profile/stages.jsonl, or to the path given, so runs can be aggregated with
+`python instrumentation.py summarize`. With --cprofile every stage is also run under
+cProfile and the stats of the slowest one are dumped next to the log (view with
+`python -m pstats FILE` or snakeviz). Without either flag stages cost almost nothing.
+
+Usage:
+    python instrumentation.py summarize [stages.jsonl]
+"""
+import argparse
+import cProfile
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+project_root = Path(__file__).resolve().parent.parent.parent
+DEFAULT_LOG = project_root / '.cache' / 'profile' / 'stages.jsonl'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.bytes = None
+        self.path = None
+
+
+class Profiler:
+    def __init__(self, script, log_path=None, cprofile=False):
+        self.script = script
+        self.enabled = bool(log_path) or cprofile
+        self.log_path = Path(log_path or DEFAULT_LOG)
+        self.cprofile = cprofile
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._profiles = {}
+        self._start = (time.perf_counter(), time.process_time())
+
+    @contextmanager
+    def stage(self, name):
+        st = Stage(name)
+        if not self.enabled:
+            yield st
+            return
+        prof = cProfile.Profile() if self.cprofile else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        if prof:
+            prof.enable()
+        try:
+            yield st
+        finally:
+            if prof:
+                prof.disable()
+            record = {
+                'run_id': self.run_id,
+                'script': self.script,
+                'stage': name,
+                'wall_s': round(time.perf_counter() - wall, 4),
+                'cpu_s': round(time.process_time() - cpu, 4),
+                'peak_rss_mb': peak_rss_mb(),
+                'rows': st.rows,
+                'bytes': st.bytes if st.bytes is not None else (
+                    os.path.getsize(st.path) if st.path and os.path.exists(st.path) else None),
+                'timestamp': time.time(),
+            }
+            self.records.append(record)
+            if prof:
+                self._profiles[name] = prof
+            self._write(record)
+
+    def _write(self, record):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def finish(self):
+        """Log the run total, dump the slowest stage's cProfile stats and print a short summary."""
+        if not self.enabled:
+            return
+        total = {'run_id': self.run_id, 'script': self.script, 'stage': '_total',
+                 'wall_s': round(time.perf_counter() - self._start[0], 4),
+                 'cpu_s': round(time.process_time() - self._start[1], 4),
+                 'peak_rss_mb': peak_rss_mb(), 'rows': None, 'bytes': None, 'timestamp': time.time()}
+        self._write(total)
+        for r in self.records + [total]:
+            rss = '' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:>9.1f} MiB"
+            print(f"[profile] {r['stage']:<16}{r['wall_s']:>9.3f}s wall{r['cpu_s']:>9.3f}s cpu{rss}",
+                  file=sys.stderr)
+        if self._profiles:
+            slowest = max((r for r in self.records if r['stage'] in self._profiles), key=lambda r: r['wall_s'])
+            out = self.log_path.with_name(f"{self.script}-{slowest['stage']}-{self.run_id}.prof")
+            self._profiles[slowest['stage']].dump_stats(out)
+            print(f"[profile] cProfile stats for '{slowest['stage']}' written to {out}", file=sys.stderr)
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', nargs='?', const=str(DEFAULT_LOG), default=None, metavar='JSONL',
+                        help=f'Record per-stage timings as JSON lines (default {DEFAULT_LOG.relative_to(project_root)})')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='Also run stages under cProfile and dump the slowest one')
+
+
+def profiler_from_args(args, script):
+    return Profiler(script, args.profile, args.cprofile)
+
+
+def summarize(path):
+    """Median wall/CPU seconds and max peak RSS per script and stage across logged runs."""
+    groups = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                groups[(r['script'], r['stage'])].append(r)
+    print(f"{'script':<40} {'stage':<18}{'runs':>5}{'wall_s':>10}{'cpu_s':>10}{'rss_mb':>10}{'rows':>10}")
+    for (script, stage), rs in sorted(groups.items()):
+        rss = [r['peak_rss_mb'] for r in rs if r['peak_rss_mb'] is not None]
+        rows = [r['rows'] for r in rs if r['rows'] is not None]
+        print(f"{script:<40} {stage:<18}{len(rs):>5}"
+              f"{statistics.median(r['wall_s'] for r in rs):>10.3f}"
+              f"{statistics.median(r['cpu_s'] for r in rs):>10.3f}"
+              f"{(max(rss) if rss else float('nan')):>10.1f}"
+              f"{(rows[-1] if rows else ''):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise stage timings logged with --profile.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('summarize', help='Aggregate a stages.jsonl log')
+    p.add_argument('log', nargs='?', default=str(DEFAULT_LOG))
+    args = parser.parse_args()
+    summarize(args.log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Label -> accession resolution for the taxonomies used in this project.
+
+One index is built per (taxonomy, labelset) from the WMB taxonomy JSON (when given),
+resources/maps/cell_set_map.tsv and resources/mouse_cc_label_iri.tsv, and pickled under
+.cache/label_index keyed on the source files, so warm loads skip parsing altogether. Writing
+a new pickle removes those for earlier source versions.
+Taxonomies are keyed by their ID (e.g. CCN20230722 for WMB, CS20250428 for HMBA BG); the
+dataset titles in cell_set_map.tsv work as aliases.
+
+Resolution order: exact label, then normalised label (case-folded, numeric prefix such as
+'318 ' stripped, whitespace/underscore runs collapsed), so 'Astro-NT NN' resolves to
+'318 Astro-NT NN'. The normalised fallback only applies to query labels without a numeric
+prefix, since '0123 Foo' and '0124 Foo' are different cell sets. Normalised keys that are
+ambiguous within a scope are not used. candidates() gives ranked fuzzy matches (character
+trigram shortlist on normalised labels, scored with difflib) for labels that still do not
+resolve.
+
+Usage:
+    python label_resolver.py LABEL [LABEL ...] [--taxonomy CCN20230722] [--labelset subclass]
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import pickle
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+utils_dir = Path(__file__).resolve().parent
+project_root = utils_dir.parent.parent
+
+DEFAULT_CACHE_DIR = project_root / '.cache' / 'label_index'
+CELL_SET_MAP = project_root / 'resources' / 'maps' / 'cell_set_map.tsv'
+MOUSE_SUBCLASS_MAP = project_root / 'resources' / 'mouse_cc_label_iri.tsv'
+DEFAULT_SOURCES = [CELL_SET_MAP, MOUSE_SUBCLASS_MAP]
+
+WMB_TAXONOMY = 'CCN20230722'
+INDEX_VERSION = 3
+
+NUMERIC_PREFIX = re.compile(r'^\d+\s*')
+SEPARATORS = re.compile(r'[\s_]+')
+
+
+def normalise(label):
+    return SEPARATORS.sub(' ', NUMERIC_PREFIX.sub('', str(label).strip())).strip().casefold()
+
+
+def numbered(label):
+    """True if label starts with a numeric prefix (e.g. '318 Astro-NT NN')."""
+    return NUMERIC_PREFIX.match(str(label).strip()) is not None
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def iri_parts(iri):
+    """Split a cell set IRI into (taxonomy ID, accession), e.g.
+    .../ontology/CCN20230722/CS20230722_SUBC_001 -> ('CCN20230722', 'CS20230722_SUBC_001')."""
+    parts = iri.rstrip('/').split('/')
+    return parts[-2], parts[-1]
+
+
+def wmb_entries(wmb_data):
+    for a in wmb_data['annotations']:
+        yield WMB_TAXONOMY, a['labelset'], a['cell_label'], a['cell_set_accession']
+
+
+def cell_set_map_entries(path):
+    frame = pd.read_csv(path, sep='\t', dtype=str, keep_default_na=False)
+    for dataset, labelset, label, iri in zip(frame['dataset'], frame['labelset'], frame['label'], frame['iri']):
+        taxonomy, accession = iri_parts(iri)
+        yield taxonomy, labelset, label, accession, dataset
+
+
+def subclass_map_entries(path):
+    frame = pd.read_csv(path, sep='\t', dtype=str, keep_default_na=False)
+    for label, iri in zip(frame['label'], frame['accession']):
+        taxonomy, accession = iri_parts(iri)
+        yield taxonomy, 'subclass', label, accession
+
+
+class LabelIndex:
+    """Exact, normalised and trigram lookups per (taxonomy, labelset).
+    Each taxonomy also has an all-labelsets scope, (taxonomy, None)."""
+
+    def __init__(self):
+        self.exact = defaultdict(dict)
+        self.normalised = defaultdict(dict)
+        self.labels = defaultdict(list)
+        self.grams = defaultdict(lambda: defaultdict(set))
+        self.aliases = {}
+
+    def add(self, taxonomy, labelset, label, accession):
+        # Earlier sources take precedence for exact labels
+        for scope in ((taxonomy, labelset), (taxonomy, None)):
+            if label in self.exact[scope]:
+                continue
+            self.exact[scope][label] = accession
+            self.labels[scope].append((label, accession))
+
+    def finish(self):
+        """Derive normalised and trigram indexes from the exact labels."""
+        for scope, entries in self.labels.items():
+            seen = defaultdict(set)
+            for label, accession in entries:
+                seen[normalise(label)].add(accession)
+            # Ambiguous normalised keys map to None and are treated as unresolved
+            self.normalised[scope] = {k: (next(iter(v)) if len(v) == 1 else None) for k, v in seen.items()}
+            grams = self.grams[scope]
+            for i, (label, _) in enumerate(entries):
+                for gram in trigrams(normalise(label)):
+                    grams[gram].add(i)
+        # Plain dicts so the index pickles
+        self.exact, self.normalised, self.labels = dict(self.exact), dict(self.normalised), dict(self.labels)
+        self.grams = {scope: dict(g) for scope, g in self.grams.items()}
+        return self
+
+    def scope(self, taxonomy, labelset=None):
+        taxonomy = self.aliases.get(taxonomy, taxonomy)
+        if (taxonomy, labelset) not in self.exact:
+            raise KeyError(f"No labels indexed for taxonomy={taxonomy!r} labelset={labelset!r}")
+        return taxonomy, labelset
+
+    def resolve(self, label, taxonomy, labelset=None):
+        """Accession for label, or None."""
+        scope = self.scope(taxonomy, labelset)
+        accession = self.exact[scope].get(label)
+        if accession is None and not numbered(label):
+            accession = self.normalised[scope].get(normalise(label))
+        return accession
+
+    def resolve_series(self, labels, taxonomy, labelset=None):
+        """Resolve a Series of labels. Each distinct label is looked up once;
+        unresolved labels give NaN."""
+        scope = self.scope(taxonomy, labelset)
+        resolved = labels.map(self.exact[scope])
+        missing = resolved.isna() & labels.notna()
+        if missing.any():
+            normalised = self.normalised[scope]
+            by_norm = {label: None if numbered(label) else normalised.get(normalise(label))
+                       for label in labels[missing].unique()}
+            # Positional, so labels may carry a non-unique index (e.g. after explode)
+            resolved = resolved.where(~missing, labels.map(by_norm).to_numpy())
+        return resolved
+
+    def candidates(self, label, taxonomy, labelset=None, limit=5, cutoff=0.6, shortlist=50):
+        """Ranked fuzzy matches for label: [(label, accession, score)], best first."""
+        scope = self.scope(taxonomy, labelset)
+        query = normalise(label)
+        hits = Counter()
+        for gram in trigrams(query):
+            hits.update(self.grams[scope].get(gram, ()))
+        entries = self.labels[scope]
+        scored = []
+        for i, _ in hits.most_common(shortlist):
+            known, accession = entries[i]
+            score = difflib.SequenceMatcher(None, query, normalise(known)).ratio()
+            if score >= cutoff:
+                scored.append((known, accession, round(score, 3)))
+        scored.sort(key=lambda t: -t[2])
+        return scored[:limit]
+
+
+def _source_key(wmb_json, sources):
+    h = hashlib.sha256(f"v{INDEX_VERSION}".encode())
+    for path in ([wmb_json] if wmb_json else []) + list(sources):
+        path = Path(path).resolve()
+        st = path.stat()
+        h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()[:16]
+
+
+def build_index(wmb_json=None, sources=DEFAULT_SOURCES):
+    """Build a LabelIndex. wmb_json is a path to the WMB taxonomy JSON (e.g. from FetchCache.fetch);
+    its entries take precedence over the local TSVs."""
+    index = LabelIndex()
+    if wmb_json:
+        for entry in wmb_entries(json.loads(Path(wmb_json).read_text())):
+            index.add(*entry)
+    for path in sources:
+        with open(path) as f:
+            columns = f.readline().rstrip('\n').split('\t')
+        if 'dataset' in columns:
+            for taxonomy, labelset, label, accession, dataset in cell_set_map_entries(path):
+                index.aliases[dataset] = taxonomy
+                index.add(taxonomy, labelset, label, accession)
+        else:
+            for entry in subclass_map_entries(path):
+                index.add(*entry)
+    return index.finish()
+
+
+_loaded = {}
+
+
+def load_index(wmb_json=None, sources=DEFAULT_SOURCES, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """Return a LabelIndex for the given sources, from memory, the pickle cache or freshly built."""
+    key = _source_key(wmb_json, sources)
+    if key in _loaded:
+        return _loaded[key]
+    path = Path(cache_dir) / f'{key}.pkl'
+    if use_cache and path.exists():
+        # The index is stored as its attribute dict so the pickle does not depend on module import paths
+        index = LabelIndex.__new__(LabelIndex)
+        with open(path, 'rb') as f:
+            index.__dict__.update(pickle.load(f))
+    else:
+        index = build_index(wmb_json, sources)
+        if use_cache:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as f:
+                pickle.dump(index.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Indexes of earlier source versions are not loaded again
+            for stale in path.parent.glob('*.pkl'):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+    _loaded[key] = index
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve cell set labels to accessions.")
+    parser.add_argument('labels', nargs='+', help='Labels to resolve')
+    parser.add_argument('--taxonomy', default=WMB_TAXONOMY, help='Taxonomy ID or dataset title')
+    parser.add_argument('--labelset', default=None, help='Restrict to one labelset (e.g. subclass)')
+    parser.add_argument('--wmb-json', default=None, help='WMB taxonomy JSON to index as well')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore the cached index')
+    args = parser.parse_args()
+
+    index = load_index(args.wmb_json, use_cache=not args.rebuild)
+    for label in args.labels:
+        accession = index.resolve(label, args.taxonomy, args.labelset)
+        if accession:
+            print(f"{label}\t{accession}")
+        else:
+            suggestions = '; '.join(f"{l} ({a}, {s})" for l, a, s in index.candidates(label, args.taxonomy, args.labelset))
+            print(f"{label}\tUNRESOLVED\t{suggestions}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Library of named Cypher queries run against the KG.
+Used by src/scripts/report_gen.py (--query NAME) and the query tooling in src/utils.
+
+Queries listed in Neo4jNamedQueries.PARTITIONS can also be run in partitions
+(src/utils/partitioned_query.py): 'enumerate' returns one `partition` value per row, 'query'
+is the same report restricted to a list of those values ($partition), and 'order_by' gives
+the ordering to restore when the partition results are merged. Partition values are the
+report's grouping key (the Group label), so rows the report would merge never land in
+different partitions.
+"""
+
+
+def _report_bg_mappings(hierarchy, partition_filter=''):
+    """The BG mappings report, following `hierarchy` (a relationship pattern such as
+    'subcluster_of*0..') from each Group cell set. partition_filter is appended to the
+    Group filter for the partitioned form."""
+    return f'''
+    MATCH (tax:Individual)-[:annotations]->(cell_set:Cell_cluster)-[:has_labelset]->(ls:Individual) 
+    WHERE tax.title = ['HMBA Basal Ganglia Consensus Taxonomy']
+    AND ls.label_rdfs = ['Group'] {partition_filter}
+    AND NOT (cell_set)-[:{hierarchy}]->(:Cell_cluster {{ label_rdfs: ['Nonneuron']}})
+    MATCH (cell_set)-[:{hierarchy}]->(cc2:Cell_cluster)-[:has_labelset]->(ls2)
+    OPTIONAL MATCH (cc2)-[:composed_primarily_of]->(c:Cell)
+    OPTIONAL MATCH (cell_set)-[:exactMatch]->(at:Cell_cluster)-[:has_labelset]->(ls3)
+    RETURN DISTINCT cell_set.label_rdfs[0] AS Group, 
+    COLLECT(DISTINCT({{ id: c.curie, name: c.label_rdfs[0], 
+                       labelset: ls2.label_rdfs[0], 
+                       cell_set: cc2.label_rdfs[0]}})) AS cl_mappings,
+    collect(distinct{{ labelset: ls3.label_rdfs[0], 
+                      cell_set: at.label_rdfs[0]}}) AS WMB_AT,
+        cell_set.rationale_dois AS refs, 
+    SIZE([x IN COLLECT(c.curie) WHERE x IS NOT NULL]) = 0 AS no_cl_mapping 
+    ORDER BY no_cl_mapping DESC 
+    ;
+    '''
+
+
+# Restricts the report to the Group labels in $partition (null labels partition as '')
+_GROUP_PARTITION = "\n    AND coalesce(cell_set.label_rdfs[0], '') IN $partition"
+
+
+class Neo4jNamedQueries:
+    REPORT_BG_MAPPINGS = _report_bg_mappings('subcluster_of*0..')
+    # Same report, reading the precomputed [:subcluster_of_closure] relationships
+    # (see src/scripts/build_subcluster_closure.py) instead of expanding [:subcluster_of*0..]
+    REPORT_BG_MAPPINGS_CLOSURE = _report_bg_mappings('subcluster_of_closure')
+
+    # Partitioned forms of the reports above, keyed by report name.
+    # Partition key: the label of each Group cell set in the taxonomy (the report's Group).
+    REPORT_BG_GROUPS = '''
+    MATCH (tax:Individual)-[:annotations]->(cell_set:Cell_cluster)-[:has_labelset]->(ls:Individual) 
+    WHERE tax.title = ['HMBA Basal Ganglia Consensus Taxonomy']
+    AND ls.label_rdfs = ['Group'] 
+    RETURN DISTINCT coalesce(cell_set.label_rdfs[0], '') AS partition
+    ORDER BY partition
+    '''
+    PARTITIONS = {
+        'REPORT_BG_MAPPINGS': {
+            'key': 'Group',
+            'enumerate': REPORT_BG_GROUPS,
+            'query': _report_bg_mappings('subcluster_of*0..', _GROUP_PARTITION),
+            'order_by': [('no_cl_mapping', True)],
+        },
+        'REPORT_BG_MAPPINGS_CLOSURE': {
+            'key': 'Group',
+            'enumerate': REPORT_BG_GROUPS,
+            'query': _report_bg_mappings('subcluster_of_closure', _GROUP_PARTITION),
+            'order_by': [('no_cl_mapping', True)],
+        },
+    }
+    # Add more named queries as needed
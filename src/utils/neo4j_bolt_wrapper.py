@@ -1,14 +1,19 @@
 import json
 import csv
+import io
 from neo4j import GraphDatabase, basic_auth
 
+DEFAULT_FETCH_SIZE = 1000
+
 class Neo4jBoltQueryWrapper:
-    def __init__(self, endpoint, user=None, password=None, test_connection=True):
+    def __init__(self, endpoint, user=None, password=None, test_connection=True, cache=None):
         self.endpoint = endpoint
         self.user = user
         self.password = password
         self.driver = None
         self.connected = False
+        # Optional result cache (see query_cache.QueryCache) used by run_query and stream_query
+        self.cache = cache
         if test_connection:
             self.connect()
 
@@ -36,25 +41,144 @@ class Neo4jBoltQueryWrapper:
         except Exception as e:
             return False
 
+    def _records(self, query, parameters=None):
+        with self.driver.session() as session:
+            result = session.run(query, parameters or {})
+            return [record.data() for record in result]
+
     def run_query(self, query, parameters=None, return_type="json"):
+        if not self.driver:
+            self.connect()
+        if self.cache is not None:
+            records = list(self.cache.fetch(self, query, parameters, lambda: self._records(query, parameters)))
+        else:
+            records = self._records(query, parameters)
+        if return_type == "json":
+            return json.dumps(records, indent=2)
+        elif return_type == "csv":
+            if records:
+                keys = records[0].keys()
+                output = io.StringIO()
+                writer = csv.DictWriter(output, fieldnames=keys)
+                writer.writeheader()
+                writer.writerows(records)
+                return output.getvalue()
+            else:
+                return ""
+        else:
+            return records
+
+    def explain(self, query, parameters=None):
+        """Return the planner's execution plan for query (as a nested dict) without running it."""
         if not self.driver:
             self.connect()
         with self.driver.session() as session:
-            result = session.run(query, parameters or {})
+            summary = session.run("EXPLAIN " + query, parameters or {}).consume()
+            return summary.plan
+
+    def profile(self, query, parameters=None):
+        """Run query under PROFILE. Returns (records, profile) where profile is the
+        executed plan as a nested dict including per-operator dbHits and rows."""
+        if not self.driver:
+            self.connect()
+        with self.driver.session() as session:
+            result = session.run("PROFILE " + query, parameters or {})
             records = [record.data() for record in result]
-            if return_type == "json":
-                return json.dumps(records, indent=2)
-            elif return_type == "csv":
-                if records:
-                    keys = records[0].keys()
-                    output = csv.StringIO()
-                    writer = csv.DictWriter(output, fieldnames=keys)
-                    writer.writeheader()
-                    writer.writerows(records)
-                    return output.getvalue()
-                else:
-                    return ""
-            else:
-                return records
+            return records, result.consume().profile
+
+    def run_write_batches(self, query, rows, batch_size=DEFAULT_FETCH_SIZE, parameters=None, param_name="rows"):
+        """Run a write query once per chunk of rows, each chunk in its own managed transaction.
+
+        The chunk is passed as the $rows parameter (or param_name), alongside any extra
+        parameters, so queries are written as UNWIND $rows AS row ... Managed transactions
+        are retried by the driver on transient errors. Returns a list with the first record
+        of each chunk's result (as a dict, or None if the query returns nothing).
+        """
+        if not self.driver:
+            self.connect()
+
+        def work(tx, batch):
+            record = tx.run(query, {**(parameters or {}), param_name: batch}).single()
+            return record.data() if record else None
+
+        rows = list(rows)
+        results = []
+        with self.driver.session() as session:
+            execute = getattr(session, 'execute_write', None) or session.write_transaction
+            for i in range(0, len(rows), batch_size):
+                results.append(execute(work, rows[i:i + batch_size]))
+        return results
+
+    def stream_query(self, query, parameters=None, fetch_size=DEFAULT_FETCH_SIZE, batch_size=None):
+        """Lazily yield query results without materialising the full result set.
+
+        Records are pulled from the server fetch_size at a time. By default each
+        record is yielded as a dict; if batch_size is given, lists of up to
+        batch_size dicts are yielded instead. With a cache attached, records are
+        served from it or spooled into it as they stream.
+        """
+        if not self.driver:
+            self.connect()
+        if self.cache is not None:
+            records = self.cache.fetch(self, query, parameters,
+                                       lambda: self._stream_records(query, parameters, fetch_size))
+        else:
+            records = self._stream_records(query, parameters, fetch_size)
+        if not batch_size:
+            yield from records
+            return
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _stream_records(self, query, parameters, fetch_size):
+        with self.driver.session(fetch_size=fetch_size) as session:
+            for record in session.run(query, parameters or {}):
+                yield record.data()
+
+    def write_query(self, query, fh, parameters=None, output_format="jsonl",
+                    fetch_size=DEFAULT_FETCH_SIZE, delimiter=','):
+        """Stream query results to an open text file handle.
+
+        output_format is either 'jsonl' (one JSON object per line) or 'csv'
+        (header taken from the first record). Rows are written as they arrive,
+        so memory use does not grow with the size of the result.
+        Returns the number of rows written.
+        """
+        records = self.stream_query(query, parameters, fetch_size=fetch_size)
+        if output_format == "jsonl":
+            return write_jsonl(records, fh)
+        elif output_format == "csv":
+            return write_csv(records, fh, delimiter=delimiter)
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+
+def write_jsonl(records, fh):
+    """Write an iterable of dicts to fh as JSON Lines. Returns the row count."""
+    n = 0
+    for record in records:
+        fh.write(json.dumps(record, ensure_ascii=False))
+        fh.write('\n')
+        n += 1
+    return n
 
 
+def write_csv(records, fh, delimiter=','):
+    """Write an iterable of dicts to fh as CSV, taking the header from the first record.
+    Nested values (lists/dicts) are written as compact JSON. Returns the row count."""
+    writer = None
+    n = 0
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(fh, fieldnames=list(record.keys()), delimiter=delimiter)
+            writer.writeheader()
+        writer.writerow({k: json.dumps(v, separators=(',', ':'), ensure_ascii=False)
+                         if isinstance(v, (dict, list)) else v
+                         for k, v in record.items()})
+        n += 1
+    return n
@@ -0,0 +1,63 @@
+"""
+Run a partitioned named report (see Neo4jNamedQueries.PARTITIONS) concurrently.
+
+The partition keys are enumerated first, split into chunks and each chunk is run as its own
+short read query, with at most `workers` queries (and so sessions) in flight at a time. The
+per-chunk results are concatenated in chunk order and re-sorted on the report's order_by
+columns with a stable sort, so the merged rows follow the same ORDER BY as the monolithic
+query (nulls last ascending and first descending, as in Cypher).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 4
+
+
+def split(keys, n):
+    """Split keys into at most n contiguous, near-equal chunks."""
+    n = max(1, min(n, len(keys)))
+    size, extra = divmod(len(keys), n)
+    chunks, start = [], 0
+    for i in range(n):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(keys[start:end])
+        start = end
+    return chunks
+
+
+def merge_ordered(results, order_by):
+    """Concatenate per-partition result lists and restore the ORDER BY of the report.
+    order_by is a list of (column, descending) pairs, most significant first."""
+    rows = [row for result in results for row in result]
+    # Stable sorts from the least significant column up give a multi-column ORDER BY
+    for column, descending in reversed(order_by):
+        rows.sort(key=lambda row: null_last(row[column]), reverse=descending)
+    return rows
+
+
+def null_last(value):
+    """Sort key placing None after every other value."""
+    return (value is None, value if value is not None else 0)
+
+
+def enumerate_partitions(wrapper, spec, parameters=None):
+    return [row['partition'] for row in wrapper.stream_query(spec['enumerate'], parameters)]
+
+
+def run_partitioned(wrapper, spec, parameters=None, partitions=None, workers=DEFAULT_WORKERS):
+    """Run a partitioned report and return its rows, merged into report order.
+
+    partitions is the number of chunks the partition keys are split into
+    (default: 4 per worker); workers bounds the number of concurrent queries.
+    """
+    parameters = dict(parameters or {})
+    keys = enumerate_partitions(wrapper, spec, parameters)
+    if not keys:
+        return []
+    chunks = split(keys, partitions or workers * 4)
+
+    def run(chunk):
+        return wrapper.run_query(spec['query'], {**parameters, 'partition': chunk}, return_type=None)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(run, chunks))
+    return merge_ordered(results, spec.get('order_by', []))
@@ -0,0 +1,212 @@
+"""
+On-disk cache for Cypher query results, keyed by the state of the KG. Off unless asked for
+(--cache).
+
+The key combines the normalised query text (whole-line // comments and whitespace runs
+removed), the parameters and a fingerprint of the loaded KG. The fingerprint is the build_id
+of the newest (:KG_build) node if the KG has one, otherwise node and relationship counts per
+label/type, which Neo4j answers from its count store. It is computed once per cache instance.
+Computing it only reads the KG. Edits that leave counts unchanged (e.g. load_mappings.py
+updating r.confidence) are not seen by the counts fingerprint: use --refresh-cache after
+them, or run the editing script with --bump-build, which calls bump_build() to write a new
+build id to the KG's :KG_build node (creating it on first use).
+
+Results are stored as gzipped pickle streams (one pickle per batch of records) under
+.cache/query_results, one <key>.pkl.gz file per entry, written to a temporary file and moved
+into place. There is no shared index: a hit touches its file's modification time, and when
+the total size exceeds max_bytes the least recently used files are evicted, so several
+processes can share the directory. A miss spools records to disk as they are read and the
+entry is only kept if the result is read to the end; a hit streams records back batch by
+batch, so neither holds the full result in memory. Pass a cache to a Neo4jBoltQueryWrapper
+used for reads (cache=QueryCache()) to serve run_query/stream_query from it; never attach
+one to a wrapper that writes.
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_DIR = project_root / '.cache' / 'query_results'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+SPOOL_BATCH = 1000
+
+BUILD_LABEL = 'KG_build'
+BUILD_QUERY = f'MATCH (b:{BUILD_LABEL}) RETURN b.build_id AS build_id ORDER BY b.timestamp DESC LIMIT 1'
+BUMP_BUILD_QUERY = f"""
+MERGE (b:{BUILD_LABEL} {{name: 'wmbkg'}})
+SET b.build_id = randomUUID(), b.timestamp = timestamp(), b.source = $source
+RETURN b.build_id AS build_id
+"""
+
+LINE_COMMENT = re.compile(r'^\s*//.*$', re.MULTILINE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalise_query(query):
+    return WHITESPACE.sub(' ', LINE_COMMENT.sub('', query)).strip().rstrip(';').strip()
+
+
+def kg_fingerprint(wrapper):
+    """Cheap fingerprint of the KG behind wrapper (see module docstring)."""
+    if not wrapper.driver:
+        wrapper.connect()
+    with wrapper.driver.session() as session:
+        build = session.run(BUILD_QUERY).single()
+        if build and build['build_id'] is not None:
+            return f"build:{build['build_id']}"
+        counts = {'nodes': session.run('MATCH (n) RETURN count(n) AS n').single()['n'],
+                  'relationships': session.run('MATCH ()-[r]->() RETURN count(r) AS n').single()['n']}
+        for label in sorted(r['label'] for r in session.run('CALL db.labels() YIELD label')):
+            counts[f':{label}'] = session.run(f'MATCH (n:`{label}`) RETURN count(n) AS n').single()['n']
+        for rel in sorted(r['relationshipType'] for r in session.run('CALL db.relationshipTypes() YIELD relationshipType')):
+            counts[f'[:{rel}]'] = session.run(f'MATCH ()-[r:`{rel}`]->() RETURN count(r) AS n').single()['n']
+    return 'counts:' + hashlib.sha256(json.dumps(counts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def bump_build(wrapper, source):
+    """Give the KG a new build id (on its single :KG_build node, created if missing) after an
+    in-place edit, so kg_fingerprint() changes. This writes to the KG; scripts only call it when
+    asked to (--bump-build). source names the script that made the edit. Returns the id."""
+    if not wrapper.driver:
+        wrapper.connect()
+    with wrapper.driver.session() as session:
+        return session.run(BUMP_BUILD_QUERY, {'source': source}).single()['build_id']
+
+
+class QueryCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, refresh=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # refresh: ignore existing entries (but store fresh results)
+        self.refresh = refresh
+        self.fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._fingerprint_lock = threading.Lock()
+
+    def fingerprint(self, wrapper):
+        with self._fingerprint_lock:
+            if wrapper.endpoint not in self.fingerprints:
+                self.fingerprints[wrapper.endpoint] = kg_fingerprint(wrapper)
+        return self.fingerprints[wrapper.endpoint]
+
+    def key(self, query, parameters, fingerprint):
+        payload = json.dumps([normalise_query(query), parameters or {}, fingerprint],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f'{key}.pkl.gz'
+
+    def entries(self):
+        """[(path, size, last used)] of the stored entries."""
+        entries = []
+        for path in self.cache_dir.glob('*.pkl.gz'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def get(self, key):
+        """Iterator over the cached records for key, or None."""
+        path = self._path(key)
+        if self.refresh:
+            return None
+        try:
+            # Mark the entry as recently used
+            os.utime(path)
+            f = gzip.open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        return self._read(f)
+
+    def _read(self, f):
+        with f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def spool(self, key, records):
+        """Yield records while writing them to the entry for key. The entry is stored once
+        records is exhausted; if the caller stops early the partial spool is discarded."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+        complete = False
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+                batch = []
+                for record in records:
+                    batch.append(record)
+                    if len(batch) >= SPOOL_BATCH:
+                        pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                        batch = []
+                    yield record
+                if batch:
+                    pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            complete = True
+        finally:
+            if not complete:
+                Path(tmp).unlink(missing_ok=True)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._evict()
+
+    def put(self, key, records):
+        for _ in self.spool(key, records):
+            pass
+
+    def _evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        """Remove every cached result."""
+        with self._lock:
+            for path, _, _ in self.entries():
+                path.unlink(missing_ok=True)
+
+    def fetch(self, wrapper, query, parameters, run):
+        """Iterator over the records for query: from the cache, or from run() (an iterable of
+        records) spooled into the cache as it is read."""
+        key = self.key(query, parameters, self.fingerprint(wrapper))
+        records = self.get(key)
+        if records is not None:
+            self.hits += 1
+            return records
+        self.misses += 1
+        return self.spool(key, run())
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache', action='store_true', help='Serve repeated queries from the query result cache')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Re-run queries and overwrite their cached results')
+    parser.add_argument('--clear-cache', action='store_true', help='Empty the query result cache first')
+
+
+def cache_from_args(args):
+    """QueryCache configured from add_cache_arguments() flags, or None unless --cache (or
+    --refresh-cache) was given."""
+    cache = QueryCache(refresh=args.refresh_cache)
+    if args.clear_cache:
+        cache.clear()
+    return cache if args.cache or args.refresh_cache else None
@@ -0,0 +1,33 @@
+"""
+Catalogue of the Cypher queries this repo runs against the KG:
+every query in Neo4jNamedQueries plus every *.cypher file in src/cypher/.
+"""
+from pathlib import Path
+import importlib.util
+
+utils_dir = Path(__file__).resolve().parent
+project_root = utils_dir.parent.parent
+CYPHER_DIR = project_root / 'src' / 'cypher'
+
+spec = importlib.util.spec_from_file_location('named_queries', utils_dir / 'named_queries.py')
+named_queries_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(named_queries_module)
+Neo4jNamedQueries = named_queries_module.Neo4jNamedQueries
+
+
+def named_queries():
+    """Return {name: query} for all queries defined on Neo4jNamedQueries."""
+    return {name: value for name, value in vars(Neo4jNamedQueries).items()
+            if name.isupper() and isinstance(value, str)}
+
+
+def cypher_files(cypher_dir=CYPHER_DIR):
+    """Return {file stem: query} for all .cypher files in cypher_dir."""
+    return {path.stem: path.read_text() for path in sorted(Path(cypher_dir).glob('*.cypher'))}
+
+
+def all_queries(cypher_dir=CYPHER_DIR):
+    """Return every catalogued query keyed as 'named:<NAME>' or 'file:<stem>'."""
+    queries = {f'named:{name}': q for name, q in named_queries().items()}
+    queries.update({f'file:{stem}': q for stem, q in cypher_files(cypher_dir).items()})
+    return queries
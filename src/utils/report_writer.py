@@ -0,0 +1,161 @@
+"""
+Single-pass CSV + Markdown writer for query reports (see src/scripts/report_gen.py).
+
+Records are consumed one at a time: each value is serialised once per output (compact JSON
+for the CSV, pretty-printed JSON with <br>/&nbsp; for the Markdown table) and the row is
+written to both files immediately, flushing every flush_every rows, so memory does not grow
+with the report. The formatting is that of the original report_gen output: CSV fully quoted
+with CRLF line endings, empty cells for missing values, and the query and its parameters
+appended to the Markdown.
+
+With shard_key set, the Markdown table is split into one page per value of that column (the
+partition key of a partitioned report, see Neo4jNamedQueries.PARTITIONS) in a directory next
+to the CSV (<name>/page-0001.md, ... numbered in order of first appearance), and <name>.md
+becomes an index of the pages followed by the query section. Rows keep the report order
+within each page; a page is reopened for appending when its key comes round again.
+"""
+import csv
+import json
+import math
+from pathlib import Path
+
+DEFAULT_FLUSH_EVERY = 1000
+
+
+def csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    return str(value)
+
+
+def md_cell(value):
+    if isinstance(value, (dict, list)):
+        pretty = json.dumps(value, indent=2, ensure_ascii=False)
+        # replace newlines with <br> and preserve indentation with &nbsp;
+        return '<br>'.join(line.replace(' ', '&nbsp;') for line in pretty.splitlines())
+    return str(value)
+
+
+def md_table_header(cols):
+    return '| ' + ' | '.join(cols) + ' |\n' + '| ' + ' | '.join(['---'] * len(cols)) + ' |\n'
+
+
+def query_section(query, parameters):
+    """Markdown section with the exact query and, if any, its parameters."""
+    lines = ['', '## Query', '', '```cypher']
+    # Preserve the query formatting
+    lines.extend((query or '').splitlines())
+    lines.append('```')
+    if parameters:
+        lines.extend(['', '## Parameters', '', '```json',
+                      json.dumps(parameters, indent=2, ensure_ascii=False), '```'])
+    return '\n'.join(lines) + '\n'
+
+
+class ReportWriter:
+    def __init__(self, csv_path, md_path=None, query=None, parameters=None,
+                 shard_key=None, flush_every=DEFAULT_FLUSH_EVERY):
+        self.csv_path = Path(csv_path)
+        self.md_path = Path(md_path) if md_path else self.csv_path.with_suffix('.md')
+        self.query = query
+        self.parameters = parameters
+        self.shard_key = shard_key
+        self.flush_every = flush_every
+        self.cols = None
+        self.rows = 0
+        # shard key -> {'path', 'rows'}, in order of first appearance
+        self.pages = {}
+        self._page_key = None
+        self._csv_fh = None
+        self._csv = None
+        self._md_fh = None
+
+    def _open(self, record):
+        cols = list(record.keys())
+        if self.shard_key and self.shard_key not in cols:
+            raise ValueError(f"Shard key '{self.shard_key}' is not a report column: {cols}")
+        self._csv_fh = open(self.csv_path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.writer(self._csv_fh, delimiter=',', quoting=csv.QUOTE_ALL, lineterminator='\r\n')
+        self._csv.writerow(cols)
+        if not self.shard_key:
+            self._md_fh = open(self.md_path, 'w', encoding='utf-8')
+            self._md_fh.write(md_table_header(cols))
+        else:
+            # Drop pages left over from a previous report
+            for old in self._page_dir().glob('page-*.md'):
+                old.unlink()
+        # Only set once the outputs are open, so close() after a failed open is a no-op
+        self.cols = cols
+
+    def _page_dir(self):
+        return self.md_path.with_suffix('')
+
+    def _switch_page(self, key):
+        if self._md_fh:
+            self._md_fh.close()
+        page = self.pages.get(key)
+        if page is None:
+            page_dir = self._page_dir()
+            page_dir.mkdir(parents=True, exist_ok=True)
+            page = {'path': page_dir / f'page-{len(self.pages) + 1:04d}.md', 'rows': 0}
+            self.pages[key] = page
+            self._md_fh = open(page['path'], 'w', encoding='utf-8')
+            self._md_fh.write(md_table_header(self.cols))
+        else:
+            self._md_fh = open(page['path'], 'a', encoding='utf-8')
+        self._page_key = key
+
+    def write(self, record):
+        if self.cols is None:
+            self._open(record)
+        values = [record.get(c) for c in self.cols]
+        if self.shard_key:
+            key = csv_cell(record.get(self.shard_key))
+            if self._md_fh is None or key != self._page_key:
+                self._switch_page(key)
+            self.pages[key]['rows'] += 1
+        self._csv.writerow([csv_cell(v) for v in values])
+        self._md_fh.write('| ' + ' | '.join(md_cell(v) for v in values) + ' |\n')
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self._csv_fh.flush()
+            self._md_fh.flush()
+
+    def close(self):
+        """Finish both outputs. Returns the number of rows written (nothing is written for 0 rows)."""
+        if self.cols is None:
+            for fh in (self._csv_fh, self._md_fh):
+                if fh:
+                    fh.close()
+            return 0
+        self._csv_fh.close()
+        if self.shard_key:
+            if self._md_fh:
+                self._md_fh.close()
+            with open(self.md_path, 'w', encoding='utf-8') as index:
+                index.write(f'{self.rows} rows in {len(self.pages)} pages by {self.shard_key}\n\n')
+                index.write(md_table_header(['Page', 'Rows', self.shard_key]))
+                for i, (key, page) in enumerate(self.pages.items(), 1):
+                    rel = page['path'].relative_to(self.md_path.parent).as_posix()
+                    index.write(f"| [{i}]({rel}) | {page['rows']} | {key} |\n")
+                index.write(query_section(self.query, self.parameters))
+        else:
+            self._md_fh.write(query_section(self.query, self.parameters))
+            self._md_fh.close()
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_report(records, csv_path, query=None, parameters=None, md_path=None, shard_key=None):
+    """Write an iterable of record dicts as CSV + Markdown. Returns the row count."""
+    with ReportWriter(csv_path, md_path, query, parameters, shard_key) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.rows
@@ -0,0 +1,295 @@
+"""
+Native Python emitter for the ROBOT templates in src/templates/, avoiding a JVM start per build.
+
+Reads a template TSV (header row, ROBOT directive row, data rows) and streams RDF/XML or
+Turtle using the same prefixes that are passed to `robot template --add-prefix`.
+
+Supported directives (the subset our templates use):
+    ID                          subject CURIE or IRI
+    TYPE                        owl:NamedIndividual (default), owl:Class, or a class CURIE
+    LABEL                       rdfs:label
+    A prop / AT prop^^type / AL prop@lang / AI prop    annotations (literal / typed / lang / IRI)
+    >A ... / >AT ... / >AL ... / >AI ...                axiom annotations on the previous column
+    SPLIT=|                     suffix on any of the above to split the cell into several values
+Columns with an empty directive are ignored.
+
+--compare checks the output against ROBOT's for the same template (needs rdflib).
+
+Usage:
+    python robot_template.py -t TEMPLATE.tsv --add-prefix "BG: https://..." -o OUT.owl [--compare ROBOT.owl]
+"""
+import argparse
+import csv
+import re
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+OWL = 'http://www.w3.org/2002/07/owl#'
+
+# Prefixes ROBOT knows without --add-prefix
+DEFAULT_PREFIXES = {
+    'owl': OWL,
+    'rdf': RDF,
+    'xml': 'http://www.w3.org/XML/1998/namespace',
+    'xsd': 'http://www.w3.org/2001/XMLSchema#',
+    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#',
+    'skos': 'http://www.w3.org/2004/02/skos/core#',
+    'oboInOwl': 'http://www.geneontology.org/formats/oboInOwl#',
+    'obo': 'http://purl.obolibrary.org/obo/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dcterms': 'http://purl.org/dc/terms/',
+}
+ANNOTATION = re.compile(r'^(>?)(A|AT|AL|AI)\s+(\S+?)(?:\^\^(\S+)|@(\S+))?$')
+NCNAME = re.compile(r'^[A-Za-z_][\w.-]*$')
+
+
+def parse_prefixes(add_prefix):
+    """Parse `--add-prefix` style strings ('BG: https://...') into a prefix map."""
+    prefixes = dict(DEFAULT_PREFIXES)
+    for item in add_prefix or []:
+        name, iri = item.split(':', 1)
+        prefixes[name.strip()] = iri.strip()
+    return prefixes
+
+
+def expand(curie, prefixes):
+    if '://' in curie:
+        return curie
+    prefix, sep, local = curie.partition(':')
+    if sep and prefix in prefixes:
+        return prefixes[prefix] + local
+    raise ValueError(f"Unknown prefix in '{curie}'")
+
+
+def parse_directive(directive, prefixes):
+    """Return a column spec dict for a ROBOT template directive, or None for an ignored column."""
+    directive = directive.strip()
+    split = None
+    m = re.search(r'\s+SPLIT=(\S+)$', directive)
+    if m:
+        split = m.group(1)
+        directive = directive[:m.start()].strip()
+    if not directive:
+        return None
+    if directive in ('ID', 'TYPE', 'LABEL'):
+        return {'kind': directive, 'split': split}
+    m = ANNOTATION.match(directive)
+    if not m:
+        raise ValueError(f"Unsupported template directive '{directive}'")
+    axiom, kind, prop, datatype, lang = m.groups()
+    return {
+        'kind': 'AXIOM' if axiom else 'ANNOTATION',
+        'iri_value': kind == 'AI',
+        'property': expand(prop, prefixes),
+        'datatype': expand(datatype, prefixes) if datatype else None,
+        'lang': lang,
+        'split': split,
+    }
+
+
+def read_template(path, prefixes):
+    """Yield entity dicts from a ROBOT template:
+    {'id', 'types', 'annotations': [(prop, value, is_iri, datatype, lang, [axiom annotations])]}"""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from read_template_rows(csv.reader(f, delimiter='\t'), prefixes)
+
+
+def read_template_rows(rows, prefixes):
+    """As read_template, from an iterable of rows (header, directives, then data), e.g.
+    a DataFrame built by one of the template scripts before it is written out."""
+    reader = iter(rows)
+    next(reader)
+    specs = [parse_directive(d, prefixes) for d in next(reader)]
+    for row in reader:
+        entity = {'id': None, 'types': [], 'annotations': []}
+        previous = []
+        for spec, cell in zip(specs, row):
+            if spec is None:
+                continue
+            cell = cell.strip()
+            values = [v.strip() for v in cell.split(spec['split'])] if spec['split'] else [cell]
+            values = [v for v in values if v]
+            if spec['kind'] == 'ID':
+                entity['id'] = expand(values[0], prefixes) if values else None
+            elif spec['kind'] == 'TYPE':
+                entity['types'] = [expand(v, prefixes) for v in values]
+            elif spec['kind'] == 'LABEL':
+                previous = [[DEFAULT_PREFIXES['rdfs'] + 'label', v, False, None, None, []] for v in values]
+                entity['annotations'].extend(previous)
+            elif spec['kind'] == 'ANNOTATION':
+                previous = [[spec['property'], expand(v, prefixes) if spec['iri_value'] else v,
+                             spec['iri_value'], spec['datatype'], spec['lang'], []] for v in values]
+                entity['annotations'].extend(previous)
+            else:
+                for target in previous:
+                    target[5].extend((spec['property'], expand(v, prefixes) if spec['iri_value'] else v,
+                                      spec['iri_value'], spec['datatype'], spec['lang']) for v in values)
+        if entity['id']:
+            yield entity
+
+
+def template_properties(path, prefixes):
+    """Annotation property IRIs used by a template, from its directive row."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f, delimiter='\t')
+        next(reader)
+        specs = [parse_directive(d, prefixes) for d in next(reader)]
+    props = {s['property'] for s in specs if s and 'property' in s}
+    if any(s and s['kind'] == 'LABEL' for s in specs):
+        props.add(DEFAULT_PREFIXES['rdfs'] + 'label')
+    return sorted(props)
+
+
+class RdfXmlWriter:
+    def __init__(self, out, prefixes):
+        self.out = out
+        self.prefixes = prefixes
+
+    def qname(self, iri):
+        for name, ns in sorted(self.prefixes.items(), key=lambda kv: -len(kv[1])):
+            if iri.startswith(ns) and NCNAME.match(iri[len(ns):]):
+                return iri[len(ns):] if ns == OWL else f"{name}:{iri[len(ns):]}"
+        raise ValueError(f"No prefix declared for property {iri}")
+
+    def start(self, properties):
+        w = self.out.write
+        w('<?xml version="1.0"?>\n<rdf:RDF xmlns="http://www.w3.org/2002/07/owl#"\n'
+          '     xml:base="http://www.w3.org/2002/07/owl"')
+        for name, ns in self.prefixes.items():
+            w(f'\n     xmlns:{name}={quoteattr(ns)}')
+        w('>\n    <Ontology/>\n')
+        for prop in properties:
+            w(f'    <AnnotationProperty rdf:about={quoteattr(prop)}/>\n')
+
+    def _value(self, indent, prop, value, is_iri, datatype, lang):
+        tag = self.qname(prop)
+        if is_iri:
+            return f'{indent}<{tag} rdf:resource={quoteattr(value)}/>\n'
+        attrs = f' rdf:datatype={quoteattr(datatype)}' if datatype else (f' xml:lang={quoteattr(lang)}' if lang else '')
+        return f'{indent}<{tag}{attrs}>{escape(value)}</{tag}>\n'
+
+    def entity(self, entity):
+        w = self.out.write
+        element = 'Class' if OWL + 'Class' in entity['types'] else 'NamedIndividual'
+        w(f'    <{element} rdf:about={quoteattr(entity["id"])}>\n')
+        for t in entity['types']:
+            if t not in (OWL + 'Class', OWL + 'NamedIndividual'):
+                w(f'        <rdf:type rdf:resource={quoteattr(t)}/>\n')
+        for prop, value, is_iri, datatype, lang, _ in entity['annotations']:
+            w(self._value('        ', prop, value, is_iri, datatype, lang))
+        w(f'    </{element}>\n')
+        for prop, value, is_iri, datatype, lang, axiom_annotations in entity['annotations']:
+            if not axiom_annotations:
+                continue
+            w('    <Axiom>\n')
+            w(f'        <annotatedSource rdf:resource={quoteattr(entity["id"])}/>\n')
+            w(f'        <annotatedProperty rdf:resource={quoteattr(prop)}/>\n')
+            w(self._value('        ', OWL + 'annotatedTarget', value, is_iri, datatype, lang))
+            for a in axiom_annotations:
+                w(self._value('        ', *a))
+            w('    </Axiom>\n')
+
+    def end(self):
+        self.out.write('</rdf:RDF>\n')
+
+
+class TurtleWriter:
+    def __init__(self, out, prefixes):
+        self.out = out
+        self.prefixes = prefixes
+
+    def term(self, value, is_iri=True, datatype=None, lang=None):
+        if is_iri:
+            return f'<{value}>'
+        literal = '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        if datatype:
+            return f'{literal}^^<{datatype}>'
+        return f'{literal}@{lang}' if lang else literal
+
+    def start(self, properties):
+        w = self.out.write
+        for name, ns in self.prefixes.items():
+            w(f'@prefix {name}: <{ns}> .\n')
+        w('\n[] a owl:Ontology .\n\n')
+        for prop in properties:
+            w(f'<{prop}> a owl:AnnotationProperty .\n')
+        w('\n')
+
+    def entity(self, entity):
+        w = self.out.write
+        types = entity['types'] or [OWL + 'NamedIndividual']
+        if OWL + 'Class' not in types and OWL + 'NamedIndividual' not in types:
+            types = [OWL + 'NamedIndividual'] + types
+        parts = ['a ' + ', '.join(self.term(t) for t in types)]
+        parts += [f'{self.term(p)} {self.term(v, i, d, l)}' for p, v, i, d, l, _ in entity['annotations']]
+        w(f'{self.term(entity["id"])} ' + ' ;\n    '.join(parts) + ' .\n')
+        for prop, value, is_iri, datatype, lang, axiom_annotations in entity['annotations']:
+            if not axiom_annotations:
+                continue
+            body = ['a owl:Axiom', f'owl:annotatedSource {self.term(entity["id"])}',
+                    f'owl:annotatedProperty {self.term(prop)}',
+                    f'owl:annotatedTarget {self.term(value, is_iri, datatype, lang)}']
+            body += [f'{self.term(p)} {self.term(v, i, d, l)}' for p, v, i, d, l in axiom_annotations]
+            w('[ ' + ' ;\n    '.join(body) + ' ] .\n')
+        w('\n')
+
+    def end(self):
+        pass
+
+
+WRITERS = {'rdfxml': RdfXmlWriter, 'turtle': TurtleWriter}
+
+
+def emit(template, out, prefixes, fmt='rdfxml'):
+    """Stream the OWL for template to the open text file out. Returns the number of entities."""
+    writer = WRITERS[fmt](out, prefixes)
+    writer.start(template_properties(template, prefixes))
+    n = 0
+    for entity in read_template(template, prefixes):
+        writer.entity(entity)
+        n += 1
+    writer.end()
+    return n
+
+
+def check_equivalent(ours, theirs):
+    """Compare two RDF files as graphs (blank-node aware). Returns (equal, only in ours, only in theirs)."""
+    try:
+        from rdflib import Graph
+        from rdflib.compare import to_isomorphic, graph_diff
+    except ImportError:
+        raise ImportError("The equivalence check needs rdflib: pip install rdflib")
+    graphs = []
+    for path in (ours, theirs):
+        g = Graph()
+        g.parse(path, format='turtle' if str(path).endswith('.ttl') else 'xml')
+        graphs.append(to_isomorphic(g))
+    _, only_ours, only_theirs = graph_diff(*graphs)
+    return graphs[0] == graphs[1], len(only_ours), len(only_theirs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emit OWL from a ROBOT template without starting ROBOT.")
+    parser.add_argument('-t', '--template', required=True, help='ROBOT template TSV')
+    parser.add_argument('-o', '--output', required=True, help='Output file')
+    parser.add_argument('--add-prefix', action='append', default=[], help='Prefix as "PREFIX: IRI" (repeatable)')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='rdfxml', help='Output syntax')
+    parser.add_argument('--compare', default=None, help='ROBOT output to check the result against')
+    args = parser.parse_args(argv)
+
+    prefixes = parse_prefixes(args.add_prefix)
+    with open(args.output, 'w', encoding='utf-8') as out:
+        n = emit(args.template, out, prefixes, args.format)
+    print(f"Wrote {n} entities to {args.output}")
+
+    if args.compare:
+        equal, only_ours, only_theirs = check_equivalent(args.output, args.compare)
+        if not equal:
+            sys.exit(f"Not equivalent to {args.compare}: {only_ours} triples only in ours, "
+                     f"{only_theirs} only in ROBOT output")
+        print(f"Equivalent to {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
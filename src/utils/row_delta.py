@@ -0,0 +1,196 @@
+"""
+Row-level fingerprints and mapping deltas for ROBOT mapping templates.
+
+Next to a template (e.g. src/templates/BG2WMB_AT_map_template.tsv) a sidecar
+<template>.rows.json records, per row id, a fingerprint of the source row it was built from
+and of the template row itself, plus a context fingerprint (taxonomy version, generator code,
+id prefix). A regenerating script compares fingerprints of the new source table with the
+sidecar to find the rows it must rebuild; rows whose source and context are unchanged are
+copied from the existing template.
+
+What the KG holds is recorded separately: after load_mappings.py loads a template or applies
+a delta it writes <template>.loaded.json with the mappings per row id and the sha256 of the
+template they correspond to. A delta is always taken against that record, not against the
+previous template file, so regenerating the template (make templates, build.py) between an
+edit and the delta run does not lose the edit.
+
+The delta (<template>.delta.json) lists, per changed row, the mappings added and removed, as
+{'rel', 'object'} pairs keyed by the row's CURIE, so a consumer such as load_mappings.py
+can apply the edit instead of reloading the whole template. previous_sha256 is the template
+the delta applies on top of (the loaded record's sha256); template is relative to the
+project root:
+
+    {"template": "src/templates/...", "previous_sha256": ..., "sha256": ...,
+     "summary": {"rows": 2, "added": 1, "removed": 3},
+     "rows": {"BG:CS20250428_GROUP_0039": {"label": "Astrocyte", "status": "changed",
+                                           "added": [...], "removed": [...]}}}
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent.parent
+
+
+def sidecar_path(template):
+    return Path(template).with_suffix('.rows.json')
+
+
+def delta_path(template):
+    return Path(template).with_suffix('.delta.json')
+
+
+def loaded_path(template):
+    return Path(template).with_suffix('.loaded.json')
+
+
+def relative(path):
+    """path relative to the project root if it lies under it, as a string."""
+    path = Path(path).resolve()
+    return str(path.relative_to(project_root)) if path.is_relative_to(project_root) else str(path)
+
+
+def file_sha256(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def fingerprint(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def row_fingerprints(frame, ids, columns=None):
+    """{id: fingerprint of the row's values} for frame, with ids aligned to its rows."""
+    columns = list(columns or frame.columns)
+    values = frame[columns].astype(object).where(frame[columns].notna(), None).values.tolist()
+    return {str(i): fingerprint(columns, row) for i, row in zip(ids, values)}
+
+
+def read_sidecar(template):
+    path = sidecar_path(template)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_json(path, data):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def write_sidecar(template, context, inputs, rows):
+    _write_json(sidecar_path(template), {'context': context, 'inputs': inputs, 'rows': rows})
+
+
+def read_template_frame(template, id_column):
+    """Data rows of an existing template (directive row dropped) as strings, indexed by id,
+    or None if there is no template."""
+    template = Path(template)
+    if not template.exists():
+        return None
+    frame = pd.read_csv(template, sep='\t', dtype=str, keep_default_na=False).iloc[1:]
+    return frame.set_index(frame[id_column], drop=False)
+
+
+def row_mappings(row, match_columns, split='|'):
+    """Set of (rel, object) pairs in a template row; match_columns maps column -> rel name."""
+    pairs = set()
+    for column, rel in match_columns.items():
+        for obj in str(row.get(column) or '').split(split):
+            if obj.strip():
+                pairs.add((rel, obj.strip()))
+    return pairs
+
+
+def frame_mappings(frame, match_columns):
+    """{id: set of (rel, object)} for a template DataFrame indexed by id."""
+    return {str(i): row_mappings(row, match_columns) for i, row in frame.iterrows()}
+
+
+def mapping_delta(before, after, labels=None):
+    """Per-id added/removed mappings between two {id: set of (rel, object)} states. Ids only
+    in after are 'added', only in before 'removed', else 'changed'; ids whose mappings are
+    unchanged are left out. labels optionally maps id -> label."""
+    delta = {}
+    for i in sorted(set(before) | set(after)):
+        old, new = before.get(i, set()), after.get(i, set())
+        if old == new and (i in before) == (i in after):
+            continue
+        delta[i] = {
+            'label': (labels or {}).get(i),
+            'status': 'changed' if i in before and i in after else ('added' if i in after else 'removed'),
+            'added': [{'rel': r, 'object': o} for r, o in sorted(new - old)],
+            'removed': [{'rel': r, 'object': o} for r, o in sorted(old - new)],
+        }
+    return delta
+
+
+def apply_mapping_delta(state, delta):
+    """The {id: set of (rel, object)} state after applying a delta's 'rows' to state."""
+    state = {i: set(pairs) for i, pairs in state.items()}
+    for i, change in delta['rows'].items():
+        pairs = state.get(i, set())
+        pairs -= {(m['rel'], m['object']) for m in change['removed']}
+        pairs |= {(m['rel'], m['object']) for m in change['added']}
+        if change['status'] == 'removed':
+            state.pop(i, None)
+        else:
+            state[i] = pairs
+    return state
+
+
+def read_loaded(template):
+    """(sha256, {id: set of (rel, object)}) last loaded into the KG for template, or None."""
+    path = loaded_path(template)
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text())
+    return data['sha256'], {i: {tuple(p) for p in pairs} for i, pairs in data['mappings'].items()}
+
+
+def write_loaded(template, sha256, mappings):
+    _write_json(loaded_path(template), {
+        'template': relative(template),
+        'sha256': sha256,
+        'mappings': {i: sorted(map(list, pairs)) for i, pairs in sorted(mappings.items())},
+    })
+
+
+def pending_delta(template):
+    """Path of template's delta if it exists and has not been applied (its sha256 is not the
+    loaded one), else None."""
+    path = delta_path(template)
+    if not path.exists():
+        return None
+    loaded = read_loaded(template)
+    if loaded and loaded[0] == read_delta(path)['sha256']:
+        return None
+    return path
+
+
+def write_delta(template, delta, previous_sha256, path=None):
+    path = Path(path) if path else delta_path(template)
+    _write_json(path, {
+        'template': relative(template),
+        'previous_sha256': previous_sha256,
+        'sha256': file_sha256(template),
+        'summary': {'rows': len(delta),
+                    'added': sum(len(d['added']) for d in delta.values()),
+                    'removed': sum(len(d['removed']) for d in delta.values())},
+        'rows': delta,
+    })
+    return path
+
+
+def read_delta(path):
+    return json.loads(Path(path).read_text())
@@ -1,12 +1,23 @@
+import argparse
+import hashlib
 import json
 import sys
-from jsonschema import Draft4Validator, RefResolver, SchemaError
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import unquote, urlparse
+from jsonschema import Draft4Validator, SchemaError
+from referencing import Registry, Resource
+from referencing.exceptions import NoSuchResource
+from referencing.jsonschema import DRAFT4
 import os
 import glob
 from ruamel.yaml import YAML, YAMLError
 import warnings
 from pathlib import Path
 
+# Compiled validators keyed by schema_hash(); shared by every call in a process
+_validators = {}
+
 
 def get_json_from_file(filename):
     """Loads json from a file.
@@ -16,6 +27,7 @@ def get_json_from_file(filename):
             fc = f.read()
         except Exception as exc:
             warnings.warn('Failed to open ' + filename + ' as JSON')
+            raise
     return json.loads(fc)
 
 
@@ -28,48 +40,153 @@ def get_yaml_from_file(filename):
             y = ryaml.load(stream)
         except YAMLError as exc:
             warnings.warn('Failed to open ' + filename + ' as YAML')
+            raise
     return y
 
 
-def get_validator(filename, base_uri=''):
+def schema_hash(schema, base_uri=''):
+    """Stable hash of a schema document (and the base URI its refs resolve against)."""
+    canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256((base_uri + '\n' + canonical).encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _retrieve(uri):
+    """Load a schema document referenced by a file:// URI (relative $refs under base_uri)."""
+    parsed = urlparse(uri)
+    if parsed.scheme != 'file':
+        raise NoSuchResource(ref=uri)
+    return Resource.from_contents(get_json_from_file(unquote(parsed.path)), default_specification=DRAFT4)
+
+
+def compile_validator(schema, base_uri=''):
+    """Check a schema and return a Draft4Validator for it, reusing an
+    already compiled validator for an identical schema. With a base_uri, relative
+    $refs are resolved against it (file:// URIs are read from disk)."""
+    key = schema_hash(schema, base_uri)
+    if key not in _validators:
+        Draft4Validator.check_schema(schema)
+        registry = Registry(retrieve=_retrieve)
+        if base_uri and 'id' not in schema:
+            schema = {**schema, 'id': base_uri}
+        _validators[key] = Draft4Validator(schema=schema, registry=registry)
+    return _validators[key]
+
+
+def get_validator(filename, base_uri='', schema=None):
     """Load schema from JSON file;
     Check whether it's a valid schema;
     Return a Draft4Validator object.
     Optionally specify a base URI for relative path
     resolution of JSON pointers (This is especially useful
     for local resolution via base_uri of form file://{some_path}/)
+    The compiled validator is cached by schema hash. Pass schema if it is
+    already loaded.
     """
 
-    schema = get_json_from_file(filename)
+    if schema is None:
+        schema = get_json_from_file(filename)
     try:
         # Check schema via class method call. Works, despite IDE complaining
         # However, it appears that this doesn't catch every schema issue.
-        Draft4Validator.check_schema(schema)
+        validator = compile_validator(schema, base_uri)
         print("%s is a valid JSON schema" % filename)
     except SchemaError:
         raise
-    if base_uri:
-        resolver = RefResolver(base_uri=base_uri,
-                               referrer=filename)
-    else:
-        resolver = None
-    return Draft4Validator(schema=schema,
-                           resolver=resolver)
+    return validator
 
 
 def validate(validator, instance):
-    """Validate an instance of a schema and report errors."""
+    """Validate an instance of a schema and report errors.
+    Returns True if the instance is valid."""
     if validator.is_valid(instance):
         print("Validation Passes")
         return True
     else:
         es = validator.iter_errors(instance)
         recurse_through_errors(es)
-        # print("Validation Fails")
-        sys.exit("Validation Fails")
+        print("Validation Fails")
         return False
 
 
+def collect_errors(es, level=0):
+    """Flatten validation errors, including subschema (context) errors, into dicts."""
+    errors = []
+    for e in es:
+        errors.append({'level': level,
+                       'message': e.message,
+                       'instance_path': '/'.join(str(p) for p in e.absolute_path),
+                       'schema_path': '/'.join(str(p) for p in e.absolute_schema_path),
+                       'validator': e.validator})
+        if e.context:
+            errors.extend(collect_errors(e.context, level + 1))
+    return errors
+
+
+def load_instance(filename):
+    """Load a JSON or YAML instance, chosen by file extension."""
+    if str(filename).endswith('.json'):
+        return get_json_from_file(filename)
+    return get_yaml_from_file(filename)
+
+
+_worker_validator = None
+
+
+def _init_worker(schema, base_uri):
+    global _worker_validator
+    _worker_validator = compile_validator(schema, base_uri)
+
+
+def _validate_file(filename):
+    result = {'file': str(filename), 'valid': False, 'errors': []}
+    try:
+        instance = load_instance(filename)
+    except Exception as exc:
+        result['errors'].append({'level': 0, 'message': f"Failed to load: {exc}",
+                                 'instance_path': '', 'schema_path': '', 'validator': 'load'})
+        return result
+    result['errors'] = collect_errors(_worker_validator.iter_errors(instance))
+    result['valid'] = not result['errors']
+    return result
+
+
+def validate_files(schema_file, instance_files, base_uri='', workers=None, schema=None):
+    """Validate every instance file against one schema and return a report dict:
+    {'schema', 'valid', 'n_files', 'n_invalid', 'n_errors', 'files': [{'file', 'valid', 'errors'}]}.
+    The schema (read from schema_file unless given) is compiled once per process; files are
+    spread over a process pool (workers=1 validates in this process). Nothing exits on failure."""
+    if schema is None:
+        schema = get_json_from_file(schema_file)
+    instance_files = [str(f) for f in instance_files]
+    if workers == 1 or len(instance_files) < 2:
+        _init_worker(schema, base_uri)
+        results = [_validate_file(f) for f in instance_files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(schema, base_uri)) as pool:
+            results = list(pool.map(_validate_file, instance_files))
+    return {'schema': str(schema_file),
+            'valid': all(r['valid'] for r in results),
+            'n_files': len(results),
+            'n_invalid': sum(not r['valid'] for r in results),
+            'n_errors': sum(len(r['errors']) for r in results),
+            'files': results}
+
+
+def format_report(report):
+    """Human readable text for a validate_files() report."""
+    lines = []
+    for r in report['files']:
+        lines.append(f"{'PASS' if r['valid'] else 'FAIL'}\t{r['file']}")
+        for e in r['errors']:
+            lines.append("\t" + "***" * e['level'] + f"{e['message']}\t"
+                         f"instance: /{e['instance_path']}\tschema: /{e['schema_path']}")
+    lines.append(f"{report['n_files']} file(s) checked against {report['schema']}: "
+                 f"{report['n_invalid']} invalid, {report['n_errors']} error(s)")
+    return '\n'.join(lines)
+
+
 def recurse_through_errors(es, level=0):
     """Recurse through errors posting message
     and schema path until context is empty"""
@@ -91,12 +208,10 @@ def test_local(path_to_schema_dir, schema_file, path_to_test_dir, load_yaml=True
        * path_to_schema_dir:  Absolute or relative path to schema dir
        * schema_file: schema file name
        * test_dir: path to test directory (absolute or local to schema dir)
+    Returns the validation report; raises AssertionError if any instance is invalid.
     """
-    file_ext = 'json'
-    loader = get_json_from_file
-    if load_yaml:
-        file_ext = 'yaml'
-        loader = get_yaml_from_file
+    # Instances are loaded by extension (see load_instance)
+    file_ext = 'yaml' if load_yaml else 'json'
     # Getting script directory, schema directory and test directory
     script_folder = Path(os.path.dirname(os.path.realpath(__file__))).parent
     schema_dir = Path(os.path.dirname(path_to_schema_dir))
@@ -107,12 +222,35 @@ def test_local(path_to_schema_dir, schema_file, path_to_test_dir, load_yaml=True
     if not os.path.exists(os.path.join(script_folder.parent, test_dir)):
         raise Exception("Please provide valid path_to_test_dir")
     else:
-        sv = get_validator(os.path.join(script_folder.parent, schema_dir, schema_file))
+        schema_path = os.path.join(script_folder.parent, schema_dir, schema_file)
+        schema = get_json_from_file(schema_path)
+        get_validator(schema_path, schema=schema)
         test_dir_files = ''.join(['/*.', file_ext])
         test_files = glob.glob(pathname=os.path.join(script_folder.parent, test_dir) + test_dir_files)
-        # print("Found test files: %s in %s" % (str(test_files), path_to_test_dir))
-        for instance_file in test_files:
-            print(instance_file)
-            i = loader(instance_file)
-            print("Testing: %s" % instance_file)
-            validate(sv, i)
+        report = validate_files(schema_path, test_files, schema=schema)
+        print(format_report(report))
+        if not report['valid']:
+            raise AssertionError(f"Validation Fails: {report['n_invalid']} of {report['n_files']} file(s) invalid")
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate YAML/JSON configs against a JSON schema in one pass.")
+    parser.add_argument('files', nargs='+', help='Instance files or glob patterns')
+    parser.add_argument('-s', '--schema', required=True, help='JSON schema file')
+    parser.add_argument('--base-uri', default='', help='Base URI for resolving $refs')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--report', default=None, help='Also write the structured report as JSON to this file')
+    args = parser.parse_args()
+
+    files = sorted({f for pattern in args.files for f in (glob.glob(pattern) or [pattern])})
+    report = validate_files(args.schema, files, args.base_uri, args.workers)
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report['valid'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+Loader for square cross-species score matrices such as sm_cluster.mapping_table.tsv.
+
+The TSV layout is a header row of column labels (first cell empty) followed by one row per
+cluster: its label, then one score per column. Matrices are parsed straight to float32 and
+cached under .cache/score_matrix as a .npy file plus a JSON label sidecar, so repeat loads
+memory-map the binary instead of re-parsing the text. The cache key includes the source
+path, size and modification time.
+
+ScoreMatrixStore is the query-side view: the matrix is converted once into a float32 .npy
+with rows and columns grouped into species blocks (hs_, mm_, ...) and a label dictionary
+storing each distinct label once, with rows and columns as indices into it. It also
+reads the ranked-neighbour layout of sm_cluster.D.tsv, where each cluster is a pair of
+columns (neighbour, score) under a duplicated header label. Nearest neighbours, pairs
+above a threshold and species blocks are then read from the memory map without loading
+the whole matrix.
+
+Usage:
+    python score_matrix.py convert MATRIX_TSV
+    python score_matrix.py nearest MATRIX_TSV LABEL [-k 5] [--species mm]
+    python score_matrix.py pairs MATRIX_TSV --threshold 0.9 [--rows hs] [--columns mm]
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_DIR = project_root / '.cache' / 'score_matrix'
+
+
+def read_matrix_tsv(path):
+    """Parse a square score matrix TSV. Returns (values float32 array, row labels, column labels)."""
+    with open(path) as f:
+        col_labels = f.readline().rstrip('\n').split('\t')[1:]
+    dtypes = {i: np.float32 for i in range(1, len(col_labels) + 1)}
+    dtypes[0] = str
+    frame = pd.read_csv(path, sep='\t', header=None, skiprows=1, dtype=dtypes, keep_default_na=False)
+    row_labels = frame.pop(0).tolist()
+    return np.ascontiguousarray(frame.to_numpy(dtype=np.float32)), row_labels, col_labels
+
+
+def read_neighbor_tsv(path):
+    """Parse a ranked-neighbour table (sm_cluster.D.tsv) into a square matrix.
+
+    Row 1 holds each cluster label twice, row 2 'Cluster' / 'Alignment score', then row i
+    gives every cluster's i-th best neighbour and its score. Returns (values float32 array,
+    row labels, column labels) with matrix[neighbour, cluster] = score and rows in the order
+    of the columns; pairs a column does not list are NaN.
+    """
+    with open(path) as f:
+        header = f.readline().rstrip('\n').split('\t')
+    labels = header[::2]
+    frame = pd.read_csv(path, sep='\t', header=None, skiprows=2, dtype=str, keep_default_na=False)
+    index = {label: i for i, label in enumerate(labels)}
+    neighbours = frame.iloc[:, ::2].to_numpy()
+    scores = frame.iloc[:, 1::2].to_numpy(dtype=np.float32)
+    values = np.full((len(labels), len(labels)), np.nan, dtype=np.float32)
+    cols = np.broadcast_to(np.arange(len(labels)), neighbours.shape)
+    rows = pd.Series(neighbours.ravel()).map(index).to_numpy()
+    values[rows.astype(np.intp), cols.ravel()] = scores.ravel()
+    return values, labels, list(labels)
+
+
+def is_neighbor_tsv(path):
+    """True for the D.tsv layout (each header label repeated over a neighbour/score column pair)."""
+    with open(path) as f:
+        header = f.readline().rstrip('\n').split('\t')
+    return len(header) > 1 and len(header) % 2 == 0 and header[0::2] == header[1::2]
+
+
+def _cache_key(path):
+    path = Path(path).resolve()
+    st = path.stat()
+    return path, hashlib.sha1(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def _cache_paths(path, cache_dir):
+    path, key = _cache_key(path)
+    base = Path(cache_dir) / f"{path.stem}-{key}"
+    return base.with_suffix('.npy'), base.with_suffix('.labels.json')
+
+
+def load_score_matrix(path, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """Load a score matrix, memory-mapping the cached binary when available.
+    Returns (values, row labels, column labels)."""
+    if not use_cache:
+        return read_matrix_tsv(path)
+    npy_path, labels_path = _cache_paths(path, cache_dir)
+    if npy_path.exists() and labels_path.exists():
+        labels = json.loads(labels_path.read_text())
+        return np.load(npy_path, mmap_mode='r'), labels['rows'], labels['columns']
+    values, rows, cols = read_matrix_tsv(path)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(npy_path, values)
+    labels_path.write_text(json.dumps({'rows': rows, 'columns': cols}))
+    return np.load(npy_path, mmap_mode='r'), rows, cols
+
+
+def scores_above(values, row_labels, col_labels, threshold, chunk_size=4096):
+    """Return a long DataFrame (r, c, score) of entries with score >= threshold.
+
+    The matrix is scanned in blocks of chunk_size columns and only entries passing the
+    mask are materialised. They are listed column by column (the same order a melt of the
+    wide matrix would give) with scores as float64.
+    """
+    threshold = np.float32(threshold)
+    rows, cols, scores = [], [], []
+    for start in range(0, values.shape[1], chunk_size):
+        block = np.asarray(values[:, start:start + chunk_size])
+        col_idx, row_idx = np.nonzero(block.T >= threshold)
+        rows.append(row_idx)
+        cols.append(col_idx + start)
+        scores.append(block[row_idx, col_idx])
+    row_idx = np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+    col_idx = np.concatenate(cols) if cols else np.empty(0, dtype=np.intp)
+    return pd.DataFrame({
+        'r': np.asarray(row_labels, dtype=object)[row_idx],
+        'c': np.asarray(col_labels, dtype=object)[col_idx],
+        'score': np.concatenate(scores).astype(np.float64) if scores else np.empty(0),
+    })
+
+
+def species_of(label):
+    """Species prefix of a cluster label ('hs' for 'hs_12', 'mm' for 'mm_astrocyte')."""
+    return label.split('_', 1)[0]
+
+
+def species_order(labels):
+    """Positions of labels grouped by species (stable within a species) and the
+    {species: [start, stop]} block offsets in that order."""
+    species = [species_of(label) for label in labels]
+    order = sorted(range(len(labels)), key=lambda i: species[i])
+    blocks = {}
+    for pos, i in enumerate(order):
+        blocks.setdefault(species[i], [pos, pos])[1] = pos + 1
+    return order, blocks
+
+
+class ScoreMatrixStore:
+    """Species-blocked, memory-mapped score matrix with interned labels (see module docstring)."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / 'labels.json').read_text())
+        self.labels = meta['labels']
+        self.row_labels = [self.labels[i] for i in meta['rows']]
+        self.col_labels = [self.labels[i] for i in meta['columns']]
+        self.row_blocks = meta['row_blocks']
+        self.col_blocks = meta['column_blocks']
+        self.row_index = {label: i for i, label in enumerate(self.row_labels)}
+        self.col_index = {label: i for i, label in enumerate(self.col_labels)}
+        self.values = np.load(self.directory / 'values.npy', mmap_mode='r')
+
+    @classmethod
+    def open(cls, path, cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+        """Open the store for a matrix TSV (either layout), converting it on first use."""
+        path, key = _cache_key(path)
+        directory = Path(cache_dir) / f"{path.stem}-{key}.store"
+        if refresh or not (directory / 'labels.json').exists():
+            cls.convert(path, directory)
+        return cls(directory)
+
+    @staticmethod
+    def convert(path, directory):
+        reader = read_neighbor_tsv if is_neighbor_tsv(path) else read_matrix_tsv
+        values, rows, cols = reader(path)
+        row_order, row_blocks = species_order(rows)
+        col_order, col_blocks = species_order(cols)
+        values = np.ascontiguousarray(values[np.ix_(row_order, col_order)])
+        ids = {}
+        for label in rows + cols:
+            ids.setdefault(label, len(ids))
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / 'values.npy', values)
+        # labels.json last: its presence marks a complete store
+        (directory / 'labels.json').write_text(json.dumps({
+            'source': str(path),
+            'labels': list(ids),
+            'rows': [ids[rows[i]] for i in row_order],
+            'columns': [ids[cols[i]] for i in col_order],
+            'row_blocks': row_blocks,
+            'column_blocks': col_blocks,
+        }))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def _rows(self, species):
+        if species is None:
+            return 0, self.values.shape[0]
+        return self._block(self.row_blocks, species)
+
+    def _cols(self, species):
+        if species is None:
+            return 0, self.values.shape[1]
+        return self._block(self.col_blocks, species)
+
+    @staticmethod
+    def _block(blocks, species):
+        if species not in blocks:
+            raise KeyError(f"No '{species}' block (have {', '.join(blocks)})")
+        return tuple(blocks[species])
+
+    def block(self, row_species=None, col_species=None):
+        """(values, row labels, column labels) for one species block; values is a memmap view."""
+        r0, r1 = self._rows(row_species)
+        c0, c1 = self._cols(col_species)
+        return self.values[r0:r1, c0:c1], self.row_labels[r0:r1], self.col_labels[c0:c1]
+
+    def nearest(self, label, k=5, species=None):
+        """The k best-scoring columns (optionally of one species) for row label, as a
+        DataFrame (rank, cluster, score). Only that row is read."""
+        if label not in self.row_index:
+            raise KeyError(f"Unknown cluster label: {label}")
+        c0, c1 = self._cols(species)
+        scores = np.array(self.values[self.row_index[label], c0:c1], dtype=np.float32)
+        self_col = self.col_index.get(label)
+        if self_col is not None and c0 <= self_col < c1:
+            scores[self_col - c0] = np.nan
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, dtype=np.intp)
+        top = top[np.argsort(-scores[top], kind='stable')]
+        top = top[np.isfinite(scores[top])]
+        return pd.DataFrame({
+            'rank': np.arange(1, len(top) + 1),
+            'cluster': np.asarray(self.col_labels[c0:c1], dtype=object)[top],
+            'score': scores[top].astype(np.float64),
+        })
+
+    def pairs_above(self, threshold, row_species=None, col_species=None, chunk_size=4096):
+        """Long DataFrame (r, c, score) of entries >= threshold within a block, read in chunks."""
+        values, rows, cols = self.block(row_species, col_species)
+        return scores_above(values, rows, cols, threshold, chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and query cross-species score matrices.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('convert', help='Build (or rebuild) the binary store for a matrix TSV')
+    p.add_argument('matrix')
+    p = sub.add_parser('nearest', help='k best matches for one cluster')
+    p.add_argument('matrix')
+    p.add_argument('label')
+    p.add_argument('-k', type=int, default=5)
+    p.add_argument('--species', default=None, help="Only columns of this species (e.g. 'mm')")
+    p = sub.add_parser('pairs', help='All pairs scoring at least --threshold')
+    p.add_argument('matrix')
+    p.add_argument('--threshold', type=float, required=True)
+    p.add_argument('--rows', default=None, help='Row species block')
+    p.add_argument('--columns', default=None, help='Column species block')
+    args = parser.parse_args()
+
+    store = ScoreMatrixStore.open(args.matrix, refresh=args.command == 'convert')
+    if args.command == 'convert':
+        blocks = ', '.join(f"{s} {b[1] - b[0]}" for s, b in store.row_blocks.items())
+        print(f"{store.shape[0]} x {store.shape[1]} matrix ({blocks}) stored in {store.directory}")
+    elif args.command == 'nearest':
+        print(store.nearest(args.label, args.k, args.species).to_string(index=False))
+    else:
+        pairs = store.pairs_above(args.threshold, args.rows, args.columns)
+        pairs.sort_values('score', ascending=False).to_csv(sys.stdout, sep='\t', index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Streaming, partitioned SPARQL client for the rdf4j triplestore (the dumps stage endpoint,
+http://triplestore:8080/rdf4j-server/repositories/obask inside docker compose).
+
+An unbounded query such as config/dumps/sparql/_dump_all.sparql
+(CONSTRUCT { ?x ?p ?y } WHERE { ?x ?p ?y }) makes the server build the whole graph in one
+response. Here the query is split into partitions, each a restricted copy of it:
+
+    subject  FILTER on the first hex digits of MD5(STR(?x)) (16**prefix_length partitions;
+             all blank-node subjects go to the first partition)
+    graph    one query per named graph, the WHERE body wrapped in GRAPH <g> { ... }
+             (statements without a context are not covered)
+    none     the query as is
+
+Partitions run concurrently on a bounded thread pool. Each response is streamed line by line
+(N-Triples for CONSTRUCT/DESCRIBE, TSV for SELECT) straight into gzip chunk files of at
+most chunk_lines lines (<name>-p<partition>-<chunk>.nt.gz / .tsv.gz, each TSV chunk with
+the header row), so neither side holds a partition in memory. Chunks are written under a
+temporary name and renamed when their partition succeeds. A <name>.manifest.json lists the
+chunks and line counts. Gzip members concatenate, so `cat <name>-*.nt.gz` is itself a valid
+.nt.gz of the whole result.
+
+rdf4j writes stored blank nodes with their internal ids, so blank-node labels agree
+across partitions of one dump.
+
+Usage:
+    python sparql_client.py QUERY.sparql -o OUT_DIR [-e ENDPOINT] [--partition subject|graph|none]
+                            [--prefix-length 1] [--workers 4] [--chunk-lines 1000000]
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from pathlib import Path
+
+import requests
+
+DEFAULT_ENDPOINT = 'http://localhost:8080/rdf4j-server/repositories/obask'
+DEFAULT_WORKERS = 4
+DEFAULT_CHUNK_LINES = 1_000_000
+DEFAULT_TIMEOUT = 3600
+
+ACCEPT = {'graph': 'application/n-triples', 'select': 'text/tab-separated-values'}
+SUFFIX = {'graph': '.nt.gz', 'select': '.tsv.gz'}
+FORM = re.compile(r'\b(CONSTRUCT|DESCRIBE|SELECT|ASK)\b', re.IGNORECASE)
+WHERE = re.compile(r'\bWHERE\s*\{', re.IGNORECASE)
+SHORT_CONSTRUCT = re.compile(r'\bCONSTRUCT\s+WHERE\b', re.IGNORECASE)
+VARIABLE = re.compile(r'[?$](\w+)')
+GRAPHS_QUERY = 'SELECT DISTINCT ?g WHERE { GRAPH ?g { ?s ?p ?o } }'
+
+
+def strip_prologue(query):
+    """Query with comments and PREFIX/BASE declarations removed (for detecting its form)."""
+    lines = [line for line in query.splitlines() if not line.strip().startswith('#')]
+    return re.sub(r'(?is)\s*(PREFIX\s+\S*\s*<[^>]*>|BASE\s*<[^>]*>)', ' ', '\n'.join(lines))
+
+
+def query_form(query):
+    """'graph' for CONSTRUCT/DESCRIBE, 'select' for SELECT."""
+    match = FORM.search(strip_prologue(query))
+    if not match or match.group(1).upper() == 'ASK':
+        raise ValueError('Only CONSTRUCT, DESCRIBE and SELECT queries can be streamed')
+    return 'select' if match.group(1).upper() == 'SELECT' else 'graph'
+
+
+def where_body(query):
+    """(start, end) of the outermost WHERE group's body (between its braces).
+    The short form CONSTRUCT WHERE { ... } is rejected: its group is the template and
+    cannot take a FILTER or GRAPH wrapper."""
+    if SHORT_CONSTRUCT.search(strip_prologue(query)):
+        raise ValueError('CONSTRUCT WHERE { ... } cannot be partitioned; write CONSTRUCT { ... } WHERE { ... }')
+    match = WHERE.search(query)
+    end = query.rfind('}')
+    if not match or end < match.end():
+        raise ValueError('Cannot find the WHERE { ... } group to partition')
+    return match.end(), end
+
+
+def subject_variable(query):
+    """First variable in the WHERE group (?x in `WHERE {?x ?p ?y}`)."""
+    start, end = where_body(query)
+    match = VARIABLE.search(query, start, end)
+    if not match:
+        raise ValueError('No variable in the WHERE group to partition on')
+    return match.group(1)
+
+
+def subject_partitions(query, prefix_length=1, variable=None):
+    """{name: query} restricted to subjects whose MD5 starts with each hex prefix."""
+    variable = variable or subject_variable(query)
+    _, end = where_body(query)
+    partitions = {}
+    for i, digits in enumerate(product('0123456789abcdef', repeat=prefix_length)):
+        prefix = ''.join(digits)
+        test = f'STRSTARTS(MD5(STR(?{variable})), "{prefix}")'
+        # Blank nodes only in the first partition, whether or not STR(bnode) is an error
+        if i == 0:
+            test = f'IF(isBlank(?{variable}), true, {test})'
+        else:
+            test = f'!isBlank(?{variable}) && {test}'
+        partitions[prefix] = f'{query[:end]}\n  FILTER({test})\n{query[end:]}'
+    return partitions
+
+
+def graph_partitions(query, graphs):
+    """{name: query} with the WHERE body wrapped in GRAPH <g> for each named graph."""
+    start, end = where_body(query)
+    return {f'g{i:03d}': f'{query[:start]} GRAPH <{g}> {{{query[start:end]}}} {query[end:]}'
+            for i, g in enumerate(graphs)}
+
+
+class SparqlClient:
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.endpoint = endpoint
+        self.workers = workers
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # One connection pool per worker thread
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _post(self, query, form):
+        response = self.session.post(self.endpoint, data={'query': query},
+                                     headers={'Accept': ACCEPT[form]}, stream=True, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def stream_lines(self, query, form=None):
+        """Yield the response to query line by line (decoded, without line endings)."""
+        with self._post(query, form or query_form(query)) as response:
+            for line in response.iter_lines(chunk_size=1 << 16):
+                yield line.decode('utf-8')
+
+    def named_graphs(self):
+        lines = self.stream_lines(GRAPHS_QUERY, 'select')
+        next(lines, None)  # header
+        return [line.strip().strip('<>') for line in lines if line.strip()]
+
+    def partitions(self, query, partition='subject', prefix_length=1, variable=None):
+        if partition == 'subject':
+            return subject_partitions(query, prefix_length, variable)
+        if partition == 'graph':
+            return graph_partitions(query, self.named_graphs())
+        return {'all': query}
+
+    def write_partition(self, name, query, form, out_dir, prefix, chunk_lines=DEFAULT_CHUNK_LINES):
+        """Stream one partition into gzip chunks. Returns [(path, lines)]."""
+        suffix = SUFFIX[form]
+        chunks, out, header, count = [], None, None, 0
+        try:
+            for line in self.stream_lines(query, form):
+                if form == 'select' and header is None:
+                    header = line
+                    continue
+                if not line:
+                    continue
+                if out is None or count >= chunk_lines:
+                    if out:
+                        out.close()
+                    path = out_dir / f'{prefix}-p{name}-{len(chunks):04d}{suffix}'
+                    out = gzip.open(path.with_name(path.name + '.tmp'), 'wt', encoding='utf-8', compresslevel=6)
+                    chunks.append([path, 0])
+                    count = 0
+                    if header is not None:
+                        out.write(header + '\n')
+                out.write(line + '\n')
+                count += 1
+                chunks[-1][1] += 1
+            if out:
+                out.close()
+        except BaseException:
+            if out:
+                out.close()
+            for path, _ in chunks:
+                path.with_name(path.name + '.tmp').unlink(missing_ok=True)
+            raise
+        for path, _ in chunks:
+            os.replace(path.with_name(path.name + '.tmp'), path)
+        return [(str(path), lines) for path, lines in chunks]
+
+    def dump(self, query, out_dir, name, partition='subject', prefix_length=1, variable=None,
+             chunk_lines=DEFAULT_CHUNK_LINES):
+        """Run query in partitions on the pool and write gzip chunks plus a manifest.
+        Returns the manifest dict."""
+        form = query_form(query)
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # Drop chunks of an earlier run so the output set matches this one
+        for old in out_dir.glob(f'{name}-p*{SUFFIX[form]}'):
+            old.unlink()
+        parts = self.partitions(query, partition, prefix_length, variable)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {part: pool.submit(self.write_partition, part, q, form, out_dir, name, chunk_lines)
+                       for part, q in parts.items()}
+            results = {part: future.result() for part, future in futures.items()}
+        manifest = {
+            'endpoint': self.endpoint,
+            'form': form,
+            'partition': partition,
+            'partitions': len(parts),
+            'lines': sum(lines for chunks in results.values() for _, lines in chunks),
+            'seconds': round(time.perf_counter() - start, 2),
+            'chunks': [{'partition': part, 'path': Path(path).name, 'lines': lines}
+                       for part, chunks in results.items() for path, lines in chunks],
+        }
+        (out_dir / f'{name}.manifest.json').write_text(json.dumps(manifest, indent=1) + '\n')
+        return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a SPARQL query in partitions and stream gzip chunks.")
+    parser.add_argument('query', help='SPARQL query file (CONSTRUCT, DESCRIBE or SELECT)')
+    parser.add_argument('-o', '--out-dir', required=True, help='Output directory')
+    parser.add_argument('-e', '--endpoint', default=os.environ.get('SPARQL_ENDPOINT', DEFAULT_ENDPOINT),
+                        help='SPARQL endpoint (default $SPARQL_ENDPOINT or the local rdf4j obask repository)')
+    parser.add_argument('--name', default=None, help='Output file prefix (default: query file stem)')
+    parser.add_argument('--partition', choices=['subject', 'graph', 'none'], default='subject')
+    parser.add_argument('--prefix-length', type=int, default=1,
+                        help='MD5 hex digits per subject partition (16**N partitions)')
+    parser.add_argument('--variable', default=None, help='Subject variable to partition on (default: first in WHERE)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Partitions in flight at once')
+    parser.add_argument('--chunk-lines', type=int, default=DEFAULT_CHUNK_LINES, help='Lines per gzip chunk')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT, help='Per-request timeout (seconds)')
+    args = parser.parse_args()
+
+    query = Path(args.query).read_text()
+    name = args.name or Path(args.query).stem.lstrip('_')
+    client = SparqlClient(args.endpoint, args.workers, args.timeout)
+    manifest = client.dump(query, args.out_dir, name, args.partition, args.prefix_length,
+                           args.variable, args.chunk_lines)
+    print(f"{manifest['lines']} lines in {len(manifest['chunks'])} chunks from {manifest['partitions']} "
+          f"partitions in {manifest['seconds']}s -> {args.out_dir}/{name}.manifest.json")
+
+
+if __name__ == '__main__':
+    main()
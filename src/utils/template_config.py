@@ -0,0 +1,44 @@
+"""
+Shared settings for the ROBOT mapping templates: the --add-prefix lists used to convert them
+to OWL (the same as the Makefile OWL rules), the remote source the BG2WMB template is built
+from, and the template columns that hold mappings.
+
+Imported by build.py, wmbkg.py, WMB_AT_map.py and load_mappings.py so the lists are defined
+once on the Python side.
+"""
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+TEMPLATES_DIR = project_root / 'src' / 'templates'
+
+BG2WMB_TEMPLATE = TEMPLATES_DIR / 'BG2WMB_AT_map_template.tsv'
+SCFAIR_TEMPLATE = TEMPLATES_DIR / 'scFAIR_WHB_WMB_template.tsv'
+
+WMB_TAXONOMY_URL = "https://github.com/brain-bican/whole_mouse_brain_taxonomy/raw/refs/heads/main/CCN20230722.json"
+
+BG2WMB_PREFIXES = [
+    "BG: https://purl.brain-bican.org/ontology/CS20250428/",
+    "WMB: https://purl.brain-bican.org/taxonomy/CCN20230722/",
+]
+SCFAIR_PREFIXES = [
+    "WHB: https://purl.brain-bican.org/ontology/AIT_CS202210140/",
+    "WMB: https://purl.brain-bican.org/taxonomy/CCN20230722/",
+    "n2o: http://n2o.neo/property/custom#",
+]
+
+# The KG holds WMB cell sets under the taxonomy's ontology IRIs (see resources/maps/cell_set_map.tsv),
+# not the /taxonomy/ base the OWL files use; load_mappings.py matches KG nodes with this instead
+WMB_KG_PREFIX = "WMB: https://purl.brain-bican.org/ontology/CCN20230722/"
+
+
+def kg_prefixes(prefixes):
+    """prefixes with WMB: pointing at the IRIs the KG holds WMB cell sets under."""
+    return [WMB_KG_PREFIX if p.split(':', 1)[0].strip() == 'WMB' else p for p in prefixes]
+
+
+# BG2WMB template column -> mapping relationship
+BG2WMB_MATCH_COLUMNS = {
+    'WMB_exact_match': 'exactMatch',
+    'WMB_related_match': 'relatedMatch',
+    'WMB_broad_match': 'broadMatch',
+}